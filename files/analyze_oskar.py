@@ -3,14 +3,15 @@
 
 import os
 import sys
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from analyse import analyse
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'code'))
+from analyse import analyse_with_client
+from telegram_session import TelegramSession
 from ai import ask_ai
 import re
 import json
 
-def analyze_oskar_channel():
-    """Анализирует канал Оскара Хартманна"""
+def analyze_oskar_channel(session=None):
+    """Анализирует канал Оскара Хартманна (через переданную TelegramSession, если есть)"""
     
     channel_url = "https://t.me/Oskar_Hartmann"
     
@@ -21,7 +22,14 @@ def analyze_oskar_channel():
     try:
         # Анализируем канал и получаем тексты топ-5 постов
         print("📊 Получаем данные канала...")
-        top_posts_text = analyse(channel_url)
+        if session is not None:
+            top_posts_text = analyse_with_client(session.client, channel_url, limiter=session.limiter,
+                                                 entity_cache=session.entity_cache)
+        else:
+            session = TelegramSession()
+            with session as client:
+                top_posts_text = analyse_with_client(client, channel_url, limiter=session.limiter,
+                                                     entity_cache=session.entity_cache)
         
         if top_posts_text:
             print(f"✅ Получено {len(top_posts_text.split('текст')) - 1} постов для анализа")
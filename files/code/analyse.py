@@ -1,20 +1,57 @@
 import os
 import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'config'))
+sys.path.append(os.path.dirname(__file__))
 from config import (
-    only_text, stat_tables, api_id, api_hash, start_date, end_date, SORT_BY_VIRALITY,
-    CREATE_MULTIPLE_SORTED_FILES, SHOW_VIRALITY_STATISTICS, CREATE_VIRALITY_SUMMARY_REPORT
+    only_text, stat_tables, start_date, end_date, SORT_BY_VIRALITY,
+    CREATE_MULTIPLE_SORTED_FILES, SHOW_VIRALITY_STATISTICS, CREATE_VIRALITY_SUMMARY_REPORT, CREATE_TREND_REPORT,
+    USE_MESSAGE_CACHE, FLOOD_WAIT_MAX_RETRIES, TOP_POSTS_COUNT, METRICS, MERGE_ALBUMS, SINGLE_WORKBOOK,
+    SAVE_POSTS_PARQUET, UPDATE_POST_DATASET, REPORT_FORMAT, RESULTS_DIR, CHANNELS_DIR
 )
-from telethon.sync import TelegramClient
+from telegram_session import TelegramSession
+from message_store import MessageStore
+from post_columns import PostColumns
+from post_frame import PostFrame, format_date, PARQUET_FILENAME
+from top_posts import TopPosts
+from trends import TrendStore, channel_trends, trends_sheet
+from post_dataset import PostDataset
+from range_index import parse_window
+from report_writer import ReportWriter
+from output_layout import ChannelOutput, input_hash
+from report_formats import get_report_format, report_filename
+from metrics import add_metrics, required_metrics
+from rate_limiter import default_limiter
+from entity_cache import ResolvedChannel, STALE_PEER_ERRORS, default_entity_cache
+from telethon.errors import FloodWaitError
 import pandas as pd
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment
-from openpyxl.utils.dataframe import dataframe_to_rows
 from datetime import datetime
 import numpy as np
 import re
+import asyncio
 from pathlib import Path
 
+# Максимальное количество id в одном запросе channels.GetMessages
+REFRESH_BATCH_SIZE = 100
+
+# Сортировки по счетчикам (метрики сортируются по колонкам из METRICS)
+SORT_COUNTER_COLUMNS = {
+    'forwards': 'Пересылки',
+    'reactions': 'Реакции',
+    'views': 'Просмотры',
+    'date': 'Дата'
+}
+
+# Названия сортировок (остальные метрики реестра METRICS - по title из config.py)
+SORT_TYPES = {
+    'default': 'По виральности (основная формула)',
+    'coefficient': 'По коэффициенту виральности',
+    'engagement': 'По виральности вовлеченности',
+    'forwards': 'По пересылкам',
+    'reactions': 'По реакциям',
+    'views': 'По просмотрам',
+    'date': 'По дате'
+}
+
 POSITIVE_EMOJIS = {'👍', '❤', '🔥', '😊', '😂', '🥰', '👏', '⚡', '❤‍🔥', '🫡', '🤗', '😍', '👌', '😁', '💯', '🙏', '🤩'}
 
 def calculate_er_percentage(row):
@@ -63,129 +100,173 @@ def calculate_engagement_virality(row):
     total_engagement = reactions + comments + forwards
     return (total_engagement / views) * 100
 
+def sort_column(sort_type):
+    """Колонка таблицы постов для типа сортировки"""
+    if sort_type in METRICS:
+        # Сортировка по метрике из реестра
+        return METRICS[sort_type]['column']
+    if sort_type in SORT_COUNTER_COLUMNS:
+        # Сортировка по счетчику (для даты - новые сначала)
+        return SORT_COUNTER_COLUMNS[sort_type]
+    # По умолчанию сортировка по основной виральности
+    return 'Виральность'
+
+def sort_permutation(df, sort_type='default'):
+    """
+    Перестановка строк для сортировки по убыванию без копирования таблицы
+    
+    Сортировка устойчивая: при равных значениях сохраняется текущий порядок строк.
+    NaN оказываются в конце, как в sort_values.
+    """
+    column = df[sort_column(sort_type)]
+    if pd.api.types.is_datetime64_any_dtype(column):
+        # Дата сортируется хронологически по целым меткам времени
+        values = column.array.asi8
+    else:
+        values = column.to_numpy()
+    if values.dtype.kind not in 'iuf':
+        # Остальные нечисловые колонки сортируются по кодам упорядоченных уникальных значений
+        values = np.unique(values.astype(str), return_inverse=True)[1]
+    return np.argsort(-values, kind='stable')
+
 def sort_by_virality(df, sort_type='default'):
     """
     Сортировка по различным метрикам виральности
     
     Args:
         df: DataFrame с данными
-        sort_type: тип сортировки ('default', 'coefficient', 'engagement', 'forwards', 'reactions')
-    """
-    if sort_type == 'default':
-        # Сортировка по основной формуле виральности
-        return df.sort_values(by='Виральность', ascending=False).reset_index(drop=True)
-    elif sort_type == 'coefficient':
-        # Сортировка по коэффициенту виральности (пересылки/просмотры)
-        return df.sort_values(by='Коэффициент виральности', ascending=False).reset_index(drop=True)
-    elif sort_type == 'engagement':
-        # Сортировка по виральности вовлеченности
-        return df.sort_values(by='Виральность вовлеченности', ascending=False).reset_index(drop=True)
-    elif sort_type == 'forwards':
-        # Сортировка по количеству пересылок
-        return df.sort_values(by='Пересылки', ascending=False).reset_index(drop=True)
-    elif sort_type == 'reactions':
-        # Сортировка по количеству реакций
-        return df.sort_values(by='Реакции', ascending=False).reset_index(drop=True)
-    elif sort_type == 'views':
-        # Сортировка по просмотрам
-        return df.sort_values(by='Просмотры', ascending=False).reset_index(drop=True)
-    elif sort_type == 'date':
-        # Сортировка по дате (новые сначала)
-        return df.sort_values(by='Дата', ascending=False).reset_index(drop=True)
-    else:
-        # По умолчанию сортировка по основной виральности
-        return df.sort_values(by='Виральность', ascending=False).reset_index(drop=True)
-
-def save_to_excel(df, filename, channel_username, start_date, end_date):
-    """Сохраняет DataFrame в Excel файл с форматированием"""
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Posts"
-    
-    # Добавляем данные
-    for r in dataframe_to_rows(df, index=False, header=True):
-        ws.append(r)
-    
-    # Форматирование заголовков
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-    header_alignment = Alignment(horizontal="center", vertical="center")
-    
-    for cell in ws[1]:
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
-    
-    # Автоматическая ширина столбцов
-    for column in ws.columns:
-        max_length = 0
-        column_letter = column[0].column_letter
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = min(max_length + 2, 50)
-        ws.column_dimensions[column_letter].width = adjusted_width
+        sort_type: ключ метрики из METRICS ('default', 'coefficient', 'engagement', ...)
+            или счетчика ('forwards', 'reactions', 'views', 'date')
+    """
+    return df.take(sort_permutation(df, sort_type)).reset_index(drop=True)
+
+def save_to_excel(df, filename, channel_username, start_date, end_date, order=None, sheets=None,
+                  window_sheets=None, report_format=REPORT_FORMAT, folder=RESULTS_DIR):
+    """
+    Сохраняет DataFrame в Excel файл с форматированием (или в формате report_format)
+    
+    Args:
+        df: DataFrame или PostFrame (в Excel - с итоговыми строками)
+        order: перестановка строк (sort_permutation) - строки пишутся сразу в этом порядке
+        sheets (dict): дополнительные листы {название: DataFrame} после основного
+        window_sheets (dict): листы окон анализа {название: (DataFrame или PostFrame, начало, конец)}
+            с периодом окна в шапке
+        report_format (str): формат отчета (см. report_formats.py)
+        folder: папка файла (у отчетов канала - папка канала, см. output_layout.py)
+        
+    Returns:
+        list: записанные файлы
+    """
+    workbook = {"Posts": {'df': df, 'start_date': start_date, 'end_date': end_date, 'order': order}}
+    for title, sheet_df in (sheets or {}).items():
+        workbook[title] = {'df': sheet_df, 'start_date': start_date, 'end_date': end_date, 'count_label': "Строк"}
+    for title, (sheet_df, sheet_start, sheet_end) in (window_sheets or {}).items():
+        workbook[title] = {'df': sheet_df, 'start_date': sheet_start, 'end_date': sheet_end}
+    return save_workbook(filename, channel_username, workbook, report_format, folder)
+
+def save_workbook(filename, channel_username, sheets, report_format=REPORT_FORMAT, folder=RESULTS_DIR):
+    """
+    Сохраняет отчет из нескольких листов: книгу Excel (потоковая запись, см. write_sheet)
+    или построчные файлы CSV/JSONL (см. report_formats.py)
     
-    # Закрепляем заголовки
-    ws.freeze_panes = "A2"
+    Args:
+        filename (str): имя файла, расширение заменяется расширением формата
+        sheets (dict): название листа -> аргументы write_sheet
+            (df, start_date, end_date, order, count_label)
+        report_format (str): формат отчета ('excel', 'csv', 'jsonl')
+        folder: папка файла (по умолчанию - results в корне проекта)
+        
+    Returns:
+        list: записанные файлы
+    """
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    file_path = folder / report_filename(filename, report_format)
+    paths = get_report_format(report_format).save(file_path, channel_username, sheets)
+    for path in paths:
+        print(f"Файл сохранен: {path}")
+    return paths
+
+def enabled_sortings(df):
+    """
+    Включенные в stat_tables сортировки и их перестановки (каждая считается один раз)
     
-    # Добавляем информацию о канале и периоде
-    ws.insert_rows(1, 3)
-    ws['A1'] = f"Канал: {channel_username}"
-    ws['A2'] = f"Период: {start_date.strftime('%d.%m.%Y')} - {end_date.strftime('%d.%m.%Y')}"
-    ws['A3'] = f"Всего постов: {len(df)}"
+    Returns:
+        list: (тип сортировки, описание, перестановка строк df)
+    """
+    sort_types = dict(SORT_TYPES)
+    # Остальные метрики реестра METRICS
+    for key, metric in METRICS.items():
+        sort_types.setdefault(key, metric.get('title', metric['column']))
     
-    # Сохраняем файл в папку results
-    results_dir = Path('results')
-    results_dir.mkdir(exist_ok=True)
-    file_path = results_dir / filename
-    wb.save(file_path)
-    print(f"Файл сохранен: {file_path}")
+    return [(sort_type, description, sort_permutation(df, sort_type))
+            for sort_type, description in sort_types.items() if stat_tables.get(sort_type, False)]
 
-def create_multiple_sorted_files(df, channel_username, start_date, end_date):
+def create_multiple_sorted_files(frame, channel_username, start_date, end_date, report_format=REPORT_FORMAT,
+                                 folder=RESULTS_DIR):
     """
     Создает несколько файлов Excel с разными типами сортировки по виральности
+    
+    Перестановки для всех включенных сортировок считаются один раз,
+    каждая сортировка пишется в файл напрямую, без копии таблицы.
+    
+    Args:
+        frame (PostFrame): посты канала (без итоговых строк)
+        report_format (str): формат файлов (см. report_formats.py)
+        folder: папка файлов
+        
+    Returns:
+        list: записанные файлы
     """
-    # Исключаем строки с нечисловыми значениями в ключевых столбцах
-    df = df[~df['Дата'].isin(['Итого', 'В среднем на пост'])].copy()
-    # Приводим все числовые столбцы к числовому типу
-    numeric_columns = ['Просмотры', 'Реакции', 'Всего (+)', 'Всего (-)', 'Всего', 'Комменты', 'Пересылки', 'ER%', 'Виральность', 'Коэффициент виральности', 'Виральность вовлеченности']
-    for col in numeric_columns:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-
-    sort_types = {
-        'default': 'По виральности (основная формула)',
-        'coefficient': 'По коэффициенту виральности',
-        'engagement': 'По виральности вовлеченности',
-        'forwards': 'По пересылкам',
-        'reactions': 'По реакциям',
-        'views': 'По просмотрам',
-        'date': 'По дате'
-    }
-    
-    for sort_type, description in sort_types.items():
-        if not stat_tables.get(sort_type, False):
-            continue
-        sorted_df = sort_by_virality(df.copy(), sort_type)
-        filename = f'posts_sorted_by_{sort_type}.xlsx'
-        save_to_excel(sorted_df, filename, channel_username, start_date, end_date)
+    paths = []
+    for sort_type, description, order in enabled_sortings(frame.df):
+        filename = report_filename(f'posts_sorted_by_{sort_type}.xlsx', report_format)
+        paths += save_to_excel(frame.df, filename, channel_username, start_date, end_date, order=order,
+                               report_format=report_format, folder=folder)
         print(f"Создан файл: {filename} - {description}")
+    print("Все файлы созданы успешно!")
+    return paths
 
-def print_virality_statistics(df):
+def create_posts_file(frame, channel_username, start_date, end_date, windows=None, report_format=REPORT_FORMAT,
+                      folder=RESULTS_DIR):
+    """
+    Основной файл posts.xlsx: таблица постов с итогами, листы окон анализа - после нее
+    
+    Args:
+        frame (PostFrame): посты канала (без итоговых строк)
+        windows (dict): окна анализа (window_frames) - лист на окно с периодом окна в шапке
+        report_format (str): формат файла (в CSV и JSONL - только посты, без итоговых строк)
+        folder: папка файла
+        
+    Returns:
+        list: записанные файлы
+    """
+    window_sheets = {label: (window, window_start, window_end)
+                     for label, (window_start, window_end, window) in (windows or {}).items()}
+    return save_to_excel(frame, 'posts.xlsx', channel_username, start_date, end_date,
+                         window_sheets=window_sheets, report_format=report_format, folder=folder)
+
+def save_posts_parquet(frame, folder):
+    """
+    Таблица постов канала в Parquet для повторного чтения (Excel - только для просмотра)
+    
+    Returns:
+        list: записанный файл
+    """
+    path = Path(folder) / PARQUET_FILENAME
+    frame.to_parquet(path)
+    print(f"Файл сохранен: {path}")
+    return [path]
+
+def print_virality_statistics(frame):
     """
     Выводит статистику по виральности постов
+    
+    Args:
+        frame (PostFrame): посты канала (без итоговых строк)
     """
-    # Исключаем строки с нечисловыми значениями в ключевых столбцах
-    df = df[~df['Дата'].isin(['Итого', 'В среднем на пост'])].copy()
-    # Приводим все числовые столбцы к числовому типу
-    numeric_columns = ['Просмотры', 'Реакции', 'Всего (+)', 'Всего (-)', 'Всего', 'Комменты', 'Пересылки', 'ER%', 'Виральность', 'Коэффициент виральности', 'Виральность вовлеченности']
-    for col in numeric_columns:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+    # Метрики постов без просмотров считаются нулевыми
+    df = frame.filled()
 
     print("\n" + "="*60)
     print("СТАТИСТИКА ПО ВИРАЛЬНОСТИ")
@@ -212,7 +293,7 @@ def print_virality_statistics(df):
         top_viral = df.nlargest(5, 'Виральность')
         for i, (_, row) in enumerate(top_viral.iterrows(), 1):
             print(f"{i}. Виральность: {row['Виральность']:.2f}")
-            print(f"   Дата: {row['Дата']}")
+            print(f"   Дата: {format_date(row['Дата'])}")
             print(f"   Просмотры: {row['Просмотры']:,}")
             print(f"   Пересылки: {row['Пересылки']}")
             print(f"   Реакции: {row['Реакции']}")
@@ -228,7 +309,7 @@ def print_virality_statistics(df):
         top_coefficient = df.nlargest(5, 'Коэффициент виральности')
         for i, (_, row) in enumerate(top_coefficient.iterrows(), 1):
             print(f"{i}. Коэффициент: {row['Коэффициент виральности']:.2f}")
-            print(f"   Дата: {row['Дата']}")
+            print(f"   Дата: {format_date(row['Дата'])}")
             print(f"   Пересылки: {row['Пересылки']}")
             print(f"   Просмотры: {row['Просмотры']:,}")
             print(f"   Тип: {row['Тип']}")
@@ -240,7 +321,7 @@ def print_virality_statistics(df):
         top_engagement = df.nlargest(5, 'Виральность вовлеченности')
         for i, (_, row) in enumerate(top_engagement.iterrows(), 1):
             print(f"{i}. Виральность вовлеченности: {row['Виральность вовлеченности']:.2f}%")
-            print(f"   Дата: {row['Дата']}")
+            print(f"   Дата: {format_date(row['Дата'])}")
             print(f"   Общее вовлечение: {row['Реакции'] + row['Комменты'] + row['Пересылки']}")
             print(f"   Просмотры: {row['Просмотры']:,}")
             print(f"   Тип: {row['Тип']}")
@@ -252,7 +333,7 @@ def print_virality_statistics(df):
         top_forwards = df.nlargest(5, 'Пересылки')
         for i, (_, row) in enumerate(top_forwards.iterrows(), 1):
             print(f"{i}. Пересылки: {row['Пересылки']}")
-            print(f"   Дата: {row['Дата']}")
+            print(f"   Дата: {format_date(row['Дата'])}")
             print(f"   Просмотры: {row['Просмотры']:,}")
             print(f"   Тип: {row['Тип']}")
             print()
@@ -263,7 +344,7 @@ def print_virality_statistics(df):
         top_reactions = df.nlargest(5, 'Реакции')
         for i, (_, row) in enumerate(top_reactions.iterrows(), 1):
             print(f"{i}. Реакции: {row['Реакции']}")
-            print(f"   Дата: {row['Дата']}")
+            print(f"   Дата: {format_date(row['Дата'])}")
             print(f"   Просмотры: {row['Просмотры']:,}")
             print(f"   Тип: {row['Тип']}")
             print()
@@ -274,23 +355,36 @@ def print_virality_statistics(df):
         top_views = df.nlargest(5, 'Просмотры')
         for i, (_, row) in enumerate(top_views.iterrows(), 1):
             print(f"{i}. Просмотры: {row['Просмотры']:,}")
-            print(f"   Дата: {row['Дата']}")
+            print(f"   Дата: {format_date(row['Дата'])}")
             print(f"   Пересылки: {row['Пересылки']}")
             print(f"   Реакции: {row['Реакции']}")
             print(f"   Тип: {row['Тип']}")
             print()
+    
+    # Метрики реестра METRICS без отдельного раздела
+    for key, metric in METRICS.items():
+        if key in ('default', 'coefficient', 'engagement') or not stat_tables.get(key, False):
+            continue
+        column = metric['column']
+        print(f"\nТОП-5 ПОСТОВ: {metric.get('title', column).upper()}:")
+        print("-" * 40)
+        top_metric = df.nlargest(5, column)
+        for i, (_, row) in enumerate(top_metric.iterrows(), 1):
+            print(f"{i}. {column}: {row[column]:.2f}")
+            print(f"   Дата: {format_date(row['Дата'])}")
+            print(f"   Просмотры: {row['Просмотры']:,}")
+            print(f"   Тип: {row['Тип']}")
+            print()
 
-def create_virality_summary_report(df, channel_username, start_date, end_date):
+def virality_summary(frame):
     """
-    Создает сводный отчет по виральности в отдельном файле
+    Таблица сводного отчета по виральности: метрика, значение, описание
+    
+    Args:
+        frame (PostFrame): посты канала (без итоговых строк)
     """
-    # Исключаем строки с нечисловыми значениями в ключевых столбцах
-    df = df[~df['Дата'].isin(['Итого', 'В среднем на пост'])].copy()
-    # Приводим все числовые столбцы к числовому типу
-    numeric_columns = ['Просмотры', 'Реакции', 'Всего (+)', 'Всего (-)', 'Всего', 'Комменты', 'Пересылки', 'ER%', 'Виральность', 'Коэффициент виральности', 'Виральность вовлеченности']
-    for col in numeric_columns:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+    # Метрики постов без просмотров считаются нулевыми
+    df = frame.filled()
 
     report_data = []
     
@@ -354,7 +448,7 @@ def create_virality_summary_report(df, channel_username, start_date, end_date):
     top_viral = df.nlargest(3, 'Виральность')
     for i, (_, row) in enumerate(top_viral.iterrows(), 1):
         report_data.append({
-            'Метрика': f"{i}. {row['Дата']}",
+            'Метрика': f"{i}. {format_date(row['Дата'])}",
             'Значение': f"Виральность: {row['Виральность']:.2f}",
             'Описание': f"Просмотры: {row['Просмотры']:,}, Пересылки: {row['Пересылки']}, Комментарии: {row['Комменты']}, ER%: {row['ER%']:.2f}%, Баланс: {row['Всего (+)'] - row['Всего (-)']}, Тип: {row['Тип']}"
         })
@@ -376,312 +470,771 @@ def create_virality_summary_report(df, channel_username, start_date, end_date):
         })
     
     # Создаем DataFrame для отчета
-    report_df = pd.DataFrame(report_data)
+    return pd.DataFrame(report_data)
+
+def summary_sheets(trends=None, windows=None):
+    """
+    Дополнительные листы сводного отчета
     
-    # Сохраняем отчет
-    filename = 'virality_summary_report.xlsx'
-    save_to_excel(report_df, filename, channel_username, start_date, end_date)
+    Args:
+        trends (dict): тренды по периодам (channel_trends) - лист "Тренды"
+        windows (dict): окна анализа (window_frames) - лист "Окна"
+    """
+    sheets = {}
+    if trends:
+        sheets['Тренды'] = trends_sheet(trends)
+    if windows:
+        sheets['Окна'] = windows_sheet(windows)
+    return sheets
+
+def create_virality_summary_report(frame, channel_username, start_date, end_date, trends=None, windows=None,
+                                   report_format=REPORT_FORMAT, folder=RESULTS_DIR):
+    """
+    Создает сводный отчет по виральности в отдельном файле
+    
+    Args:
+        frame (PostFrame): посты канала (без итоговых строк)
+        trends (dict): тренды по периодам (channel_trends) - пишутся листом "Тренды"
+        windows (dict): окна анализа (window_frames) - сравниваются на листе "Окна"
+        report_format (str): формат отчета (см. report_formats.py)
+        folder: папка отчета
+        
+    Returns:
+        list: записанные файлы
+    """
+    filename = report_filename('virality_summary_report.xlsx', report_format)
+    paths = save_to_excel(virality_summary(frame), filename, channel_username, start_date, end_date,
+                          sheets=summary_sheets(trends, windows) or None, report_format=report_format, folder=folder)
     print(f"Создан сводный отчет: {filename}")
+    return paths
 
-def analyse(channel_url):
+def create_channel_workbook(frame, channel_username, start_date, end_date, trends=None, windows=None,
+                            report_format=REPORT_FORMAT, folder=RESULTS_DIR):
     """
-    Основная функция анализа канала Telegram
+    Все таблицы канала одним файлом posts.xlsx (SINGLE_WORKBOOK)
+    
+    Листы: таблица постов "Posts" (читается PostFrame.from_excel), окна анализа,
+    sorted_by_* для включенных сортировок (CREATE_MULTIPLE_SORTED_FILES),
+    "Сводка" с листами "Тренды" и "Окна" (CREATE_VIRALITY_SUMMARY_REPORT).
+    Книга открывается, оформляется и сжимается один раз.
     
     Args:
-        channel_url (str): URL канала для анализа (например, "https://t.me/sellerx")
+        frame (PostFrame): посты канала (без итоговых строк)
+        windows (dict): окна анализа (window_frames)
+        report_format (str): формат (в CSV и JSONL каждый лист - отдельный файл posts_<лист>)
+        folder: папка файла
         
     Returns:
-        str: Текст из топ-5 постов по виральности в формате "текст 1: текст\nтекст 2: текст\n..."
+        list: записанные файлы
     """
-    # Импортируем функции для использования внутри analyse
-    from analyse import save_to_excel, create_multiple_sorted_files, print_virality_statistics, create_virality_summary_report
+    period = {'start_date': start_date, 'end_date': end_date}
+    sheets = {"Posts": {'df': frame, **period}}
+    for label, (window_start, window_end, window) in (windows or {}).items():
+        sheets[label] = {'df': window, 'start_date': window_start, 'end_date': window_end}
     
-    # Извлекаем username из ссылки
+    if CREATE_MULTIPLE_SORTED_FILES:
+        for sort_type, _, order in enabled_sortings(frame.df):
+            sheets[f'sorted_by_{sort_type}'] = {'df': frame.df, 'order': order, **period}
+    
+    if CREATE_VIRALITY_SUMMARY_REPORT:
+        sheets['Сводка'] = {'df': virality_summary(frame), 'count_label': "Строк", **period}
+        for title, sheet_df in summary_sheets(trends, windows).items():
+            sheets[title] = {'df': sheet_df, 'count_label': "Строк", **period}
+    
+    paths = save_workbook('posts.xlsx', channel_username, sheets, report_format, folder)
+    print(f"Создан файл канала: {report_filename('posts.xlsx', report_format)} ({len(sheets)} листов)")
+    return paths
+
+def parse_channel_username(channel_url):
+    """Извлекает username канала из ссылки вида https://t.me/username"""
     match = re.search(r"(?:https?://)?t\.me/(.+?)(?:/|$)", channel_url)
     if not match:
         raise ValueError("Некорректная ссылка на канал")
-    channel_username = match.group(1).replace('@', '')
-    
-    # Создаем папку для результатов в results/all_folders
-    out_dir = Path('results', 'all_folders') / channel_username
-    out_dir.mkdir(parents=True, exist_ok=True)
+    return match.group(1).replace('@', '')
+
+def extract_post_row(message):
+    """
+    Преобразует сообщение Telethon в строку поста
     
-    with TelegramClient('session_name', api_id, api_hash) as client:
-        messages = []
-        albums = {}
+    Args:
+        message: сообщение Telethon (не служебное)
         
+    Returns:
+        tuple: строка в порядке POST_FIELDS (для PostColumns и кэша сообщений)
+    """
+    # Определяем тип контента
+    content_type = "Текст"
+    if message.photo:
+        content_type = "Фото"
+    elif message.video:
+        content_type = "Видео"
+    elif message.document:
+        content_type = "Документ"
+    elif message.voice:
+        content_type = "Голосовое"
+    elif message.video_note:
+        content_type = "Видеосообщение"
+    elif message.sticker:
+        content_type = "Стикер"
+    elif message.poll:
+        content_type = "Опрос"
+    
+    # Получаем реакции
+    reactions = message.reactions
+    positive_reactions = 0
+    negative_reactions = 0
+    total_reactions = 0
+    
+    if reactions:
         try:
-            # Получаем канал
-            channel = client.get_entity(channel_username)
-            print(f"Анализируем канал: {channel.title}")
-            
-            # Получаем сообщения за указанный период
-            for message in client.iter_messages(channel, offset_date=start_date, reverse=True):
-                if message.date > end_date:
-                    break
-                
-                # Пропускаем служебные сообщения
-                if message.action:
-                    continue
-                
-                # Определяем тип контента
-                content_type = "Текст"
-                if message.photo:
-                    content_type = "Фото"
-                elif message.video:
-                    content_type = "Видео"
-                elif message.document:
-                    content_type = "Документ"
-                elif message.voice:
-                    content_type = "Голосовое"
-                elif message.video_note:
-                    content_type = "Видеосообщение"
-                elif message.sticker:
-                    content_type = "Стикер"
-                elif message.poll:
-                    content_type = "Опрос"
-                
-                # Получаем реакции
-                reactions = message.reactions
-                positive_reactions = 0
-                negative_reactions = 0
-                total_reactions = 0
-                
-                if reactions:
-                    try:
-                        # Правильный способ доступа к реакциям в Telethon
-                        for reaction in reactions.results:
-                            emoji = reaction.reaction.emoji if hasattr(reaction.reaction, 'emoji') else '👍'
-                            count = reaction.count
-                            total_reactions += count
-                            
-                            if emoji in POSITIVE_EMOJIS:
-                                positive_reactions += count
-                            else:
-                                negative_reactions += count
-                    except AttributeError:
-                        # Альтернативный способ для старых версий Telethon
-                        try:
-                            for reaction in reactions.reactions:
-                                emoji = reaction.emoji
-                                count = reaction.count
-                                total_reactions += count
-                                
-                                if emoji in POSITIVE_EMOJIS:
-                                    positive_reactions += count
-                                else:
-                                    negative_reactions += count
-                        except:
-                            # Если не удается получить реакции, оставляем нули
-                            pass
-                
-                # Получаем количество комментариев
-                comments_count = 0
-                try:
-                    # Пытаемся получить количество комментариев
-                    if hasattr(message, 'replies') and message.replies:
-                        comments_count = message.replies.replies
-                except:
-                    pass
+            # Правильный способ доступа к реакциям в Telethon
+            for reaction in reactions.results:
+                emoji = reaction.reaction.emoji if hasattr(reaction.reaction, 'emoji') else '👍'
+                count = reaction.count
+                total_reactions += count
                 
-                # Получаем количество пересылок
-                forwards_count = 0
-                try:
-                    if hasattr(message, 'forwards'):
-                        forwards_count = message.forwards
-                except:
-                    pass
-                
-                # Получаем количество просмотров
-                views_count = 0
-                try:
-                    if hasattr(message, 'views'):
-                        views_count = message.views
-                except:
-                    pass
-                
-                message_data = {
-                    'Дата': message.date.strftime('%d.%m.%Y %H:%M'),
-                    'Полный_текст': message.text if message.text else '',
-                    'Тип': content_type,
-                    'Просмотры': views_count,
-                    'Реакции': total_reactions,
-                    'Всего (+)': positive_reactions,
-                    'Всего (-)': negative_reactions,
-                    'Всего': total_reactions,
-                    'Комменты': comments_count,
-                    'Пересылки': forwards_count
-                }
-                
-                messages.append(message_data)
-                
-                # Обработка альбомов
-                if message.grouped_id:
-                    if message.grouped_id not in albums:
-                        albums[message.grouped_id] = []
-                    albums[message.grouped_id].append(message_data)
-        
-        except Exception as e:
-            print(f"Ошибка при получении сообщений: {e}")
-            print(f"Тип ошибки: {type(e).__name__}")
-            return ""
-        
-        print(f"Всего получено сообщений: {len(messages)}")
-        
-        if not messages:
-            print("Сообщения не найдены")
-            return ""
-        
-        # Создаем DataFrame
-        df = pd.DataFrame(messages)
-        
-        # Фильтрация по only_text
-        if only_text:
-            df = df[df['Тип'] == 'Текст'].reset_index(drop=True)
-        
-        df = df.sort_values(by='Дата', ascending=False).reset_index(drop=True)
-        
-        # Приводим числовые столбцы к числовому типу
-        numeric_columns = ['Просмотры', 'Реакции', 'Всего (+)', 'Всего (-)', 'Всего', 'Комменты', 'Пересылки']
-        for col in numeric_columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-        
-        # Вычисляем ER%
-        df['ER%'] = df.apply(calculate_er_percentage, axis=1)
+                if emoji in POSITIVE_EMOJIS:
+                    positive_reactions += count
+                else:
+                    negative_reactions += count
+        except AttributeError:
+            # Альтернативный способ для старых версий Telethon
+            try:
+                for reaction in reactions.reactions:
+                    emoji = reaction.emoji
+                    count = reaction.count
+                    total_reactions += count
+                    
+                    if emoji in POSITIVE_EMOJIS:
+                        positive_reactions += count
+                    else:
+                        negative_reactions += count
+            except:
+                # Если не удается получить реакции, оставляем нули
+                pass
+    
+    # Получаем количество комментариев
+    comments_count = 0
+    try:
+        # Пытаемся получить количество комментариев
+        if hasattr(message, 'replies') and message.replies:
+            comments_count = message.replies.replies
+    except:
+        pass
+    
+    # Получаем количество пересылок
+    forwards_count = 0
+    try:
+        if hasattr(message, 'forwards'):
+            forwards_count = message.forwards
+    except:
+        pass
+    
+    # Получаем количество просмотров
+    views_count = 0
+    try:
+        if hasattr(message, 'views'):
+            views_count = message.views
+    except:
+        pass
+    
+    return (
+        message.id,
+        int(message.date.timestamp()),
+        message.grouped_id,
+        message.text if message.text else '',
+        content_type,
+        views_count or 0,
+        total_reactions,
+        positive_reactions,
+        negative_reactions,
+        comments_count or 0,
+        forwards_count or 0
+    )
+
+def collect_message(message, posts, end=end_date):
+    """
+    Добавляет сообщение в колонки постов (альбомы остаются в колонке grouped_id)
+    
+    Returns:
+        bool: False, если сообщение вышло за конец периода и перебор нужно остановить
+    """
+    if message.date > end:
+        return False
+    
+    # Пропускаем служебные сообщения
+    if message.action:
+        return True
+    
+    posts.append(extract_post_row(message))
+    return True
+
+def get_fetch_plans(store, channel, refresh_only=False, period=(start_date, end_date)):
+    """Аргументы iter_messages: полный период или только дельта из кэша сообщений"""
+    if store is None:
+        return [{'offset_date': period[0], 'reverse': True}]
+    if refresh_only:
+        # В режиме обновления новые сообщения не загружаются
+        return []
+    return store.fetch_plans(channel.id, *period)
+
+def get_refresh_ids(store, channel, refresh_only=False, period=(start_date, end_date)):
+    """id уже известных постов, у которых нужно перезапросить счетчики"""
+    if store is None:
+        return []
+    return store.refresh_message_ids(channel.id, *period, full=refresh_only)
+
+def counter_rows(messages):
+    """Строки кэша для обновления счетчиков (удаленные и служебные сообщения пропускаются)"""
+    return [extract_post_row(message) for message in messages if message is not None and not message.action]
+
+def refresh_batches(message_ids):
+    """id постов для get_messages(ids=...) пачками по REFRESH_BATCH_SIZE"""
+    return [message_ids[i:i + REFRESH_BATCH_SIZE] for i in range(0, len(message_ids), REFRESH_BATCH_SIZE)]
+
+def save_counters(store, channel, messages):
+    """Обновляет в кэше счетчики пачки сообщений get_messages и возвращает количество постов"""
+    rows = counter_rows(messages)
+    store.update_counters(channel.id, rows)
+    return len(rows)
+
+def refresh_metrics(client, channel, store, message_ids, limiter=default_limiter):
+    """
+    Перезапрашивает просмотры, пересылки, реакции и комментарии известных постов
+    
+    Сообщения запрашиваются через get_messages(ids=...) пачками по
+    REFRESH_BATCH_SIZE id, в кэше обновляются только счетчики.
+    
+    Returns:
+        int: количество обновленных постов
+    """
+    batches = refresh_batches(message_ids)
+    updated = 0
+    for batch in batches:
+        messages = limiter.call('get_messages', client.get_messages, channel.input_peer, ids=batch)
+        updated += save_counters(store, channel, messages)
+    
+    print(f"🔄 Обновлены счетчики {updated} постов (запросов: {len(batches)})")
+    return updated
+
+async def refresh_metrics_async(client, channel, store, message_ids, limiter=default_limiter):
+    """Асинхронный вариант refresh_metrics"""
+    batches = refresh_batches(message_ids)
+    updated = 0
+    for batch in batches:
+        messages = await limiter.call_async('get_messages', client.get_messages, channel.input_peer, ids=batch)
+        updated += save_counters(store, channel, messages)
+    
+    print(f"🔄 Обновлены счетчики {updated} постов (запросов: {len(batches)})")
+    return updated
+
+def start_fetch(channel, store, refresh_only=False, top_k=None, merge_albums=MERGE_ALBUMS,
+                period=(start_date, end_date)):
+    """
+    Подготовка загрузки постов канала (общая для fetch_messages и fetch_messages_async)
+    
+    Returns:
+        tuple: (куда собирать посты, id постов для обновления счетчиков, аргументы iter_messages)
+    """
+    print(f"Анализируем канал: {channel.title}")
+    
+    # id известных постов для обновления счетчиков - до загрузки новых
+    refresh_ids = get_refresh_ids(store, channel, refresh_only, period)
+    return (new_accumulator(store, top_k, merge_albums), refresh_ids,
+            get_fetch_plans(store, channel, refresh_only, period))
+
+def new_accumulator(store, top_k=None, merge_albums=MERGE_ALBUMS):
+    """
+    Куда собирать загруженные посты: колонки для таблицы или только топ-K
+    
+    С кэшем сообщений загруженная дельта нужна целиком для записи в кэш,
+    а топ-K считается потом по всем постам периода из кэша.
+    """
+    if top_k and store is None:
+        return TopPosts(top_k, merge_albums)
+    return PostColumns()
+
+def merge_with_cache(store, channel, channel_username, posts, top_k=None, merge_albums=MERGE_ALBUMS,
+                     period=(start_date, end_date)):
+    """Сохраняет загруженную дельту в кэш и возвращает все посты периода из кэша"""
+    if store is None:
+        return posts
+    
+    store.save_posts(channel.id, channel_username, channel.title, list(posts.rows()), period[0])
+    print(f"💾 Кэш сообщений: загружено новых/обновленных сообщений: {len(posts)}")
+    if top_k:
+        return TopPosts.from_rows(store.iter_posts(channel.id, *period), top_k, merge_albums)
+    return store.load_posts(channel.id, *period)
+
+def top_posts_summary(top_posts, channel_username):
+    """Текст топ-постов потокового режима (без таблиц и отчетов)"""
+    print(f"Всего получено сообщений ({channel_username}): {len(top_posts)}")
+    if not top_posts:
+        print("Сообщения не найдены")
+        return ""
+    return top_posts.text()
+
+def normalize_windows(windows):
+    """
+    Окна анализа в виде списка (начало, конец)
+    
+    Args:
+        windows (list): пары datetime с часовым поясом или строки 'ГГГГ-ММ-ДД:ГГГГ-ММ-ДД' (parse_window)
+    """
+    if not windows:
+        return None
+    return [parse_window(window) if isinstance(window, str) else tuple(window) for window in windows]
+
+def analysis_period(windows=None):
+    """Период загрузки: от самого раннего начала окон до самого позднего конца (без окон - период config.py)"""
+    if not windows:
+        return start_date, end_date
+    return min(start for start, _ in windows), max(end for _, end in windows)
+
+def window_label(start, end):
+    """Название окна анализа (ключ результата и название листа Excel)"""
+    return f"{start.strftime('%d.%m.%Y')}-{end.strftime('%d.%m.%Y')}"
+
+def empty_result(windows):
+    """Результат канала без постов или с ошибкой загрузки: "" (при windows - "" для каждого окна)"""
+    return {window_label(start, end): "" for start, end in windows} if windows else ""
+
+def window_frames(frame, windows):
+    """
+    Посты каждого окна из общей таблицы - без повторной загрузки и пересчета метрик
+    
+    Returns:
+        dict: название окна -> (начало, конец, PostFrame окна в порядке строк frame)
+    """
+    return {window_label(start, end): (start, end, frame.between(start, end)) for start, end in windows}
+
+def windows_sheet(frames):
+    """Лист "Окна" сводного отчета: итоги, ER% и средняя виральность каждого окна"""
+    rows = []
+    for label, (_, _, window) in frames.items():
+        row = {'Окно': label, 'Постов': len(window)}
+        row.update({column: window.totals[column] for column in ('Просмотры', 'Реакции', 'Комменты', 'Пересылки')})
+        row['ER%'] = round(window.totals['ER%'], 2)
+        row['Средняя виральность'] = round(window.filled()['Виральность'].mean(), 2)
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+def process_messages(messages, channel_username, out_dir, merge_albums=MERGE_ALBUMS, windows=None,
+                     report_writer=None, report_format=REPORT_FORMAT):
+    """
+    Строит таблицу постов, считает метрики, сохраняет отчеты
+    
+    Args:
+        messages (PostColumns): посты канала за период
+        channel_username (str): username канала
+        out_dir (Path): папка канала в results/all_folders
+        merge_albums (bool): сводить альбомы в один пост (см. MERGE_ALBUMS)
+        windows (list): окна анализа (начало, конец) внутри загруженного периода -
+            для каждого окна считаются итоги и топ-посты, в posts.xlsx добавляется лист
+        report_writer (ReportWriter): пул фоновой записи файлов Excel (по умолчанию -
+            запись до возврата из функции)
+        report_format (str): формат отчетов - 'excel', 'csv' или 'jsonl' (см. REPORT_FORMAT)
         
-        # Вычисляем виральность
-        df['Виральность'] = df.apply(calculate_virality, axis=1)
-        df['Коэффициент виральности'] = df.apply(calculate_viral_coefficient, axis=1)
-        df['Виральность вовлеченности'] = df.apply(calculate_engagement_virality, axis=1)
+    Returns:
+        str: Текст из топ-5 постов по виральности (при windows - dict {окно: текст})
+    """
+    print(f"Всего получено сообщений: {len(messages)}")
+    period_start, period_end = analysis_period(windows)
+    report_writer = report_writer or ReportWriter(workers=0)
+    
+    if not messages:
+        print("Сообщения не найдены")
+        return empty_result(windows)
+    
+    # Альбом - один пост: подпись, максимум просмотров, сумма реакций и пересылок
+    if merge_albums:
+        messages = messages.merge_albums()
+        print(f"Постов после объединения альбомов: {len(messages)}")
+    
+    # Создаем DataFrame из колонок (счетчики не копируются)
+    df = messages.to_dataframe()
+    
+    # Фильтрация по only_text
+    if only_text:
+        df = df[df['Тип'] == 'Текст'].reset_index(drop=True)
+    
+    # Новые посты сначала (дата - datetime64, сортировка хронологическая)
+    df = df.sort_values(by='Дата', ascending=False, kind='stable').reset_index(drop=True)
+    
+    # Вычисляем ER% и виральность: только метрики, нужные stat_tables и SORT_BY_VIRALITY (см. metrics.py)
+    metric_keys = required_metrics()
+    df = add_metrics(df, metric_keys)
+    
+    # Таблица постов с итогами и средними отдельно от строк (в Excel они добавляются при записи)
+    frame = PostFrame(df, metric_keys)
+    
+    # Сортировка по выбранному типу виральности
+    frame = frame.take(sort_permutation(frame.df, SORT_BY_VIRALITY))
+    
+    # Файлы канала пишутся по одному разу в out_dir; файл, входы которого (таблица постов,
+    # период, параметры отчета) не изменились с прошлого анализа, не перезаписывается
+    layout = ChannelOutput(out_dir)
+    post_table = input_hash(frame)
+    period = (period_start, period_end)
+    
+    # Таблица постов с типами колонок для повторного чтения (Excel - только для просмотра)
+    if SAVE_POSTS_PARQUET:
+        layout.write(report_writer, PARQUET_FILENAME, (post_table,), save_posts_parquet, frame, out_dir)
+    
+    # Посты канала в общем наборе всех каналов (прежние посты канала заменяются)
+    if UPDATE_POST_DATASET:
+        PostDataset().append(channel_username, frame)
+    
+    # Окна анализа - срезы общей таблицы (порядок строк и метрики уже готовы)
+    frames = window_frames(frame, windows) if windows else {}
+    for label, (_, _, window) in frames.items():
+        print(f"📅 Окно {label}: постов {len(window)}, ER% {window.totals['ER%']:.2f}")
+    
+    # Файлы пишет report_writer: таблицы frame и frames дальше не меняются.
+    # Сохраняем основной файл (листы окон - после общей таблицы);
+    # в режиме SINGLE_WORKBOOK все листы пишутся одной книгой после расчета трендов
+    if not SINGLE_WORKBOOK:
+        layout.write(report_writer, report_filename('posts.xlsx', report_format),
+                     (post_table, period, list(frames)),
+                     create_posts_file, frame, channel_username, period_start, period_end, frames,
+                     report_format, out_dir)
+    
+    # Создание дополнительных файлов с разными типами сортировки
+    sort_types = [sort_type for sort_type, enabled in stat_tables.items() if enabled]
+    if CREATE_MULTIPLE_SORTED_FILES and not SINGLE_WORKBOOK:
+        print("\nСоздание файлов с разными типами сортировки по виральности...")
+        layout.write(report_writer, report_filename('posts_sorted_by_*.xlsx', report_format),
+                     (post_table, period, sort_types),
+                     create_multiple_sorted_files, frame, channel_username, period_start, period_end,
+                     report_format, out_dir)
+    
+    # Вывод статистики по виральности
+    if SHOW_VIRALITY_STATISTICS:
+        print_virality_statistics(frame)
+    
+    # Тренды по неделям и месяцам (в сводный отчет и хранилище трендов)
+    trends = None
+    if CREATE_TREND_REPORT:
+        trends = channel_trends(frame)
+        TrendStore().save(channel_username, trends)
+    # Таблицы трендов хэшируются по значениям, вместе с названиями периодов
+    trend_tables = [list(trends or {}), *(trends or {}).values()]
+    
+    # Одна книга на канал или отдельный сводный отчет по виральности
+    if SINGLE_WORKBOOK:
+        layout.write(report_writer, report_filename('posts.xlsx', report_format),
+                     (post_table, period, list(frames), sort_types, 'workbook', *trend_tables),
+                     create_channel_workbook, frame, channel_username, period_start, period_end, trends,
+                     frames, report_format, out_dir)
+    elif CREATE_VIRALITY_SUMMARY_REPORT:
+        layout.write(report_writer, report_filename('virality_summary_report.xlsx', report_format),
+                     (post_table, period, list(frames), *trend_tables),
+                     create_virality_summary_report, frame, channel_username, period_start, period_end,
+                     trends, frames, report_format, out_dir)
+    
+    # Формируем строку с текстами из топ-5 постов
+    if windows:
+        return {label: window.top_text(TOP_POSTS_COUNT) for label, (_, _, window) in frames.items()}
+    return frame.top_text(TOP_POSTS_COUNT)
+
+def resolve_channel(client, channel_username, limiter, entity_cache):
+    """
+    Канал из кэша username или через get_entity (ResolveUsername)
+    
+    Returns:
+        tuple: (ResolvedChannel, взят ли он из кэша)
+    """
+    channel = entity_cache.get(channel_username)
+    if channel is not None:
+        return channel, True
+    
+    entity = limiter.call('get_entity', client.get_entity, channel_username)
+    return remember_channel(entity_cache, channel_username, entity), False
+
+async def resolve_channel_async(client, channel_username, limiter, entity_cache):
+    """Асинхронный вариант resolve_channel"""
+    channel = entity_cache.get(channel_username)
+    if channel is not None:
+        return channel, True
+    
+    entity = await limiter.call_async('get_entity', client.get_entity, channel_username)
+    return remember_channel(entity_cache, channel_username, entity), False
+
+def remember_channel(entity_cache, channel_username, entity):
+    """Сохраняет разрешенный username в кэш и возвращает канал для запросов"""
+    channel = ResolvedChannel.from_entity(entity)
+    entity_cache.put(channel_username, channel)
+    return channel
+
+def forget_stale_channel(entity_cache, channel_username):
+    """Удаляет из кэша канал, peer которого перестал работать, чтобы разрешить username заново"""
+    print(f"♻️ Закэшированный канал {channel_username} недействителен, разрешаем username заново")
+    entity_cache.invalidate(channel_username)
+
+def fetch_messages(client, channel, channel_username, store, limiter, refresh_only=False, top_k=None,
+                   merge_albums=MERGE_ALBUMS, period=(start_date, end_date)):
+    """
+    Загружает посты канала за период (при включенном кэше - только дельту)
+    
+    Args:
+        top_k (int): не строить таблицу, а оставить только top_k самых виральных постов
+        merge_albums (bool): в режиме top_k оценивать альбом одним постом
+        period (tuple): (начало, конец) загрузки - по умолчанию период config.py
+    
+    Returns:
+        PostColumns: посты периода для process_messages (TopPosts при top_k)
+    """
+    posts, refresh_ids, plans = start_fetch(channel, store, refresh_only, top_k, merge_albums, period)
+    
+    # Получаем сообщения за указанный период (при включенном кэше - только новые)
+    for plan in plans:
+        for message in limiter.iterate('iter_messages', client.iter_messages(channel.input_peer, **plan)):
+            if not collect_message(message, posts, period[1]):
+                break
+    
+    if refresh_ids:
+        refresh_metrics(client, channel, store, refresh_ids, limiter)
+    
+    return merge_with_cache(store, channel, channel_username, posts, top_k, merge_albums, period)
+
+async def fetch_messages_async(client, channel, channel_username, store, limiter, refresh_only=False, top_k=None,
+                               merge_albums=MERGE_ALBUMS, period=(start_date, end_date)):
+    """Асинхронный вариант fetch_messages"""
+    posts, refresh_ids, plans = start_fetch(channel, store, refresh_only, top_k, merge_albums, period)
+    
+    for plan in plans:
+        async for message in limiter.iterate_async('iter_messages', client.iter_messages(channel.input_peer, **plan)):
+            if not collect_message(message, posts, period[1]):
+                break
+    
+    if refresh_ids:
+        await refresh_metrics_async(client, channel, store, refresh_ids, limiter)
+    
+    return merge_with_cache(store, channel, channel_username, posts, top_k, merge_albums, period)
+
+def fetch_channel(client, channel_username, store, limiter, refresh_only=False, entity_cache=default_entity_cache,
+                  top_k=None, merge_albums=MERGE_ALBUMS, period=(start_date, end_date)):
+    """
+    Разрешает канал (через кэш username) и загружает его посты
+    
+    Если закэшированный peer перестал работать, запись удаляется
+    и username разрешается заново.
+    """
+    channel, cached = resolve_channel(client, channel_username, limiter, entity_cache)
+    try:
+        return fetch_messages(client, channel, channel_username, store, limiter, refresh_only, top_k, merge_albums,
+                              period)
+    except STALE_PEER_ERRORS:
+        if not cached:
+            raise
+        forget_stale_channel(entity_cache, channel_username)
+        channel, _ = resolve_channel(client, channel_username, limiter, entity_cache)
+        return fetch_messages(client, channel, channel_username, store, limiter, refresh_only, top_k, merge_albums,
+                              period)
+
+async def fetch_channel_async(client, channel_username, store, limiter, refresh_only=False,
+                              entity_cache=default_entity_cache, top_k=None, merge_albums=MERGE_ALBUMS,
+                              period=(start_date, end_date)):
+    """Асинхронный вариант fetch_channel"""
+    channel, cached = await resolve_channel_async(client, channel_username, limiter, entity_cache)
+    try:
+        return await fetch_messages_async(client, channel, channel_username, store, limiter, refresh_only, top_k,
+                                          merge_albums, period)
+    except STALE_PEER_ERRORS:
+        if not cached:
+            raise
+        forget_stale_channel(entity_cache, channel_username)
+        channel, _ = await resolve_channel_async(client, channel_username, limiter, entity_cache)
+        return await fetch_messages_async(client, channel, channel_username, store, limiter, refresh_only, top_k,
+                                          merge_albums, period)
+
+class ChannelAnalysis:
+    """
+    Общая часть analyse_with_client и analyse_async - все, кроме запросов к Telegram
+    
+    Проверка параметров, период загрузки, папка канала, разбор ошибок загрузки
+    (повтор после FloodWait) и построение отчетов; варианты анализа отличаются
+    только тем, дожидаются ли они fetch_channel или fetch_channel_async.
+    """
+    
+    def __init__(self, channel_url, refresh_only=False, limiter=None, entity_cache=None, top_only=False,
+                 merge_albums=MERGE_ALBUMS, windows=None, report_writer=None, report_format=REPORT_FORMAT):
+        self.windows = normalize_windows(windows)
+        if self.windows and top_only:
+            raise ValueError("Окна анализа строятся по таблице постов и не поддерживаются в режиме top_only")
+        # Неизвестный формат отчетов - ошибка до загрузки сообщений, а не при записи
+        get_report_format(report_format)
+        self.period = analysis_period(self.windows)
         
-        # Сортировка по выбранному типу виральности
-        df = sort_by_virality(df, SORT_BY_VIRALITY)
+        # Извлекаем username из ссылки
+        self.channel_username = parse_channel_username(channel_url)
         
-        # Добавляем итоговую строку
-        total_row = {
-            'Дата': 'Итого',
-            'Полный_текст': '',
-            'Тип': '',
-            'Просмотры': df['Просмотры'].sum(),
-            'Реакции': df['Реакции'].sum(),
-            'Всего (+)': df['Всего (+)'].sum(),
-            'Всего (-)': df['Всего (-)'].sum(),
-            'Всего': df['Всего'].sum(),
-            'Комменты': df['Комменты'].sum(),
-            'Пересылки': df['Пересылки'].sum(),
-            'ER%': (df['Реакции'].sum() + df['Комменты'].sum() + df['Пересылки'].sum()) / df['Просмотры'].sum() * 100 if df['Просмотры'].sum() > 0 else 0,
-            'Виральность': df['Виральность'].sum(),
-            'Коэффициент виральности': df['Коэффициент виральности'].sum(),
-            'Виральность вовлеченности': df['Виральность вовлеченности'].sum()
-        }
+        # Создаем папку для результатов в results/all_folders (в потоковом режиме файлов нет)
+        self.out_dir = Path(CHANNELS_DIR) / self.channel_username
+        if not top_only:
+            self.out_dir.mkdir(parents=True, exist_ok=True)
         
-        # Добавляем строку со средними значениями
-        avg_row = {
-            'Дата': 'В среднем на пост',
-            'Полный_текст': '',
-            'Тип': '',
-            'Просмотры': df['Просмотры'].mean(),
-            'Реакции': df['Реакции'].mean(),
-            'Всего (+)': df['Всего (+)'].mean(),
-            'Всего (-)': df['Всего (-)'].mean(),
-            'Всего': df['Всего'].mean(),
-            'Комменты': df['Комменты'].mean(),
-            'Пересылки': df['Пересылки'].mean(),
-            'ER%': df['ER%'].mean(),
-            'Виральность': df['Виральность'].mean(),
-            'Коэффициент виральности': df['Коэффициент виральности'].mean(),
-            'Виральность вовлеченности': df['Виральность вовлеченности'].mean()
+        self.store = MessageStore() if USE_MESSAGE_CACHE else None
+        self.limiter = limiter or default_limiter
+        self.entity_cache = entity_cache or default_entity_cache
+        self.refresh_only = refresh_only
+        self.top_only = top_only
+        self.merge_albums = merge_albums
+        self.report_writer = report_writer
+        self.report_format = report_format
+    
+    def fetch_arguments(self):
+        """Аргументы fetch_channel / fetch_channel_async (кроме клиента)"""
+        return {
+            'channel_username': self.channel_username,
+            'store': self.store,
+            'limiter': self.limiter,
+            'refresh_only': self.refresh_only,
+            'entity_cache': self.entity_cache,
+            'top_k': TOP_POSTS_COUNT if self.top_only else None,
+            'merge_albums': self.merge_albums,
+            'period': self.period,
         }
+    
+    def fetch_failed(self, error, attempt, raise_flood_wait=False):
+        """
+        Разбирает ошибку загрузки канала
         
-        # Добавляем итоговые строки
-        df = pd.concat([df, pd.DataFrame([total_row, avg_row])], ignore_index=True)
-        
-        # Сохраняем основной файл
-        save_to_excel(df, 'posts.xlsx', channel_username, start_date, end_date)
-        
-        # Создание дополнительных файлов с разными типами сортировки
-        if CREATE_MULTIPLE_SORTED_FILES:
-            print("\nСоздание файлов с разными типами сортировки по виральности...")
-            # Переопределяем save_to_excel для сохранения в out_dir (temporary override)
-            def save_to_excel_dir(df, filename, channel_username, start_date, end_date):
-                # Сохраняем в папку канала в results/all_folders
-                file_path = out_dir / filename
-                # Создаем временную функцию для сохранения в конкретную папку
-                def save_to_excel_temp(df, filename, channel_username, start_date, end_date):
-                    wb = Workbook()
-                    ws = wb.active
-                    ws.title = "Posts"
-                    
-                    # Добавляем данные
-                    for r in dataframe_to_rows(df, index=False, header=True):
-                        ws.append(r)
-                    
-                    # Форматирование заголовков
-                    header_font = Font(bold=True, color="FFFFFF")
-                    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-                    header_alignment = Alignment(horizontal="center", vertical="center")
-                    
-                    for cell in ws[1]:
-                        cell.font = header_font
-                        cell.fill = header_fill
-                        cell.alignment = header_alignment
-                    
-                    # Автоматическая ширина столбцов
-                    for column in ws.columns:
-                        max_length = 0
-                        column_letter = column[0].column_letter
-                        for cell in column:
-                            try:
-                                if len(str(cell.value)) > max_length:
-                                    max_length = len(str(cell.value))
-                            except:
-                                pass
-                        adjusted_width = min(max_length + 2, 50)
-                        ws.column_dimensions[column_letter].width = adjusted_width
-                    
-                    # Закрепляем заголовки
-                    ws.freeze_panes = "A2"
-                    
-                    # Добавляем информацию о канале и периоде
-                    ws.insert_rows(1, 3)
-                    ws['A1'] = f"Канал: {channel_username}"
-                    ws['A2'] = f"Период: {start_date.strftime('%d.%m.%Y')} - {end_date.strftime('%d.%m.%Y')}"
-                    ws['A3'] = f"Всего постов: {len(df)}"
-                    
-                    # Сохраняем файл
-                    wb.save(file_path)
-                    print(f"Файл сохранен: {file_path}")
-                
-                save_to_excel_temp(df, filename, channel_username, start_date, end_date)
-            
-            # Сохраняем оригинальную функцию и заменяем её
-            old_save_to_excel = save_to_excel
-            save_to_excel = save_to_excel_dir
-            create_multiple_sorted_files(df, channel_username, start_date, end_date)
-            save_to_excel = old_save_to_excel  # Restore original save_to_excel
-            print("Все файлы созданы успешно!")
-        
-        # Вывод статистики по виральности
-        if SHOW_VIRALITY_STATISTICS:
-            print_virality_statistics(df)
+        После FloodWait канал повторяется (ограничитель выждет нужное время),
+        а не считается неудачным - пока не исчерпаны FLOOD_WAIT_MAX_RETRIES попыток.
         
-        # Создание сводного отчета по виральности
-        if CREATE_VIRALITY_SUMMARY_REPORT:
-            create_virality_summary_report(df, channel_username, start_date, end_date)
+        Args:
+            attempt (int): номер попытки с 0
+            raise_flood_wait (bool): пробросить FloodWait (канал заберет другой аккаунт пула)
         
-        # Формируем строку с текстами из топ-5 постов
-        top_posts_text = ""
+        Returns:
+            None - повторить загрузку, иначе результат канала с ошибкой (empty_result)
+        """
+        if isinstance(error, FloodWaitError):
+            if raise_flood_wait:
+                raise error
+            if attempt < FLOOD_WAIT_MAX_RETRIES:
+                print(f"🔁 Повтор канала {self.channel_username} после FloodWait "
+                      f"({attempt + 1}/{FLOOD_WAIT_MAX_RETRIES})")
+                return None
+            print(f"Ошибка при получении сообщений ({self.channel_username}): "
+                  f"FloodWait {error.seconds} с, попытки исчерпаны")
+        else:
+            print(f"Ошибка при получении сообщений ({self.channel_username}): {error}")
+            print(f"Тип ошибки: {type(error).__name__}")
+        return empty_result(self.windows)
+    
+    def finish(self, messages):
+        """Текст топ-постов для AI: в потоковом режиме сразу, иначе - после таблиц и отчетов канала"""
+        if self.top_only:
+            return top_posts_summary(messages, self.channel_username)
+        return process_messages(messages, self.channel_username, self.out_dir, self.merge_albums, self.windows,
+                                self.report_writer, self.report_format)
+
+def analyse_with_client(client, channel_url, refresh_only=False, limiter=None, entity_cache=None,
+                        top_only=False, merge_albums=MERGE_ALBUMS, windows=None, report_writer=None,
+                        report_format=REPORT_FORMAT):
+    """
+    Анализ канала через уже подключенный TelegramClient
+    
+    Используется в пакетном анализе, где одно подключение (TelegramSession)
+    обслуживает все каналы без повторного handshake для каждого.
+    
+    Args:
+        client: подключенный TelegramClient
+        channel_url (str): URL канала для анализа
+        refresh_only (bool): не загружать новые сообщения, а только обновить
+            счетчики всех постов периода из кэша и пересчитать виральность
+        limiter (AdaptiveRateLimiter): ограничитель запросов аккаунта
+            (по умолчанию - общий default_limiter)
+        entity_cache (EntityCache): кэш username аккаунта (по умолчанию - default_entity_cache)
+        top_only (bool): только текст топ-постов для AI - посты оцениваются по мере
+            загрузки, таблицы и отчеты не строятся (см. TOP_POSTS_ONLY)
+        merge_albums (bool): альбом - один пост (см. MERGE_ALBUMS)
+        windows (list): окна анализа - пары (начало, конец) или строки 'ГГГГ-ММ-ДД:ГГГГ-ММ-ДД';
+            посты загружаются один раз от самого раннего начала до самого позднего конца
+        report_writer (ReportWriter): пул фоновой записи отчетов - функция возвращается,
+            не дожидаясь файлов Excel (по умолчанию они записываются до возврата)
+        report_format (str): формат отчетов: 'excel', 'csv' или 'jsonl' (см. report_formats.py)
         
-        # Исключаем итоговые строки для получения топ-5
-        df_for_top = df[~df['Дата'].isin(['Итого', 'В среднем на пост'])].copy()
+    Returns:
+        str: Текст из топ-5 постов по виральности (при windows - dict {окно: текст})
+    """
+    job = ChannelAnalysis(channel_url, refresh_only, limiter, entity_cache, top_only, merge_albums, windows,
+                          report_writer, report_format)
+    
+    for attempt in range(FLOOD_WAIT_MAX_RETRIES + 1):
+        try:
+            messages = fetch_channel(client, **job.fetch_arguments())
+            break
+        except Exception as e:
+            result = job.fetch_failed(e, attempt)
+            if result is not None:
+                return result
+    
+    return job.finish(messages)
+
+def analyse(channel_url, windows=None, report_format=REPORT_FORMAT):
+    """
+    Основная функция анализа канала Telegram
+    
+    Args:
+        channel_url (str): URL канала для анализа (например, "https://t.me/sellerx")
+        windows (list): окна анализа, например ['2025-06-01:2025-06-30', '2025-01-01:2025-12-31'] -
+            сообщения загружаются один раз, итоги и топ-посты считаются по каждому окну
+        report_format (str): формат отчетов: 'excel', 'csv' или 'jsonl'
         
-        if len(df_for_top) > 0:
-            # Получаем топ-5 по виральности
-            top_5_posts = df_for_top.nlargest(5, 'Виральность')
-            
-            for i, (_, row) in enumerate(top_5_posts.iterrows(), 1):
-                post_text = row.get('Полный_текст', '')
-                if post_text and post_text.strip():
-                    top_posts_text += f"текст {i}:\n{post_text.strip()}\n\n"
+    Returns:
+        str: Текст из топ-5 постов по виральности в формате "текст 1: текст\nтекст 2: текст\n..."
+            (при windows - dict {окно 'дд.мм.гггг-дд.мм.гггг': текст})
+    """
+    session = TelegramSession()
+    with session as client:
+        return analyse_with_client(client, channel_url, limiter=session.limiter,
+                                   entity_cache=session.entity_cache, windows=windows, report_format=report_format)
+
+async def analyse_async(channel_url, client, report_lock=None, refresh_only=False, limiter=None,
+                        entity_cache=None, raise_flood_wait=False, top_only=False, merge_albums=MERGE_ALBUMS,
+                        windows=None, report_writer=None, report_format=REPORT_FORMAT):
+    """
+    Асинхронный вариант analyse для одновременного анализа нескольких каналов
+    
+    Args:
+        channel_url (str): URL канала для анализа
+        client: подключенный TelegramClient, используемый внутри event loop
+        report_lock (asyncio.Lock): блокировка обработки каналов (общий набор постов и хранилище трендов)
+        refresh_only (bool): только обновить счетчики постов из кэша (см. analyse_with_client)
+        limiter (AdaptiveRateLimiter): ограничитель запросов аккаунта
+        entity_cache (EntityCache): кэш username аккаунта
+        raise_flood_wait (bool): не ждать FloodWait, а пробросить его - канал
+            заберет другой аккаунт пула (см. SessionPool)
+        top_only (bool): только текст топ-постов, без таблиц и отчетов (см. analyse_with_client)
+        merge_albums (bool): альбом - один пост (см. MERGE_ALBUMS)
+        windows (list): окна анализа из одной загрузки (см. analyse_with_client)
+        report_writer (ReportWriter): пул фоновой записи отчетов (см. analyse_with_client)
+        report_format (str): формат отчетов (см. analyse_with_client)
         
-        return top_posts_text 
\ No newline at end of file
+    Returns:
+        str: Текст из топ-5 постов по виральности (при windows - dict {окно: текст})
+    """
+    job = ChannelAnalysis(channel_url, refresh_only, limiter, entity_cache, top_only, merge_albums, windows,
+                          report_writer, report_format)
+    
+    for attempt in range(FLOOD_WAIT_MAX_RETRIES + 1):
+        try:
+            messages = await fetch_channel_async(client, **job.fetch_arguments())
+            break
+        except Exception as e:
+            result = job.fetch_failed(e, attempt, raise_flood_wait)
+            if result is not None:
+                return result
+    
+    if top_only:
+        return job.finish(messages)
+    
+    # Построение таблиц выполняется в отдельном потоке, чтобы не блокировать загрузку
+    # остальных каналов; запись Excel при report_writer продолжается в фоне
+    if report_lock is None:
+        return await asyncio.to_thread(job.finish, messages)
+    async with report_lock:
+        return await asyncio.to_thread(job.finish, messages)
@@ -19,11 +19,16 @@ from pathlib import Path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'config'))
 sys.path.append(os.path.dirname(__file__))
 
+from config import RESULTS_DIR, CHANNELS_DIR
+from post_frame import post_count
+
 class AnalysisController:
     """Контроллер для управления процессом анализа"""
     
     def __init__(self):
-        self.results_dir = '../results'
+        # Папки results и каналов - те же, куда пишут main.py и analyse.py
+        self.results_dir = RESULTS_DIR
+        self.channels_dir = CHANNELS_DIR
         self.checkpoint_file = f'{self.results_dir}/analysis_checkpoint.json'
         self.results_file = f'{self.results_dir}/analysis_results.csv'
         self.backup_dir = f'{self.results_dir}/backups'
@@ -97,7 +102,7 @@ class AnalysisController:
             print(f"  ✅ Checkpoint скопирован")
         
         # Копируем папку all_folders если есть
-        all_folders_path = f"{self.results_dir}/all_folders"
+        all_folders_path = self.channels_dir
         if os.path.exists(all_folders_path):
             shutil.copytree(all_folders_path, f"{backup_path}/all_folders", dirs_exist_ok=True)
             print(f"  ✅ Папка all_folders скопирована")
@@ -130,9 +135,9 @@ class AnalysisController:
         # Восстанавливаем папку all_folders
         backup_all_folders = f"{backup_path}/all_folders"
         if os.path.exists(backup_all_folders):
-            if os.path.exists(f"{self.results_dir}/all_folders"):
-                shutil.rmtree(f"{self.results_dir}/all_folders")
-            shutil.copytree(backup_all_folders, f"{self.results_dir}/all_folders")
+            if os.path.exists(self.channels_dir):
+                shutil.rmtree(self.channels_dir)
+            shutil.copytree(backup_all_folders, self.channels_dir)
             print(f"  ✅ Папка all_folders восстановлена")
         
         print(f"✅ Backup восстановлен")
@@ -227,6 +232,13 @@ class AnalysisController:
                 print(f"❌ Ошибка чтения статистики: {e}")
         else:
             print("❌ Файл результатов не найден")
+        
+        # Таблицы постов каналов: количество строк из метаданных Parquet, колонки не читаются
+        all_folders = Path(self.channels_dir)
+        if all_folders.exists():
+            counts = [post_count(folder) for folder in all_folders.iterdir() if folder.is_dir()]
+            stored = [count for count in counts if count is not None]
+            print(f"\n📦 Таблицы постов (Parquet): {len(stored)} из {len(counts)} каналов, постов: {sum(stored):,}")
     
     def cleanup_old_backups(self, days=7):
         """Удаляет старые backup'ы"""
@@ -12,8 +12,11 @@ import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'config'))
 from ai import ask_ai
+from rate_limiter import AdaptiveRateLimiter
+from post_frame import load_post_frame, PARQUET_FILENAME, EXCEL_FILENAME
+from config import AI_REQUEST_INTERVAL, CHANNELS_DIR, RESULTS_DIR
 
-def save_result_to_csv(result, filename='../results/analysis_results_all_folders.csv'):
+def save_result_to_csv(result, filename=os.path.join(RESULTS_DIR, 'analysis_results_all_folders.csv')):
     """Сохраняет результат анализа в CSV файл сразу после каждого канала"""
     try:
         # Проверяем, существует ли файл
@@ -41,45 +44,39 @@ def save_result_to_csv(result, filename='../results/analysis_results_all_folders
     except Exception as e:
         print(f"❌ Ошибка при сохранении в CSV: {e}")
 
-def extract_top_posts_from_excel(folder_path):
-    """Извлекает топ-5 постов из Excel файла в папке канала"""
+# Колонки таблицы постов, нужные для топ-постов (остальные из Parquet не читаются)
+TOP_POSTS_COLUMNS = ['Полный_текст', 'Виральность']
+
+def extract_top_posts(folder_path):
+    """
+    Извлекает топ-5 постов из таблицы постов в папке канала
+    
+    Читается posts.parquet (только текст и виральность), а если его нет -
+    posts.xlsx от прежних запусков.
+    """
     try:
-        # Ищем файл posts.xlsx в папке
-        excel_file = folder_path / 'posts.xlsx'
-        if not excel_file.exists():
-            print(f"❌ Файл posts.xlsx не найден в {folder_path}")
+        frame = load_post_frame(folder_path, TOP_POSTS_COLUMNS)
+        if frame is None:
+            print(f"❌ Файлы {PARQUET_FILENAME} и {EXCEL_FILENAME} не найдены в {folder_path}")
             return ""
         
-        # Читаем Excel файл
-        df = pd.read_excel(excel_file)
-        
-        # Исключаем итоговые строки
-        df = df[~df['Дата'].isin(['Итого', 'В среднем на пост'])].copy()
-        
-        if len(df) == 0:
-            print(f"❌ Нет данных в файле {excel_file}")
+        if len(frame) == 0:
+            print(f"❌ Нет данных в таблице постов {folder_path}")
             return ""
         
-        # Получаем топ-5 по виральности
-        top_5_posts = df.nlargest(5, 'Виральность')
-        
-        # Формируем текст для AI
-        top_posts_text = ""
-        for i, (_, row) in enumerate(top_5_posts.iterrows(), 1):
-            post_text = row.get('Полный_текст', '')
-            if post_text and post_text.strip():
-                top_posts_text += f"текст {i}:\n{post_text.strip()}\n\n"
+        # Получаем топ-5 по виральности и формируем текст для AI
+        top_posts_text = frame.top_text(5)
         
         return top_posts_text
         
     except Exception as e:
-        print(f"❌ Ошибка при чтении Excel файла {folder_path}: {e}")
+        print(f"❌ Ошибка при чтении таблицы постов {folder_path}: {e}")
         return ""
 
 def analyze_all_folders():
     """Анализирует все каналы в папке all_folders через AI"""
     
-    all_folders_path = Path('../results/all_folders')
+    all_folders_path = Path(CHANNELS_DIR)
     if not all_folders_path.exists():
         print("❌ Папка all_folders не найдена!")
         return
@@ -90,16 +87,22 @@ def analyze_all_folders():
     
     results = []
     
+    # Не чаще одного запроса к AI в AI_REQUEST_INTERVAL секунд
+    ai_limiter = AdaptiveRateLimiter(rate=1 / AI_REQUEST_INTERVAL, burst=1, method_rates={})
+    
     for index, folder in enumerate(folders, 1):
+        # Пауза между каналами: время на чтение Excel и запрос к AI уже засчитано
+        ai_limiter.wait('ask_ai')
+        
         channel_name = folder.name
         print(f"\n{'='*60}")
         print(f"АНАЛИЗ КАНАЛА {index}/{len(folders)}: {channel_name}")
         print(f"{'='*60}")
         
         try:
-            # Извлекаем топ-5 постов из Excel файла
-            print(f"📊 Читаем данные из {folder}/posts.xlsx...")
-            top_posts_text = extract_top_posts_from_excel(folder)
+            # Извлекаем топ-5 постов из таблицы постов канала
+            print(f"📊 Читаем данные из {folder}...")
+            top_posts_text = extract_top_posts(folder)
             
             if top_posts_text:
                 print(f"✅ Получено {len(top_posts_text.split('текст')) - 1} постов для анализа")
@@ -175,12 +178,6 @@ def analyze_all_folders():
             save_result_to_csv(result)
             results.append(result)
         
-        # Пауза между запросами
-        if index < len(folders):
-            print("Пауза 1.5 секунды...")
-            import time
-            time.sleep(1.5)
-    
     # Финальная статистика
     print(f"\n{'='*60}")
     print(f"✅ АНАЛИЗ ЗАВЕРШЕН!")
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Бенчмарки обработки постов на синтетических данных (без Telegram)
+
+Запуск:
+    python files/code/benchmark.py accumulator --posts 100000
+    python files/code/benchmark.py metrics --posts 1000 100000 1000000
+    python files/code/benchmark.py excel --posts 1000 10000 50000
+    python files/code/benchmark.py formats --posts 10000 50000
+
+Варианты накопления запускаются в отдельных процессах, чтобы пиковый
+RSS одного варианта не влиял на измерение другого.
+"""
+
+import io
+import os
+import sys
+import time
+import random
+import argparse
+import subprocess
+import resource
+import tempfile
+import tracemalloc
+import contextlib
+from pathlib import Path
+from datetime import datetime, timezone, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'config'))
+sys.path.append(os.path.dirname(__file__))
+
+import numpy as np
+import pandas as pd
+from post_columns import PostColumns, CONTENT_TYPES
+from openpyxl import Workbook
+from openpyxl.styles import Font, PatternFill, Alignment
+from openpyxl.utils.dataframe import dataframe_to_rows
+from metrics import add_metrics, required_metrics
+from post_frame import PostFrame
+from report_formats import REPORT_FORMATS
+from analyse import (
+    calculate_er_percentage, calculate_virality, calculate_viral_coefficient, calculate_engagement_virality,
+    save_to_excel
+)
+
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def synthetic_rows(count, seed=1):
+    """Строки постов в формате extract_post_row со случайными счетчиками"""
+    rnd = random.Random(seed)
+    words = ['маркетплейс', 'продажи', 'карточка', 'отзывы', 'склад', 'логистика', 'реклама', 'цена']
+    for message_id in range(1, count + 1):
+        date = START + timedelta(minutes=17 * message_id)
+        text = ' '.join(rnd.choice(words) for _ in range(rnd.randint(10, 60)))
+        reactions = rnd.randint(0, 300)
+        positive = rnd.randint(0, reactions)
+        yield (message_id, int(date.timestamp()), None, text, rnd.choice(CONTENT_TYPES),
+               rnd.randint(100, 50000), reactions, positive, reactions - positive,
+               rnd.randint(0, 50), rnd.randint(0, 200))
+
+
+def build_dicts(count):
+    """Прежний способ: словарь на сообщение и DataFrame из списка словарей"""
+    messages = []
+    for row in synthetic_rows(count):
+        messages.append({
+            'Дата': datetime.fromtimestamp(row[1], tz=timezone.utc).strftime('%d.%m.%Y %H:%M'),
+            'Полный_текст': row[3],
+            'Тип': row[4],
+            'Просмотры': row[5],
+            'Реакции': row[6],
+            'Всего (+)': row[7],
+            'Всего (-)': row[8],
+            'Всего': row[6],
+            'Комменты': row[9],
+            'Пересылки': row[10]
+        })
+    return pd.DataFrame(messages)
+
+
+def build_columns(count):
+    """Колоночное накопление PostColumns"""
+    posts = PostColumns()
+    for row in synthetic_rows(count):
+        posts.append(row)
+    return posts.to_dataframe()
+
+
+ACCUMULATORS = {'dicts': build_dicts, 'columns': build_columns}
+
+
+def peak_rss_mb():
+    """Пиковый RSS текущего процесса в МБ (ru_maxrss: КБ в Linux, байты в macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+def run_variant(name, count):
+    """Выполняет один вариант в текущем процессе и печатает результат"""
+    baseline = peak_rss_mb()
+    started = time.perf_counter()
+    df = ACCUMULATORS[name](count)
+    elapsed = time.perf_counter() - started
+    print(f"{name}\t{len(df)}\t{elapsed:.2f}\t{peak_rss_mb() - baseline:.1f}")
+
+
+def benchmark_accumulator(count):
+    """Сравнивает время и прирост пикового RSS для каждого способа накопления"""
+    print(f"📏 Накопление {count} постов")
+    print(f"{'Вариант':<10}{'Время, с':>10}{'Пик RSS, МБ':>14}")
+    for name in ACCUMULATORS:
+        output = subprocess.run(
+            [sys.executable, __file__, 'accumulator', '--posts', str(count), '--variant', name],
+            capture_output=True, text=True, check=True
+        ).stdout.strip().split('\t')
+        print(f"{name:<10}{float(output[2]):>10.2f}{float(output[3]):>14.1f}")
+
+
+def synthetic_counters(count, seed=1):
+    """Таблица счетчиков постов (без текстов) для бенчмарка метрик"""
+    rng = np.random.default_rng(seed)
+    reactions = rng.integers(0, 300, count)
+    positive = rng.integers(0, reactions + 1)
+    return pd.DataFrame({
+        'Просмотры': rng.integers(0, 50000, count),
+        'Реакции': reactions,
+        'Всего (+)': positive,
+        'Всего (-)': reactions - positive,
+        'Комменты': rng.integers(0, 50, count),
+        'Пересылки': rng.integers(0, 200, count),
+    })
+
+
+def metrics_apply(df):
+    """Прежний расчет: четыре построчных df.apply"""
+    df['ER%'] = df.apply(calculate_er_percentage, axis=1)
+    df['Виральность'] = df.apply(calculate_virality, axis=1)
+    df['Коэффициент виральности'] = df.apply(calculate_viral_coefficient, axis=1)
+    df['Виральность вовлеченности'] = df.apply(calculate_engagement_virality, axis=1)
+    return df
+
+
+def benchmark_metrics(counts):
+    """Сравнивает время построчного и векторного расчета метрик"""
+    print(f"{'Постов':>10}{'df.apply, с':>14}{'NumPy, с':>12}{'Ускорение':>12}")
+    for count in counts:
+        df = synthetic_counters(count)
+        timings = []
+        for compute in (metrics_apply, add_metrics):
+            started = time.perf_counter()
+            with np.errstate(divide='ignore', invalid='ignore'):
+                compute(df.copy())
+            timings.append(time.perf_counter() - started)
+        print(f"{count:>10}{timings[0]:>14.3f}{timings[1]:>12.4f}{timings[0] / timings[1]:>11.0f}x")
+
+
+def excel_legacy(df, path, channel_username='channel'):
+    """Прежняя запись Excel: построчно, ширина через str(cell.value) по каждой ячейке, сдвиг insert_rows"""
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Posts"
+    for r in dataframe_to_rows(df, index=False, header=True):
+        ws.append(r)
+
+    header_font = Font(bold=True, color="FFFFFF")
+    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+    header_alignment = Alignment(horizontal="center", vertical="center")
+    for cell in ws[1]:
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.alignment = header_alignment
+
+    for column in ws.columns:
+        max_length = 0
+        column_letter = column[0].column_letter
+        for cell in column:
+            if len(str(cell.value)) > max_length:
+                max_length = len(str(cell.value))
+        ws.column_dimensions[column_letter].width = min(max_length + 2, 50)
+
+    ws.freeze_panes = "A2"
+    ws.insert_rows(1, 3)
+    ws['A1'] = f"Канал: {channel_username}"
+    ws['A2'] = f"Период: {START.strftime('%d.%m.%Y')} - {START.strftime('%d.%m.%Y')}"
+    ws['A3'] = f"Всего постов: {len(df)}"
+    wb.save(path)
+
+
+def excel_streaming(df, path):
+    """Потоковая запись save_to_excel (write-only, векторная ширина колонок)"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        save_to_excel(df, os.path.basename(path), 'channel', START, START, folder=os.path.dirname(path))
+
+
+def posts_table(count):
+    """Таблица постов с метриками и итоговыми строками, как в posts.xlsx"""
+    keys = required_metrics()
+    return PostFrame(add_metrics(build_columns(count), keys), keys).with_summary_rows()
+
+
+def benchmark_excel(counts):
+    """Сравнивает время и пик памяти Python (tracemalloc) прежней и потоковой записи Excel"""
+    print(f"{'Постов':>10}{'Прежняя, с':>13}{'Потоковая, с':>15}{'Ускорение':>12}"
+          f"{'Пик прежней, МБ':>18}{'Пик потоковой, МБ':>20}")
+    old_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='benchmark_excel_') as tmp:
+        os.chdir(tmp)
+        try:
+            for count in counts:
+                df = posts_table(count)
+                timings, peaks = [], []
+                for write in (excel_legacy, excel_streaming):
+                    path = os.path.join(tmp, f'{write.__name__}.xlsx')
+                    started = time.perf_counter()
+                    write(df, path)
+                    timings.append(time.perf_counter() - started)
+
+                    # Отдельный проход для памяти: tracemalloc замедляет запись
+                    tracemalloc.start()
+                    write(df, path)
+                    peaks.append(tracemalloc.get_traced_memory()[1] / 1024 / 1024)
+                    tracemalloc.stop()
+                print(f"{count:>10}{timings[0]:>13.2f}{timings[1]:>15.2f}{timings[0] / timings[1]:>11.1f}x"
+                      f"{peaks[0]:>18.1f}{peaks[1]:>20.1f}")
+        finally:
+            os.chdir(old_cwd)
+
+
+def benchmark_formats(counts):
+    """Сравнивает время записи и размер таблицы постов в форматах отчетов (report_formats.py)"""
+    print(f"{'Постов':>10}" + ''.join(f"{name + ', с':>12}{name + ', МБ':>12}" for name in REPORT_FORMATS))
+    keys = required_metrics()
+    with tempfile.TemporaryDirectory(prefix='benchmark_formats_') as tmp:
+        for count in counts:
+            frame = PostFrame(add_metrics(build_columns(count), keys), keys)
+            sheets = {'Posts': {'df': frame, 'start_date': START, 'end_date': START}}
+            line = f"{count:>10}"
+            for report_format in REPORT_FORMATS.values():
+                path = Path(tmp) / f'posts{report_format.extension}'
+                started = time.perf_counter()
+                report_format.save(path, 'channel', sheets)
+                line += f"{time.perf_counter() - started:>12.2f}{path.stat().st_size / 1024 / 1024:>12.1f}"
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарки обработки постов')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    accumulator = subparsers.add_parser('accumulator', help='Список словарей против PostColumns')
+    accumulator.add_argument('--posts', type=int, default=100000)
+    accumulator.add_argument('--variant', choices=sorted(ACCUMULATORS), help=argparse.SUPPRESS)
+
+    metrics = subparsers.add_parser('metrics', help='df.apply против векторного расчета метрик')
+    metrics.add_argument('--posts', type=int, nargs='+', default=[1000, 100000, 1000000])
+
+    excel = subparsers.add_parser('excel', help='Прежняя запись Excel против потоковой')
+    excel.add_argument('--posts', type=int, nargs='+', default=[1000, 10000, 50000])
+
+    formats = subparsers.add_parser('formats', help='Запись таблицы постов в Excel, CSV и JSONL')
+    formats.add_argument('--posts', type=int, nargs='+', default=[10000, 50000])
+
+    args = parser.parse_args()
+    if args.command == 'accumulator':
+        if args.variant:
+            run_variant(args.variant, args.posts)
+        else:
+            benchmark_accumulator(args.posts)
+    elif args.command == 'metrics':
+        benchmark_metrics(args.posts)
+    elif args.command == 'excel':
+        benchmark_excel(args.posts)
+    elif args.command == 'formats':
+        benchmark_formats(args.posts)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
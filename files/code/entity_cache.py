@@ -0,0 +1,134 @@
+"""
+Постоянный кэш username -> (id канала, access_hash, название)
+
+get_entity для username выполняет ResolveUsername - один из самых строго
+ограниченных методов Telegram. Кэш позволяет строить InputPeerChannel без
+повторного запроса; username заново разрешается только при промахе,
+истечении TTL или если закэшированный peer перестал работать.
+
+access_hash действителен только для аккаунта, который его получил,
+поэтому записи хранятся отдельно для каждого session-файла.
+"""
+
+import os
+import sys
+import json
+import threading
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'config'))
+
+from config import ENTITY_CACHE_PATH, ENTITY_CACHE_TTL_HOURS
+from telethon.tl.types import Channel, InputPeerChannel
+from telethon.errors import ChannelInvalidError, ChannelPrivateError, PeerIdInvalidError
+
+# Ошибки, после которых закэшированный peer считается недействительным
+STALE_PEER_ERRORS = (ChannelInvalidError, ChannelPrivateError, PeerIdInvalidError)
+
+
+class ResolvedChannel:
+    """Канал, готовый к запросам: id, название и input peer"""
+
+    def __init__(self, channel_id, access_hash, title, peer=None):
+        self.id = channel_id
+        self.access_hash = access_hash
+        self.title = title
+        self._peer = peer
+
+    @property
+    def input_peer(self):
+        if self._peer is not None:
+            return self._peer
+        return InputPeerChannel(self.id, self.access_hash)
+
+    @classmethod
+    def from_entity(cls, entity):
+        title = getattr(entity, 'title', None) or getattr(entity, 'username', '') or str(entity.id)
+        if isinstance(entity, Channel):
+            return cls(entity.id, entity.access_hash, title)
+        # Пользователи и обычные чаты не кэшируются - используем сущность как есть
+        return cls(entity.id, None, title, peer=entity)
+
+
+class EntityCache:
+    """JSON-файл с разрешенными username, отдельный раздел на каждый аккаунт"""
+
+    def __init__(self, path=ENTITY_CACHE_PATH, ttl_hours=ENTITY_CACHE_TTL_HOURS, session_name='session_name'):
+        self.path = path
+        self.ttl = timedelta(hours=ttl_hours) if ttl_hours is not None else None
+        self.session_name = session_name
+        # Содержимое файла и блокировка общие для всех аккаунтов (см. for_session)
+        self._state = {'data': None, 'lock': threading.Lock()}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def _lock(self):
+        return self._state['lock']
+
+    def for_session(self, session_name):
+        """Кэш другого аккаунта в том же файле (без перезаписи разделов друг друга)"""
+        cache = EntityCache(self.path, None, session_name)
+        cache.ttl = self.ttl
+        cache._state = self._state
+        return cache
+
+    def _load(self):
+        if self._state['data'] is None:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._state['data'] = json.load(f)
+            except FileNotFoundError:
+                self._state['data'] = {}
+            except Exception as e:
+                print(f"⚠️ Ошибка чтения кэша каналов: {e}. Кэш будет создан заново")
+                self._state['data'] = {}
+        return self._state['data'].setdefault(self.session_name, {})
+
+    def _save(self):
+        # Атомарная запись через временный файл, как у checkpoint'а
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._state['data'], f, ensure_ascii=False, indent=1)
+        os.replace(temp_path, self.path)
+
+    def get(self, username):
+        """Закэшированный канал или None (нет записи или истек TTL)"""
+        with self._lock:
+            entry = self._load().get(username.lower())
+        if entry is None:
+            self.misses += 1
+            return None
+        if self.ttl is not None and datetime.now() - datetime.fromisoformat(entry['cached_at']) > self.ttl:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return ResolvedChannel(entry['id'], entry['access_hash'], entry['title'])
+
+    def put(self, username, channel):
+        """Сохраняет разрешенный канал (только каналы с access_hash)"""
+        if channel.access_hash is None:
+            return
+        with self._lock:
+            self._load()[username.lower()] = {
+                'id': channel.id,
+                'access_hash': channel.access_hash,
+                'title': channel.title,
+                'cached_at': datetime.now().isoformat()
+            }
+            self._save()
+
+    def invalidate(self, username):
+        """Удаляет запись (peer перестал работать)"""
+        with self._lock:
+            if self._load().pop(username.lower(), None) is not None:
+                self._save()
+
+    def report(self):
+        """Строка со статистикой попаданий"""
+        return f"Кэш каналов: попаданий {self.hits}, разрешений username {self.misses}"
+
+
+# Кэш по умолчанию для вызовов без собственной TelegramSession
+default_entity_cache = EntityCache()
@@ -5,6 +5,7 @@ import time
 import tempfile
 import shutil
 from telethon.sync import TelegramClient
+from telethon.errors import FloodWaitError
 from telethon.tl.types import ReactionEmoji, ReactionPaid, ReactionCustomEmoji, MessageMediaPhoto
 from openpyxl import load_workbook
 from openpyxl.styles import PatternFill, Font, Alignment
@@ -15,6 +16,10 @@ import json
 import re
 import signal
 import atexit
+import asyncio
+import argparse
+from bisect import bisect_left
+from pathlib import Path
 
 # Добавляем пути для импорта модулей
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'config'))
@@ -23,34 +28,64 @@ sys.path.append(os.path.dirname(__file__))
 # Импортируем конфигурацию
 from config import (
     only_text, stat_tables, api_id, api_hash, start_date, end_date, SORT_BY_VIRALITY,
-    CREATE_MULTIPLE_SORTED_FILES, SHOW_VIRALITY_STATISTICS, CREATE_VIRALITY_SUMMARY_REPORT
+    CREATE_MULTIPLE_SORTED_FILES, SHOW_VIRALITY_STATISTICS, CREATE_VIRALITY_SUMMARY_REPORT,
+    ASYNC_MODE, MAX_CONCURRENT_CHANNELS, TOP_POSTS_ONLY, MERGE_ALBUMS, RESULTS_DIR, REPORT_FORMAT
 )
 
 # Импортируем наши модули
-from analyse import analyse
+from analyse import analyse, analyse_with_client, analyse_async, parse_channel_username
+from message_store import MessageStore
+from range_index import parse_window, window_summary
+from session_pool import SessionPool
+from report_writer import ReportWriter
+from report_formats import REPORT_FORMATS
 from ai import ask_ai
 
 class AnalysisManager:
     """Менеджер анализа с защитой от потери данных"""
     
-    def __init__(self, checkpoint_file='../results/analysis_checkpoint.json', 
-                 results_file='../results/analysis_results.csv',
-                 temp_results_file='../results/analysis_results_temp.csv'):
+    def __init__(self, checkpoint_file=os.path.join(RESULTS_DIR, 'analysis_checkpoint.json'),
+                 results_file=os.path.join(RESULTS_DIR, 'analysis_results.csv'),
+                 temp_results_file=os.path.join(RESULTS_DIR, 'analysis_results_temp.csv'),
+                 refresh_only=False, top_only=TOP_POSTS_ONLY, merge_albums=MERGE_ALBUMS,
+                 report_format=REPORT_FORMAT, install_handlers=True):
         self.checkpoint_file = checkpoint_file
         self.results_file = results_file
         self.temp_results_file = temp_results_file
+        # Режим обновления: только счетчики постов из кэша, без загрузки новых сообщений
+        self.refresh_only = refresh_only
+        # Потоковый режим: только топ-посты для AI, без таблиц и отчетов Excel
+        self.top_only = top_only
+        # Альбом (сообщения с общим grouped_id) - один пост
+        self.merge_albums = merge_albums
+        # Формат отчетов канала: excel, csv или jsonl (см. report_formats.py)
+        self.report_format = report_format
         self.results = []
+        # Индексы каналов из tgstat.csv для каждого результата (в том же порядке, что и results)
+        self.completed_indices = []
+        # Индексы каналов, отчеты которых записаны с ошибкой: анализируются повторно в конце запуска
+        self.failed_indices = set()
         self.current_index = 0
         self.total_channels = 0
         self.start_time = datetime.now()
         
+        # Аккаунты Telegram (TELEGRAM_SESSIONS): в асинхронном режиме работают все,
+        # в синхронном - первый; одно подключение на аккаунт на весь пакетный анализ
+        self.session_pool = SessionPool.from_config()
+        self.telegram_session = self.session_pool.primary
+        
+        # Отчеты Excel канала пишутся в фоне, пока загружается следующий канал
+        self.report_writer = ReportWriter()
+        
         # Создаем папку results если её нет
         os.makedirs(os.path.dirname(self.results_file), exist_ok=True)
         
-        # Регистрируем обработчики для graceful shutdown
-        signal.signal(signal.SIGINT, self._signal_handler)
-        signal.signal(signal.SIGTERM, self._signal_handler)
-        atexit.register(self._cleanup)
+        # Регистрируем обработчики для graceful shutdown (в тестах не регистрируются:
+        # они сохраняли бы прогресс после теста в уже удаленную папку)
+        if install_handlers:
+            signal.signal(signal.SIGINT, self._signal_handler)
+            signal.signal(signal.SIGTERM, self._signal_handler)
+            atexit.register(self._cleanup)
         
         # Загружаем предыдущий прогресс если есть
         self._load_checkpoint()
@@ -70,6 +105,14 @@ class AnalysisManager:
             self._save_results()
         except:
             pass
+        try:
+            self.session_pool.close()
+        except:
+            pass
+        try:
+            self.report_writer.close()
+        except:
+            pass
     
     def _load_checkpoint(self):
         """Загружает checkpoint с предыдущего запуска"""
@@ -80,6 +123,9 @@ class AnalysisManager:
                 
                 self.current_index = checkpoint.get('current_index', 0)
                 self.results = checkpoint.get('results', [])
+                # В checkpoint'ах старого формата индексов нет: все их результаты относятся к каналам до current_index
+                self.completed_indices = checkpoint.get('completed_indices', [-1] * len(self.results))
+                self.failed_indices = set(checkpoint.get('failed_indices', []))
                 self.total_channels = checkpoint.get('total_channels', 0)
                 self.start_time = datetime.fromisoformat(checkpoint.get('start_time', datetime.now().isoformat()))
                 
@@ -91,12 +137,66 @@ class AnalysisManager:
         
         return False
     
-    def _save_checkpoint(self):
-        """Сохраняет текущий прогресс в checkpoint"""
+    def _drop_failed_reports(self, failed):
+        """
+        Убирает из завершенных каналы, отчеты которых записаны с ошибкой
+        
+        Их индексы попадают в failed_indices (сохраняется в checkpoint): такие каналы
+        анализируются повторно в конце запуска или при продолжении с checkpoint'а.
+        """
+        if not failed:
+            return
+        print(f"❌ Отчетов с ошибкой записи: {len(failed)}")
+        # Ключ отчета - путь файла в папке канала (results/all_folders/<канал>/...)
+        channels = {Path(key).parent.name for key in failed}
+        for position in reversed(range(len(self.results))):
+            index = self.completed_indices[position]
+            # Отчеты пишутся только для каналов этого запуска, у них индекс известен
+            if index < 0:
+                continue
+            try:
+                channel_username = parse_channel_username(str(self.results[position]['linktochannel']))
+            except ValueError:
+                # Некорректная ссылка - ошибка канала еще до записи отчетов
+                continue
+            if channel_username not in channels:
+                continue
+            self.completed_indices.pop(position)
+            result = self.results.pop(position)
+            self.failed_indices.add(index)
+            print(f"🔁 Канал {result['linktochannel']} не считается завершенным и будет проанализирован заново")
+    
+    def _failed_report_channels(self, failed, channels_df, link_column):
+        """
+        Каналы с ошибкой записи отчетов для повторного анализа
+        
+        Args:
+            failed (list): ключи отчетов с ошибкой из ReportWriter.wait()
+        
+        Returns:
+            list: пары (индекс канала, ссылка) в порядке tgstat.csv
+        """
+        self._drop_failed_reports(failed)
+        return [(index, channels_df.iloc[index][link_column])
+                for index in sorted(self.failed_indices) if index < len(channels_df)]
+    
+    def _save_checkpoint(self, wait_reports=True):
+        """
+        Сохраняет текущий прогресс в checkpoint (после записи отчетов завершенных каналов)
+        
+        Args:
+            wait_reports (bool): дождаться записи отчетов (False - их уже дождались вне event loop)
+        """
         try:
+            # Канал в checkpoint'е считается завершенным - его отчеты должны быть на диске
+            if wait_reports:
+                self._drop_failed_reports(self.report_writer.wait())
+            
             checkpoint = {
                 'current_index': self.current_index,
                 'results': self.results,
+                'completed_indices': self.completed_indices,
+                'failed_indices': sorted(self.failed_indices),
                 'total_channels': self.total_channels,
                 'start_time': self.start_time.isoformat(),
                 'last_save': datetime.now().isoformat()
@@ -137,21 +237,94 @@ class AnalysisManager:
         except Exception as e:
             print(f"⚠️ Ошибка сохранения результатов: {e}")
     
-    def _save_intermediate_results(self):
+    def _save_intermediate_results(self, wait_reports=True):
         """Сохраняет промежуточные результаты"""
-        self._save_checkpoint()
+        self._save_checkpoint(wait_reports)
         self._save_results()
         print(f"💾 Промежуточное сохранение: {len(self.results)} каналов")
     
-    def analyze_channel(self, channel_url, channel_index):
-        """Анализирует один канал с обработкой ошибок"""
+    def _build_result(self, channel_url, ai_analysis):
+        """Формирует результат анализа канала из ответа AI"""
+        # Парсим JSON ответ от AI
+        expert = "unknown"
+        competencies = []
+        
+        try:
+            # Ищем JSON в ответе AI
+            json_match = re.search(r'\{.*\}', ai_analysis, re.DOTALL)
+            if json_match:
+                json_str = json_match.group(0)
+                ai_data = json.loads(json_str)
+                
+                expert = str(ai_data.get('эксперт', 'unknown')).lower()
+                competencies = ai_data.get('компетенции', [])
+                
+                if isinstance(competencies, list):
+                    competencies = ', '.join(competencies)
+                else:
+                    competencies = str(competencies)
+            else:
+                print(f"Не удалось найти JSON в ответе AI: {ai_analysis}")
+                competencies = ai_analysis
+                
+        except json.JSONDecodeError as e:
+            print(f"Ошибка парсинга JSON: {e}")
+            print(f"Ответ AI: {ai_analysis}")
+            competencies = ai_analysis
+        
+        # Извлекаем имя канала из URL
+        channel_name = ""
+        try:
+            match = re.search(r"(?:https?://)?t\.me/(.+?)(?:/|$)", channel_url)
+            if match:
+                channel_name = match.group(1).replace('@', '')
+        except:
+            channel_name = "unknown"
+        
+        result = {
+            'channelname': channel_name,
+            'linktochannel': channel_url,
+            'эксперт': expert,
+            'компетенции': competencies
+        }
+        
+        print(f"✅ Анализ завершен для {channel_url}")
+        print(f"Канал: {channel_name}")
+        print(f"Эксперт: {expert}")
+        print(f"Компетенции: {competencies}")
+        
+        return result
+    
+    def _error_result(self, channel_url, message):
+        """Формирует результат для канала, который не удалось проанализировать"""
+        return {
+            'channelname': "unknown",
+            'linktochannel': channel_url,
+            'эксперт': 'unknown',
+            'компетенции': f'Ошибка: {message}'
+        }
+    
+    def analyze_channel(self, channel_url, channel_index, session=None):
+        """
+        Анализирует один канал с обработкой ошибок (через общее подключение session, если передано)
+        
+        Клиент сессии получается внутри обработки ошибок: сбой подключения или авторизации
+        записывается как ошибка канала, а не останавливает весь пакетный анализ.
+        """
         try:
             print(f"\n{'='*60}")
             print(f"АНАЛИЗ КАНАЛА {channel_index + 1}/{self.total_channels}: {channel_url}")
             print(f"{'='*60}")
             
             # Анализируем канал и получаем тексты топ-5 постов
-            top_posts_text = analyse(channel_url)
+            if session is not None:
+                top_posts_text = analyse_with_client(session.client, channel_url, self.refresh_only,
+                                                     session.limiter, session.entity_cache,
+                                                     self.top_only, self.merge_albums,
+                                                     report_writer=self.report_writer,
+                                                     report_format=self.report_format)
+            else:
+                top_posts_text = analyse(channel_url, report_format=self.report_format)
             
             if top_posts_text:
                 print(f"Получено {len(top_posts_text.split('текст')) - 1} постов для анализа")
@@ -160,73 +333,72 @@ class AnalysisManager:
                 print("Анализируем компетенции через AI...")
                 ai_analysis = ask_ai(top_posts_text)
                 
-                # Парсим JSON ответ от AI
-                expert = "unknown"
-                competencies = []
-                
-                try:
-                    # Ищем JSON в ответе AI
-                    json_match = re.search(r'\{.*\}', ai_analysis, re.DOTALL)
-                    if json_match:
-                        json_str = json_match.group(0)
-                        ai_data = json.loads(json_str)
-                        
-                        expert = str(ai_data.get('эксперт', 'unknown')).lower()
-                        competencies = ai_data.get('компетенции', [])
-                        
-                        if isinstance(competencies, list):
-                            competencies = ', '.join(competencies)
-                        else:
-                            competencies = str(competencies)
-                    else:
-                        print(f"Не удалось найти JSON в ответе AI: {ai_analysis}")
-                        competencies = ai_analysis
-                        
-                except json.JSONDecodeError as e:
-                    print(f"Ошибка парсинга JSON: {e}")
-                    print(f"Ответ AI: {ai_analysis}")
-                    competencies = ai_analysis
+                return self._build_result(channel_url, ai_analysis)
                 
-                # Извлекаем имя канала из URL
-                channel_name = ""
-                try:
-                    match = re.search(r"(?:https?://)?t\.me/(.+?)(?:/|$)", channel_url)
-                    if match:
-                        channel_name = match.group(1).replace('@', '')
-                except:
-                    channel_name = "unknown"
+            else:
+                print(f"❌ Не удалось получить данные для {channel_url}")
+                return self._error_result(channel_url, 'не удалось получить данные')
                 
-                result = {
-                    'channelname': channel_name,
-                    'linktochannel': channel_url,
-                    'эксперт': expert,
-                    'компетенции': competencies
-                }
+        except Exception as e:
+            print(f"❌ Ошибка при анализе {channel_url}: {e}")
+            return self._error_result(channel_url, str(e))
+    
+    async def analyze_channel_async(self, channel_url, channel_index, session, report_lock,
+                                    raise_flood_wait=False):
+        """
+        Асинхронно анализирует один канал аккаунтом session с обработкой ошибок
+        
+        При raise_flood_wait FloodWaitError пробрасывается, чтобы пул передал канал другому аккаунту
+        """
+        try:
+            print(f"\n▶️ Старт канала {channel_index + 1}/{self.total_channels}: {channel_url} ({session.session_name})")
+            
+            client = await session.client_async()
+            top_posts_text = await analyse_async(channel_url, client, report_lock, self.refresh_only,
+                                                 session.limiter, session.entity_cache, raise_flood_wait,
+                                                 self.top_only, self.merge_albums,
+                                                 report_writer=self.report_writer,
+                                                 report_format=self.report_format)
+            
+            if top_posts_text:
+                print(f"Получено {len(top_posts_text.split('текст')) - 1} постов для анализа ({channel_url})")
                 
-                print(f"✅ Анализ завершен для {channel_url}")
-                print(f"Канал: {channel_name}")
-                print(f"Эксперт: {expert}")
-                print(f"Компетенции: {competencies}")
+                # Запрос к AI блокирующий, выполняем его в отдельном потоке
+                ai_analysis = await asyncio.to_thread(ask_ai, top_posts_text)
                 
-                return result
+                return self._build_result(channel_url, ai_analysis)
                 
             else:
                 print(f"❌ Не удалось получить данные для {channel_url}")
-                return {
-                    'channelname': "unknown",
-                    'linktochannel': channel_url,
-                    'эксперт': 'unknown',
-                    'компетенции': 'Ошибка: не удалось получить данные'
-                }
+                return self._error_result(channel_url, 'не удалось получить данные')
+        
+        except FloodWaitError:
+            if raise_flood_wait:
+                raise
+            print(f"❌ Ошибка при анализе {channel_url}: FloodWait")
+            return self._error_result(channel_url, 'FloodWait')
                 
         except Exception as e:
             print(f"❌ Ошибка при анализе {channel_url}: {e}")
-            return {
-                'channelname': "unknown",
-                'linktochannel': channel_url,
-                'эксперт': 'unknown',
-                'компетенции': f'Ошибка: {str(e)}'
-            }
+            return self._error_result(channel_url, str(e))
+    
+    def _record_result(self, index, result, skipped=()):
+        """
+        Сохраняет результат канала с учетом порядка в tgstat.csv
+        
+        Результаты хранятся отсортированными по индексу канала, а current_index
+        сдвигается только до первого незавершенного канала, поэтому при
+        завершении каналов не по порядку checkpoint не пропускает ни одного канала.
+        Каналы с ошибкой записи отчетов учитываются в failed_indices, а не в current_index.
+        """
+        position = bisect_left(self.completed_indices, index)
+        self.completed_indices.insert(position, index)
+        self.results.insert(position, result)
+        self.failed_indices.discard(index)
+        
+        done = set(self.completed_indices) | set(skipped) | self.failed_indices
+        while self.current_index in done:
+            self.current_index += 1
     
     def run_analysis(self, channels_df, link_column):
         """Запускает анализ всех каналов с защитой от потери данных"""
@@ -236,56 +408,190 @@ class AnalysisManager:
         print(f"📊 Уже проанализировано: {len(self.results)} каналов")
         print(f"🔄 Начинаем с канала: {self.current_index + 1}")
         
-        # Анализируем каждый канал
-        for index in range(self.current_index, len(channels_df)):
-            row = channels_df.iloc[index]
-            channel_url = row[link_column]
+        try:
+            # Каналы, уже завершенные в асинхронном режиме после current_index
+            done = set(self.completed_indices)
+            
+            # Анализируем каждый канал
+            for index in range(self.current_index, len(channels_df)):
+                if index in done:
+                    self.current_index = index + 1
+                    continue
+            
+                row = channels_df.iloc[index]
+                channel_url = row[link_column]
+            
+                # Пропускаем пустые ссылки
+                if pd.isna(channel_url) or not str(channel_url).strip():
+                    print(f"Пропускаем канал {index + 1}: пустая ссылка")
+                    self.current_index = index + 1
+                    continue
+            
+                # Анализируем канал
+                result = self.analyze_channel(channel_url, index, self.telegram_session)
+                self._record_result(index, result)
+                self.current_index = index + 1
+            
+                # Сохраняем промежуточные результаты каждые 10 каналов
+                if len(self.results) % 10 == 0:
+                    self._save_intermediate_results()
+            
+                # Ограничиваем анализ 1000 каналами
+                if index >= 999:  # 0-based indexing, поэтому 999 = 1000-й канал
+                    print("🔍 Достигнуто ограничение в 1000 каналов. Останавливаемся.")
+                    break
+            
+            # Каналы с ошибкой записи отчетов анализируем повторно (один раз за запуск)
+            for index, channel_url in self._failed_report_channels(self.report_writer.wait(), channels_df, link_column):
+                result = self.analyze_channel(channel_url, index, self.telegram_session)
+                self._record_result(index, result)
+        finally:
+            # Одно подключение на весь запуск закрываем после последнего канала
+            self.telegram_session.close()
+        
+        self._finish_analysis()
+    
+    def run_analysis_async(self, channels_df, link_column, concurrency=MAX_CONCURRENT_CHANNELS):
+        """Запускает асинхронный анализ: каждый аккаунт пула обрабатывает до concurrency каналов одновременно"""
+        asyncio.run(self._run_analysis_async(channels_df, link_column, concurrency))
+        self._finish_analysis()
+    
+    async def _run_analysis_async(self, channels_df, link_column, concurrency):
+        """Загружает и оценивает каналы конкурентно через asyncio-клиент Telethon"""
+        self.total_channels = len(channels_df)
+        
+        print(f"🚀 Запуск асинхронного анализа {self.total_channels} каналов "
+              f"(аккаунтов: {len(self.session_pool.sessions)}, одновременно на аккаунт: {concurrency})")
+        print(f"📊 Уже проанализировано: {len(self.results)} каналов")
+        print(f"🔄 Начинаем с канала: {self.current_index + 1}")
+        
+        done = set(self.completed_indices)
+        skipped = set()
+        pending = []
+        
+        # Ограничиваем анализ 1000 каналами
+        for index in range(self.current_index, min(len(channels_df), 1000)):
+            if index in done:
+                continue
+            
+            channel_url = channels_df.iloc[index][link_column]
             
             # Пропускаем пустые ссылки
             if pd.isna(channel_url) or not str(channel_url).strip():
                 print(f"Пропускаем канал {index + 1}: пустая ссылка")
-                self.current_index = index + 1
+                skipped.add(index)
                 continue
             
-            # Анализируем канал
-            result = self.analyze_channel(channel_url, index)
-            self.results.append(result)
-            self.current_index = index + 1
-            
-            # Сохраняем промежуточные результаты каждые 10 каналов
-            if len(self.results) % 10 == 0:
-                self._save_intermediate_results()
+            pending.append((index, channel_url))
+        
+        report_lock = asyncio.Lock()
+        
+        # Внутри event loop TelegramClient из telethon.sync работает как нативный asyncio-клиент;
+        # одно соединение аккаунта обслуживает все его одновременные запросы
+        async with self.session_pool:
+            async def handle(session, item, final):
+                index, channel_url = item
+                # Пока канал можно передать другому аккаунту, FloodWait не ждем
+                result = await self.analyze_channel_async(channel_url, index, session, report_lock,
+                                                          raise_flood_wait=not final)
+                self._record_result(index, result, skipped)
+                
+                # Сохраняем промежуточные результаты каждые 10 каналов
+                # (запись отчетов дожидаемся вне event loop, чтобы не останавливать загрузку;
+                # ошибки отчетов каналов, завершенных за время ожидания, учтет следующее сохранение)
+                if len(self.results) % 10 == 0:
+                    self._drop_failed_reports(await asyncio.to_thread(self.report_writer.wait))
+                    self._save_intermediate_results(wait_reports=False)
             
-            # Пауза между запросами, чтобы не перегружать API
-            if index < len(channels_df) - 1:  # Не делаем паузу после последнего канала
-                print("Пауза 1.5 секунды...")
-                time.sleep(1.5)
+            await self.session_pool.run(pending, handle, concurrency)
             
-            # Ограничиваем анализ 1000 каналами
-            if index >= 999:  # 0-based indexing, поэтому 999 = 1000-й канал
-                print("🔍 Достигнуто ограничение в 1000 каналов. Останавливаемся.")
-                break
+            # Каналы с ошибкой записи отчетов анализируем повторно (один раз за запуск)
+            failed = await asyncio.to_thread(self.report_writer.wait)
+            retry = self._failed_report_channels(failed, channels_df, link_column)
+            if retry:
+                await self.session_pool.run(retry, handle, concurrency)
         
+        # Хвостовые пропущенные каналы тоже считаются обработанными
+        while self.current_index in skipped:
+            self.current_index += 1
+    
+    def _finish_analysis(self):
+        """Финальное сохранение и вывод статистики"""
         # Финальное сохранение
         self._save_intermediate_results()
         
         # Выводим статистику
         elapsed_time = datetime.now() - self.start_time
         print(f"\n{'='*60}")
-        print(f"✅ АНАЛИЗ ЗАВЕРШЕН!")
+        if self.failed_indices:
+            print(f"⚠️ АНАЛИЗ ЗАВЕРШЕН С ОШИБКАМИ: отчеты {len(self.failed_indices)} каналов не записаны")
+        else:
+            print(f"✅ АНАЛИЗ ЗАВЕРШЕН!")
         print(f"Результаты сохранены в файл: {self.results_file}")
         print(f"Проанализировано каналов: {len(self.results)}")
         print(f"Время выполнения: {elapsed_time}")
         print(f"Среднее время на канал: {elapsed_time / len(self.results) if self.results else 0}")
+        print(self.session_pool.report())
         print(f"{'='*60}")
         
+        # Checkpoint с незаписанными отчетами оставляем: следующий запуск проанализирует эти каналы
+        if self.failed_indices:
+            channels = ', '.join(str(index + 1) for index in sorted(self.failed_indices))
+            print(f"📂 Checkpoint сохранен: каналы {channels} будут проанализированы заново при следующем запуске")
         # Удаляем checkpoint после успешного завершения
-        if os.path.exists(self.checkpoint_file):
+        elif os.path.exists(self.checkpoint_file):
             os.remove(self.checkpoint_file)
             print("🗑️ Checkpoint удален (анализ завершен успешно)")
 
+def window_argument(text):
+    """Период --window для argparse (сообщение об ошибке формата - в выводе argparse)"""
+    try:
+        return parse_window(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+def run_window_summary(channel_urls, start, end, merge_albums=MERGE_ALBUMS):
+    """Печатает и сохраняет итоги каналов за период [start, end] (см. range_index.py)"""
+    usernames = []
+    for channel_url in channel_urls.dropna():
+        try:
+            usernames.append(parse_channel_username(str(channel_url)))
+        except ValueError:
+            print(f"⚠️ Пропущена некорректная ссылка: {channel_url}")
+    
+    summary = window_summary(MessageStore(), usernames, start, end, merge_albums)
+    period = f"{start.strftime('%d.%m.%Y')} - {end.strftime('%d.%m.%Y')}"
+    if summary.empty:
+        print(f"❌ Нет каналов в кэше сообщений за период {period}")
+        return
+    
+    print(f"\n📅 Итоги за период {period}:")
+    print(summary[['Канал', 'Постов', 'Просмотры', 'Пересылки', 'ER%']].to_string(index=False))
+    
+    filename = os.path.join(RESULTS_DIR, f"window_{start.strftime('%Y%m%d')}_{end.strftime('%Y%m%d')}.csv")
+    summary.to_csv(filename, sep=';', index=False, encoding='utf-8')
+    print(f"💾 Итоги сохранены в {filename}")
+
 def main():
     """Основная функция"""
+    parser = argparse.ArgumentParser(description='Пакетный анализ Telegram каналов из tgstat.csv')
+    parser.add_argument('--async', dest='async_mode', action='store_true', default=ASYNC_MODE,
+                        help='Анализировать несколько каналов одновременно (asyncio)')
+    parser.add_argument('--concurrency', type=int, default=MAX_CONCURRENT_CHANNELS,
+                        help='Количество одновременно анализируемых каналов на один аккаунт в асинхронном режиме')
+    parser.add_argument('--refresh', action='store_true',
+                        help='Только обновить просмотры/пересылки/реакции постов из кэша и пересчитать виральность')
+    parser.add_argument('--top-only', dest='top_only', action='store_true', default=TOP_POSTS_ONLY,
+                        help='Только топ-посты для AI: без таблиц и отчетов Excel (потоковый режим)')
+    parser.add_argument('--no-album-merge', dest='merge_albums', action='store_false', default=MERGE_ALBUMS,
+                        help='Не объединять альбомы: каждое фото/видео альбома - отдельный пост')
+    parser.add_argument('--report-format', dest='report_format', choices=sorted(REPORT_FORMATS),
+                        default=REPORT_FORMAT,
+                        help='Формат отчетов канала: excel - оформленные книги, csv и jsonl - только строки таблиц')
+    parser.add_argument('--window', type=window_argument, metavar='ГГГГ-ММ-ДД:ГГГГ-ММ-ДД',
+                        help='Итоги, средние и ER%% каналов за период из кэша сообщений, без загрузки из Telegram')
+    args = parser.parse_args()
+    
     # Читаем список каналов из tgstat.csv
     try:
         # Пробуем разные разделители
@@ -324,9 +630,18 @@ def main():
     
     print(f"Используем столбец: {link_column}")
     
+    # Итоги за произвольный период считаются по индексу постов из кэша сообщений
+    if args.window:
+        run_window_summary(channels_df[link_column], *args.window, args.merge_albums)
+        return
+    
     # Создаем менеджер анализа и запускаем
-    manager = AnalysisManager()
-    manager.run_analysis(channels_df, link_column)
+    manager = AnalysisManager(refresh_only=args.refresh, top_only=args.top_only, merge_albums=args.merge_albums,
+                              report_format=args.report_format)
+    if args.async_mode:
+        manager.run_analysis_async(channels_df, link_column, args.concurrency)
+    else:
+        manager.run_analysis(channels_df, link_column)
 
 if __name__ == "__main__":
     main()
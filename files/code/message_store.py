@@ -0,0 +1,245 @@
+"""
+Локальный кэш сообщений каналов (SQLite)
+
+Посты хранятся по ключу (channel_id, message_id), для каждого канала
+запоминается максимальный загруженный message_id. Повторный запуск
+запрашивает у Telegram только новые сообщения (min_id), а счетчики
+свежих постов внутри периода анализа обновляются пачками по id.
+"""
+
+import os
+import sys
+import sqlite3
+from datetime import datetime, timezone, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'config'))
+
+from config import MESSAGE_CACHE_PATH, MESSAGE_CACHE_REFRESH_DAYS
+from post_columns import PostColumns
+
+# Порядок полей строки поста в хранилище
+POST_FIELDS = (
+    'message_id', 'date', 'grouped_id', 'text', 'content_type', 'views',
+    'reactions', 'positive', 'negative', 'comments', 'forwards'
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    channel_id INTEGER NOT NULL,
+    message_id INTEGER NOT NULL,
+    date INTEGER NOT NULL,
+    grouped_id INTEGER,
+    text TEXT NOT NULL DEFAULT '',
+    content_type TEXT NOT NULL,
+    views INTEGER NOT NULL DEFAULT 0,
+    reactions INTEGER NOT NULL DEFAULT 0,
+    positive INTEGER NOT NULL DEFAULT 0,
+    negative INTEGER NOT NULL DEFAULT 0,
+    comments INTEGER NOT NULL DEFAULT 0,
+    forwards INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (channel_id, message_id)
+);
+CREATE INDEX IF NOT EXISTS posts_by_date ON posts (channel_id, date);
+CREATE TABLE IF NOT EXISTS channels (
+    channel_id INTEGER PRIMARY KEY,
+    username TEXT,
+    title TEXT,
+    max_message_id INTEGER NOT NULL DEFAULT 0,
+    fetched_from INTEGER,
+    updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS range_index (
+    channel_id INTEGER NOT NULL,
+    variant TEXT NOT NULL,
+    timestamps BLOB NOT NULL,
+    prefix BLOB NOT NULL,
+    PRIMARY KEY (channel_id, variant)
+);
+"""
+
+
+class MessageStore:
+    """SQLite-хранилище постов, ключ - (channel_id, message_id)"""
+
+    def __init__(self, path=MESSAGE_CACHE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        # Отдельное соединение на операцию: хранилище используется и из потоков асинхронного режима
+        return sqlite3.connect(self.path)
+
+    def get_channel_state(self, channel_id):
+        """Возвращает (max_message_id, fetched_from) или None, если канал еще не загружался"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT max_message_id, fetched_from FROM channels WHERE channel_id = ?",
+                (channel_id,)
+            ).fetchone()
+        return row
+
+    def fetch_plans(self, channel_id, start_date, end_date):
+        """
+        Параметры iter_messages для дозагрузки канала
+
+        Returns:
+            list[dict]: аргументы для client.iter_messages (все с reverse=True)
+        """
+        state = self.get_channel_state(channel_id)
+        if not state or not state[0]:
+            # Первый запуск - полная загрузка периода
+            return [{'offset_date': start_date, 'reverse': True}]
+
+        max_message_id, fetched_from = state
+        plans = []
+
+        # Начало периода раньше уже загруженного - догружаем недостающую часть
+        if fetched_from is not None and int(start_date.timestamp()) < fetched_from:
+            with self._connect() as conn:
+                first_cached = conn.execute(
+                    "SELECT MIN(message_id) FROM posts WHERE channel_id = ?", (channel_id,)
+                ).fetchone()[0]
+            if first_cached:
+                plans.append({'offset_date': start_date, 'max_id': first_cached, 'reverse': True})
+
+        # Дальше - только сообщения новее уже загруженных
+        plans.append({'min_id': max_message_id, 'reverse': True})
+        return plans
+
+    def refresh_message_ids(self, channel_id, start_date, end_date, now=None, full=False):
+        """
+        id постов периода анализа, у которых нужно обновить счетчики
+
+        Args:
+            full (bool): все посты периода, а не только за последние MESSAGE_CACHE_REFRESH_DAYS дней
+                (считая от конца периода, если он уже прошел)
+
+        Returns:
+            list[int]: id сообщений по возрастанию
+        """
+        refresh_since = start_date
+        if not full and MESSAGE_CACHE_REFRESH_DAYS is not None:
+            now = now or datetime.now(timezone.utc)
+            # Период в прошлом: иначе окно обновления было бы пустым и счетчики не обновлялись бы никогда
+            refresh_until = min(now, end_date)
+            refresh_since = max(start_date, refresh_until - timedelta(days=MESSAGE_CACHE_REFRESH_DAYS))
+
+        with self._connect() as conn:
+            rows = conn.execute(
+                """SELECT message_id FROM posts
+                   WHERE channel_id = ? AND date >= ? AND date <= ?
+                   ORDER BY message_id""",
+                (channel_id, int(refresh_since.timestamp()), int(end_date.timestamp()))
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def update_counters(self, channel_id, rows):
+        """
+        Обновляет только счетчики постов (текст и дата не меняются)
+
+        Args:
+            rows: строки обновленных сообщений (extract_post_row)
+        """
+        with self._connect() as conn:
+            conn.executemany(
+                """UPDATE posts SET views = ?, reactions = ?, positive = ?, negative = ?,
+                       comments = ?, forwards = ?
+                   WHERE channel_id = ? AND message_id = ?""",
+                [(row[5], row[6], row[7], row[8], row[9], row[10], channel_id, row[0]) for row in rows]
+            )
+            # Счетчики изменились - индекс периодов канала строится заново при следующем запросе
+            conn.execute("DELETE FROM range_index WHERE channel_id = ?", (channel_id,))
+
+    def save_posts(self, channel_id, username, title, rows, start_date):
+        """Сохраняет загруженные посты (новые добавляются, существующие обновляются)"""
+        with self._connect() as conn:
+            conn.executemany(
+                f"""INSERT INTO posts (channel_id, {', '.join(POST_FIELDS)})
+                    VALUES (?, {', '.join('?' * len(POST_FIELDS))})
+                    ON CONFLICT (channel_id, message_id) DO UPDATE SET
+                        views = excluded.views,
+                        reactions = excluded.reactions,
+                        positive = excluded.positive,
+                        negative = excluded.negative,
+                        comments = excluded.comments,
+                        forwards = excluded.forwards,
+                        text = excluded.text""",
+                [(channel_id, *row) for row in rows]
+            )
+
+            max_fetched = max((row[0] for row in rows), default=0)
+            fetched_from = int(start_date.timestamp())
+            conn.execute(
+                """INSERT INTO channels (channel_id, username, title, max_message_id, fetched_from, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (channel_id) DO UPDATE SET
+                       username = excluded.username,
+                       title = excluded.title,
+                       max_message_id = MAX(channels.max_message_id, excluded.max_message_id),
+                       fetched_from = MIN(COALESCE(channels.fetched_from, excluded.fetched_from), excluded.fetched_from),
+                       updated_at = excluded.updated_at""",
+                (channel_id, username, title, max_fetched, fetched_from, datetime.now().isoformat())
+            )
+            conn.execute("DELETE FROM range_index WHERE channel_id = ?", (channel_id,))
+
+    def load_range_index(self, channel_id, variant):
+        """
+        Сохраненный индекс периодов канала (см. range_index.py)
+
+        Returns:
+            tuple: (timestamps, prefix) - байты массивов или None, если индекса нет
+                или посты канала изменились после его построения
+        """
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT timestamps, prefix FROM range_index WHERE channel_id = ? AND variant = ?",
+                (channel_id, variant)
+            ).fetchone()
+
+    def save_range_index(self, channel_id, variant, timestamps, prefix):
+        """Сохраняет индекс периодов канала до следующего изменения его постов"""
+        with self._connect() as conn:
+            conn.execute(
+                """INSERT INTO range_index (channel_id, variant, timestamps, prefix) VALUES (?, ?, ?, ?)
+                   ON CONFLICT (channel_id, variant) DO UPDATE SET
+                       timestamps = excluded.timestamps, prefix = excluded.prefix""",
+                (channel_id, variant, timestamps, prefix)
+            )
+
+    def find_channel(self, username):
+        """channel_id закэшированного канала по username или None"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT channel_id FROM channels WHERE username = ? COLLATE NOCASE", (username,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def iter_posts(self, channel_id, start_date=None, end_date=None, with_text=True):
+        """
+        Строки постов периода (порядок полей - POST_FIELDS) по возрастанию id (без загрузки всех в память)
+
+        Args:
+            start_date, end_date: границы периода (None - все закэшированные посты)
+            with_text (bool): False - вместо текстов пустые строки (для счетчиков и индексов)
+        """
+        fields = POST_FIELDS if with_text else tuple("'' AS text" if field == 'text' else field for field in POST_FIELDS)
+        start = int(start_date.timestamp()) if start_date is not None else -2**63
+        end = int(end_date.timestamp()) if end_date is not None else 2**63 - 1
+        with self._connect() as conn:
+            yield from conn.execute(
+                f"""SELECT {', '.join(fields)} FROM posts
+                    WHERE channel_id = ? AND date >= ? AND date <= ?
+                    ORDER BY message_id""",
+                (channel_id, start, end)
+            )
+
+    def load_posts(self, channel_id, start_date, end_date):
+        """
+        Загружает посты периода
+        
+        Returns:
+            PostColumns: посты для process_messages
+        """
+        return PostColumns.from_rows(self.iter_posts(channel_id, start_date, end_date))
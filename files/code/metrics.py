@@ -0,0 +1,142 @@
+"""
+Векторный расчет метрик виральности по реестру METRICS (config.py)
+
+Каждая метрика объявляет входы, формулу и веса; считаются только метрики,
+включенные в stat_tables или выбранные в SORT_BY_VIRALITY (и их входы),
+одним проходом NumPy по колонкам счетчиков вместо построчного df.apply.
+Встроенные метрики совпадают с calculate_* из analyse.py, включая
+inf/nan виральности постов без просмотров.
+"""
+
+import os
+import sys
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'config'))
+
+from config import METRICS, stat_tables, SORT_BY_VIRALITY
+
+# Счетчики, доступные формулам, и их колонки в таблице постов
+COUNTER_INPUTS = {
+    'views': 'Просмотры',
+    'reactions': 'Реакции',
+    'positive': 'Всего (+)',
+    'negative': 'Всего (-)',
+    'comments': 'Комменты',
+    'forwards': 'Пересылки',
+}
+
+# Метрики, которые нужны всегда: итоговые строки, статистика и топ-посты для AI
+ALWAYS_COMPUTED = ('er', 'default')
+
+_compiled_formulas = {}
+
+
+def per_view(values, views, scale):
+    """values / views * scale, 0 для постов без просмотров"""
+    values = np.asarray(values)
+    views = np.asarray(views)
+    result = np.zeros(np.broadcast(values, views).shape, dtype=np.float64)
+    np.divide(values, views, out=result, where=views != 0)
+    result *= scale
+    return result
+
+
+def _evaluate(key, values, registry):
+    """Значение формулы метрики; values - массивы счетчиков и уже посчитанных метрик"""
+    metric = registry[key]
+    code = _compiled_formulas.get((key, metric['formula']))
+    if code is None:
+        code = compile(metric['formula'], f"<metric {key}>", 'eval')
+        _compiled_formulas[(key, metric['formula'])] = code
+
+    namespace = {name: values[name] for name in metric.get('inputs', ())}
+    namespace.update(w=metric.get('weights', {}), per_view=per_view, log=np.log)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.asarray(eval(code, {'__builtins__': {}}, namespace), dtype=np.float64)
+
+
+def metric_order(keys, registry=None):
+    """Ключи метрик вместе с их входами, в порядке расчета"""
+    registry = METRICS if registry is None else registry
+    ordered = []
+
+    def visit(key, path=()):
+        if key in ordered or key in COUNTER_INPUTS or key not in registry:
+            return
+        if key in path:
+            raise ValueError(f"Циклическая зависимость метрик: {' -> '.join(path + (key,))}")
+        for name in registry[key].get('inputs', ()):
+            visit(name, path + (key,))
+        ordered.append(key)
+
+    for key in keys:
+        visit(key)
+    return ordered
+
+
+def required_metrics(tables=None, sort_by=None, registry=None):
+    """
+    Метрики для расчета: включенные в stat_tables, выбранная сортировка и ALWAYS_COMPUTED
+
+    Returns:
+        list: ключи метрик в порядке расчета (вместе с входами)
+    """
+    tables = stat_tables if tables is None else tables
+    sort_by = SORT_BY_VIRALITY if sort_by is None else sort_by
+    wanted = list(ALWAYS_COMPUTED) + [key for key, enabled in tables.items() if enabled] + [sort_by]
+    return metric_order(wanted, registry)
+
+
+def compute_metrics(counters, keys=None, registry=None):
+    """
+    Метрики для массивов счетчиков
+
+    Args:
+        counters (dict): имя счетчика (views, reactions, ...) -> массив
+        keys (list): какие метрики считать (по умолчанию - required_metrics())
+
+    Returns:
+        dict: колонка метрики -> np.ndarray float64
+    """
+    registry = METRICS if registry is None else registry
+    keys = required_metrics(registry=registry) if keys is None else metric_order(keys, registry)
+
+    values = {name: np.asarray(column) for name, column in counters.items()}
+    results = {}
+    for key in keys:
+        values[key] = _evaluate(key, values, registry)
+        results[registry[key]['column']] = values[key]
+    return results
+
+
+def metric_totals(sums, keys, registry=None):
+    """
+    Значения метрик для строки "Итого"
+
+    Args:
+        sums (dict): колонка таблицы -> сумма по постам (счетчики и метрики)
+        keys (list): посчитанные метрики (в порядке расчета)
+
+    Returns:
+        dict: колонка метрики -> итоговое значение
+    """
+    registry = METRICS if registry is None else registry
+    values = {name: np.asarray(sums[column]) for name, column in COUNTER_INPUTS.items()}
+    totals = {}
+    for key in keys:
+        column = registry[key]['column']
+        if registry[key].get('total') == 'formula':
+            values[key] = _evaluate(key, values, registry)
+        else:
+            values[key] = np.asarray(sums[column])
+        totals[column] = values[key].item()
+    return totals
+
+
+def add_metrics(df, keys=None):
+    """Добавляет колонки метрик в таблицу постов (один векторный проход)"""
+    counters = {name: df[column].to_numpy() for name, column in COUNTER_INPUTS.items()}
+    for column, values in compute_metrics(counters, keys).items():
+        df[column] = values
+    return df
@@ -0,0 +1,106 @@
+"""
+Файлы канала в папке results/all_folders/<канал>
+
+ChannelOutput решает, куда и надо ли писать файлы анализа канала: таблица
+постов (posts.parquet), основной файл, файлы с сортировками и сводный отчет
+пишутся по одному разу в папку канала, а не в общую папку results/ текущей
+директории, где каждый канал затирал файлы предыдущего.
+
+Для каждого файла запоминается хэш его входов (таблица постов, период, формат
+и параметры отчета) в report_hashes.json папки канала. Если при повторном
+анализе входы не изменились и файлы на месте, файл не перезаписывается.
+"""
+
+import os
+import json
+import hashlib
+import threading
+from pathlib import Path
+from functools import partial
+import pandas as pd
+
+from post_frame import PostFrame
+
+# Хэши входов записанных файлов канала
+MANIFEST_FILENAME = 'report_hashes.json'
+
+
+def input_hash(*inputs):
+    """
+    Хэш входов файла
+
+    Таблицы (DataFrame, PostFrame) хэшируются по значениям строк в их порядке
+    и названиям колонок, остальные значения - по JSON (даты - строками).
+
+    Returns:
+        str: sha256 в hex
+    """
+    digest = hashlib.sha256()
+    for value in inputs:
+        if isinstance(value, PostFrame):
+            value = value.df
+        if isinstance(value, pd.DataFrame):
+            digest.update(pd.util.hash_pandas_object(value, index=False).to_numpy().tobytes())
+            value = [str(column) for column in value.columns]
+        digest.update(json.dumps(value, default=str, ensure_ascii=False, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class ChannelOutput:
+    """Папка канала: запись файлов через пул ReportWriter, пропуск файлов с прежними входами"""
+
+    def __init__(self, folder):
+        self.folder = Path(folder)
+        self.manifest_path = self.folder / MANIFEST_FILENAME
+        # Хэши обновляются из потоков пула записи
+        self.lock = threading.Lock()
+        self.hashes = self._load()
+
+    def _load(self):
+        """Хэши прошлого анализа (поврежденный или отсутствующий файл - пустой набор)"""
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def is_current(self, name, digest):
+        """Записан ли файл name с такими же входами и на месте ли все его файлы"""
+        entry = self.hashes.get(name)
+        return (entry is not None and entry['hash'] == digest
+                and all((self.folder / filename).exists() for filename in entry['files']))
+
+    def record(self, name, digest, paths):
+        """Запоминает хэш входов записанного файла (атомарная запись report_hashes.json)"""
+        with self.lock:
+            self.hashes[name] = {'hash': digest, 'files': sorted(Path(path).name for path in paths)}
+            temp_path = self.manifest_path.with_name(self.manifest_path.name + '.tmp')
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.hashes, f, indent=2, ensure_ascii=False)
+            os.replace(temp_path, self.manifest_path)
+
+    def write(self, report_writer, name, inputs, function, *args):
+        """
+        Записывает файл канала через report_writer, если его входы изменились
+
+        Args:
+            report_writer (ReportWriter): пул записи (workers=0 - запись сразу)
+            name (str): файл в папке канала - ключ в report_hashes.json
+            inputs (tuple): входы файла для хэша (хэш таблицы постов, период, формат, ...)
+            function: функция записи в папку канала, возвращает список записанных файлов
+
+        Returns:
+            Future записи или None, если файл не изменился
+        """
+        digest = input_hash(name, *inputs)
+        if self.is_current(name, digest):
+            print(f"⏭️ {name}: входные данные не изменились, файл не перезаписывается")
+            return None
+        future = report_writer.submit(str(self.folder / name), function, *args)
+        future.add_done_callback(partial(self._written, name, digest))
+        return future
+
+    def _written(self, name, digest, future):
+        """Хэш запоминается только после успешной записи"""
+        if future.exception() is None:
+            self.record(name, digest, future.result())
@@ -0,0 +1,166 @@
+"""
+Колоночное накопление постов канала
+
+Вместо словаря с русскими ключами на каждое сообщение посты хранятся
+в типизированных массивах: счетчики и id - int64, дата - int64 timestamp
+(UTC), тип контента - код категории, тексты - в отдельном списке.
+Таблица постов строится из этих массивов без копирования счетчиков.
+"""
+
+from array import array
+import numpy as np
+import pandas as pd
+
+# Типы контента в порядке кодов категории
+CONTENT_TYPES = ('Текст', 'Фото', 'Видео', 'Документ', 'Голосовое', 'Видеосообщение', 'Стикер', 'Опрос')
+CONTENT_TYPE_CODES = {content_type: code for code, content_type in enumerate(CONTENT_TYPES)}
+
+# Числовые колонки в порядке полей строки extract_post_row (после text и content_type)
+COUNTER_FIELDS = ('views', 'reactions', 'positive', 'negative', 'comments', 'forwards')
+
+# Как счетчики сообщений альбома сводятся в один пост: просмотры - максимум
+# (альбом показывается целиком), реакции, комментарии и пересылки - сумма
+ALBUM_REDUCERS = {
+    'views': np.maximum,
+    'reactions': np.add,
+    'positive': np.add,
+    'negative': np.add,
+    'comments': np.add,
+    'forwards': np.add,
+}
+
+# Названия колонок таблицы постов
+COUNTER_COLUMNS = {
+    'views': 'Просмотры',
+    'reactions': 'Реакции',
+    'positive': 'Всего (+)',
+    'negative': 'Всего (-)',
+    'comments': 'Комменты',
+    'forwards': 'Пересылки',
+}
+
+
+def merge_album_rows(rows):
+    """
+    Строки extract_post_row одного альбома в одну строку (те же правила, что PostColumns.merge_albums)
+
+    Используется потоковым топом (TopPosts), где альбом собирается по мере загрузки.
+    """
+    rows = sorted(rows, key=lambda row: row[0])
+    first = rows[0]
+    caption = next((row[3] for row in rows if row[3]), first[3])
+    counters = []
+    for index, (field, reducer) in enumerate(ALBUM_REDUCERS.items(), 5):
+        counters.append(int(reducer.reduce([row[index] or 0 for row in rows])))
+    return (first[0], first[1], first[2], caption, first[4], *counters)
+
+
+class PostColumns:
+    """Посты канала в колоночном виде; строка - кортеж в порядке POST_FIELDS"""
+
+    def __init__(self):
+        self.message_id = array('q')
+        self.date = array('q')
+        self.grouped_id = array('q')  # 0 - сообщение не из альбома
+        self.content_type = array('b')
+        self.texts = []
+        self.counters = {field: array('q') for field in COUNTER_FIELDS}
+
+    def __len__(self):
+        return len(self.message_id)
+
+    def append(self, row):
+        """Добавляет строку extract_post_row: (message_id, date, grouped_id, text, content_type, *счетчики)"""
+        message_id, date, grouped_id, text, content_type = row[:5]
+        self.message_id.append(message_id)
+        self.date.append(date)
+        self.grouped_id.append(grouped_id or 0)
+        self.texts.append(text)
+        self.content_type.append(CONTENT_TYPE_CODES[content_type])
+        for field, value in zip(COUNTER_FIELDS, row[5:]):
+            self.counters[field].append(value or 0)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Колонки из строк extract_post_row (например, из кэша сообщений)"""
+        columns = cls()
+        for row in rows:
+            columns.append(row)
+        return columns
+
+    def rows(self):
+        """Строки в формате extract_post_row (для записи в кэш сообщений)"""
+        counters = [self.counters[field] for field in COUNTER_FIELDS]
+        for i in range(len(self)):
+            yield (self.message_id[i], self.date[i], self.grouped_id[i] or None, self.texts[i],
+                   CONTENT_TYPES[self.content_type[i]], *(column[i] for column in counters))
+
+    def merge_albums(self):
+        """
+        Альбомы (сообщения с общим grouped_id) сводятся в один пост
+
+        Пост альбома получает id, дату и тип первого сообщения, непустую подпись
+        и счетчики по ALBUM_REDUCERS. Группировка векторная (сортировка
+        по grouped_id и reduceat), порядок постов сохраняется.
+
+        Returns:
+            PostColumns: новые колонки (self, если альбомов нет)
+        """
+        grouped = np.frombuffer(self.grouped_id, dtype=np.int64)
+        if not grouped.any():
+            return self
+
+        count = len(self)
+        message_ids = np.frombuffer(self.message_id, dtype=np.int64)
+        # Сообщения вне альбомов - отдельные группы с отрицательными ключами
+        keys = np.where(grouped != 0, grouped, -np.arange(1, count + 1))
+        order = np.lexsort((message_ids, keys))
+        sorted_keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+
+        # Первая позиция группы в исходном порядке - для сохранения порядка постов
+        group_order = np.argsort(np.minimum.reduceat(order, starts), kind='stable')
+        first = order[starts][group_order]
+
+        # Подпись - первый непустой текст группы (по message_id)
+        has_text = np.fromiter((bool(text) for text in self.texts), dtype=bool, count=count)
+        text_positions = np.where(has_text[order], np.arange(count), count)
+        first_text = np.minimum.reduceat(text_positions, starts)[group_order]
+        text_rows = np.where(first_text < count, order[np.minimum(first_text, count - 1)], first)
+
+        merged = PostColumns()
+        merged.message_id.frombytes(message_ids[first].tobytes())
+        merged.date.frombytes(np.frombuffer(self.date, dtype=np.int64)[first].tobytes())
+        merged.grouped_id.frombytes(grouped[first].tobytes())
+        merged.content_type.frombytes(np.frombuffer(self.content_type, dtype=np.int8)[first].tobytes())
+        merged.texts = [self.texts[i] for i in text_rows]
+        for field, reducer in ALBUM_REDUCERS.items():
+            values = np.frombuffer(self.counters[field], dtype=np.int64)[order]
+            merged.counters[field].frombytes(reducer.reduceat(values, starts)[group_order].tobytes())
+        return merged
+
+    def to_dataframe(self):
+        """
+        Таблица постов (колонки - как в Excel-файлах постов)
+
+        Счетчики передаются в pandas как представления массивов (без копирования),
+        тип контента - категориальный, дата - datetime64 в UTC (форматируется
+        только при записи в Excel и выводе в консоль, см. post_frame.format_dates).
+        """
+        dates = pd.to_datetime(np.frombuffer(self.date, dtype=np.int64), unit='s', utc=True)
+        content_type = pd.Categorical.from_codes(np.frombuffer(self.content_type, dtype=np.int8),
+                                                 categories=list(CONTENT_TYPES))
+        # Строковые колонки остаются object: тексты не копируются в отдельный строковый буфер
+        data = {
+            'Дата': dates,
+            'Полный_текст': pd.Series(np.array(self.texts, dtype=object), dtype=object, copy=False),
+            'Тип': content_type,
+        }
+        for field, column in COUNTER_COLUMNS.items():
+            data[column] = np.frombuffer(self.counters[field], dtype=np.int64)
+        # 'Всего' совпадает с 'Реакции' - общее представление того же массива
+        data['Всего'] = data['Реакции']
+
+        order = ['Дата', 'Полный_текст', 'Тип', 'Просмотры', 'Реакции', 'Всего (+)', 'Всего (-)',
+                 'Всего', 'Комменты', 'Пересылки']
+        return pd.DataFrame({column: data[column] for column in order}, copy=False)
@@ -0,0 +1,204 @@
+"""
+Общий набор постов всех каналов
+
+Таблица постов каждого канала (PostFrame) добавляется в один Parquet-набор
+с колонкой channel, разбитый по месяцам и каналам (hive: month=ГГГГ-ММ/channel=...).
+Вопросы по многим каналам ("топ-100 постов всех каналов за прошлый месяц",
+итоги по каналам) решаются одним колоночным сканированием: читаются только
+нужные колонки, а месяцы и каналы вне фильтра отбрасываются по именам папок.
+"""
+
+import os
+import sys
+import shutil
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'config'))
+
+from config import POST_DATASET_PATH
+from metrics import COUNTER_INPUTS, compute_metrics
+
+# Колонки разбиения набора (значения - в именах папок)
+PARTITION_SCHEMA = pa.schema([('month', pa.string()), ('channel', pa.string())])
+
+# Счетчики, суммируемые в итогах по каналам
+SUMMARY_COUNTERS = ['Просмотры', 'Реакции', 'Комменты', 'Пересылки']
+
+
+def month_key(value):
+    """Ключ разбиения 'ГГГГ-ММ' для даты"""
+    return value.strftime('%Y-%m')
+
+
+class PostDataset:
+    """Parquet-набор постов всех каналов: запись по каналу, запросы одним сканированием"""
+
+    def __init__(self, path=POST_DATASET_PATH):
+        self.path = Path(path)
+        self.partitioning = ds.partitioning(PARTITION_SCHEMA, flavor='hive')
+
+    def channels(self):
+        """Каналы, посты которых есть в наборе"""
+        return sorted({folder.name.split('=', 1)[1] for folder in self.path.glob('month=*/channel=*')})
+
+    def remove(self, channel):
+        """Удаляет все посты канала (папки channel=... во всех месяцах)"""
+        removed = 0
+        for folder in self.path.glob(f'month=*/channel={channel}'):
+            shutil.rmtree(folder)
+            removed += 1
+        return removed
+
+    def append(self, channel, frame):
+        """
+        Добавляет посты канала; посты прошлого анализа этого канала заменяются
+
+        Args:
+            channel (str): username канала
+            frame (PostFrame): посты канала (без итоговых строк)
+
+        Returns:
+            int: количество записанных постов
+        """
+        if not len(frame):
+            self.remove(channel)
+            return 0
+
+        # Новые посты пишутся во временную папку (точка в начале - сканирование ее не видит)
+        # и заменяют прежние только после успешной записи
+        staging = self.path / f'.staging-{channel}'
+        replaced = self.path / f'.replaced-{channel}'
+        shutil.rmtree(staging, ignore_errors=True)
+        shutil.rmtree(replaced, ignore_errors=True)
+        df = frame.df.assign(month=frame.df['Дата'].dt.strftime('%Y-%m'), channel=channel)
+        try:
+            ds.write_dataset(
+                pa.Table.from_pandas(df, preserve_index=False),
+                staging,
+                format='parquet',
+                partitioning=self.partitioning,
+                basename_template='part-{i}.parquet',
+            )
+            self._swap(channel, staging, replaced)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        shutil.rmtree(replaced, ignore_errors=True)
+        return len(df)
+
+    def _swap(self, channel, staging, replaced):
+        """Заменяет папки канала записанными в staging; при ошибке прежние папки возвращаются"""
+        old = list(self.path.glob(f'month=*/channel={channel}'))
+        for folder in old:
+            (replaced / folder.parent.name).mkdir(parents=True, exist_ok=True)
+            os.replace(folder, replaced / folder.parent.name / folder.name)
+        moved = []
+        try:
+            for folder in staging.glob(f'month=*/channel={channel}'):
+                target = self.path / folder.parent.name / folder.name
+                target.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(folder, target)
+                moved.append(target)
+        except BaseException:
+            for target in moved:
+                shutil.rmtree(target)
+            for folder in old:
+                os.replace(replaced / folder.parent.name / folder.name, folder)
+            raise
+
+    def dataset(self):
+        """
+        pyarrow Dataset по всем файлам набора (None, если набор пуст)
+
+        Схема объединяет схемы всех файлов: каналы, проанализированные с разным
+        набором метрик, дают колонки друг друга (у остальных каналов - пустые значения).
+        """
+        if not any(self.path.glob('month=*/channel=*')):
+            return None
+        files = ds.dataset(self.path, format='parquet', partitioning=self.partitioning)
+        schema = pa.unify_schemas([fragment.physical_schema for fragment in files.get_fragments()]
+                                  + [PARTITION_SCHEMA])
+        return ds.dataset(self.path, schema=schema, format='parquet', partitioning=self.partitioning)
+
+    def _filter(self, start=None, end=None, channels=None):
+        """Фильтр сканирования: месяцы и каналы отсекаются по папкам, даты - по колонке 'Дата'"""
+        conditions = []
+        if start is not None:
+            conditions += [ds.field('month') >= month_key(start), ds.field('Дата') >= start]
+        if end is not None:
+            conditions += [ds.field('month') <= month_key(end), ds.field('Дата') <= end]
+        if channels is not None:
+            conditions.append(ds.field('channel').isin(list(channels)))
+        if not conditions:
+            return None
+        expression = conditions[0]
+        for condition in conditions[1:]:
+            expression = expression & condition
+        return expression
+
+    def scan(self, columns=None, start=None, end=None, channels=None):
+        """
+        Посты набора за период [start, end] одним сканированием
+
+        Args:
+            columns (list): читаемые колонки (по умолчанию - все), 'channel' и 'month' тоже доступны
+            start, end (datetime): границы периода с часовым поясом (None - без границы)
+            channels (list): username каналов (по умолчанию - все)
+
+        Returns:
+            pyarrow.Table
+        """
+        dataset = self.dataset()
+        if dataset is None:
+            return pa.table({column: [] for column in (columns or ['channel'])})
+        return dataset.to_table(columns=columns, filter=self._filter(start, end, channels))
+
+    def top_posts(self, count=100, by='Виральность', start=None, end=None, channels=None):
+        """
+        Самые виральные посты всех каналов за период
+
+        Args:
+            by (str): колонка метрики или счетчика для отбора
+
+        Returns:
+            DataFrame: channel, Дата, Полный_текст, Просмотры и колонка by, по убыванию by
+        """
+        columns = list(dict.fromkeys(['channel', 'Дата', 'Полный_текст', 'Просмотры', by]))
+        table = self.scan(columns, start, end, channels)
+        if not table.num_rows:
+            return table.to_pandas()
+        order = pc.select_k_unstable(table, min(count, table.num_rows), [(by, 'descending')])
+        return table.take(order).to_pandas()
+
+    def channel_summary(self, start=None, end=None, channels=None):
+        """
+        Итоги по каналам за период: постов, суммы счетчиков, ER% по суммам
+        (как строка "Итого") и средняя виральность (посты без просмотров не учитываются)
+
+        Returns:
+            DataFrame: строка на канал, по убыванию ER%
+        """
+        table = self.scan(['channel', 'Виральность'] + SUMMARY_COUNTERS, start, end, channels)
+        if not table.num_rows:
+            return table.to_pandas()
+
+        virality = table.column('Виральность')
+        table = table.set_column(table.schema.get_field_index('Виральность'), 'Виральность',
+                                 pc.if_else(pc.is_finite(virality), virality, None))
+        aggregations = [(column, 'sum') for column in SUMMARY_COUNTERS]
+        aggregations += [('Виральность', 'mean'), ('channel', 'count')]
+        grouped = table.group_by('channel').aggregate(aggregations).to_pandas()
+
+        summary = pd.DataFrame({'Канал': grouped['channel'], 'Постов': grouped['channel_count']})
+        for column in SUMMARY_COUNTERS:
+            summary[column] = grouped[f'{column}_sum']
+        sums = {name: summary[column].to_numpy() for name, column in COUNTER_INPUTS.items()
+                if column in summary}
+        with np.errstate(divide='ignore', invalid='ignore'):
+            summary['ER%'] = compute_metrics(sums, ['er'])['ER%']
+        summary['Средняя виральность'] = grouped['Виральность_mean']
+        return summary.sort_values('ER%', ascending=False, kind='stable').reset_index(drop=True)
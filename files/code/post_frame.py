@@ -0,0 +1,221 @@
+"""
+Таблица постов канала с фиксированными типами колонок
+
+PostFrame хранит только посты: дата - datetime64 в UTC, счетчики - int64,
+метрики - float64, итоги и средние по каналу - отдельно. Строки "Итого"
+и "В среднем на пост" добавляются только при записи в Excel
+(with_summary_rows), поэтому статистике, отчетам, сортировкам и топ-постам
+не нужно их отфильтровывать и заново приводить колонки через pd.to_numeric.
+Даты форматируются тоже только при записи и выводе (format_dates).
+
+Для повторного чтения таблица сохраняется в Parquet (to_parquet): типы
+колонок сохраняются, агрегаты пишутся в метаданные схемы, а читатели
+загружают только нужные им колонки. posts.xlsx остается для просмотра.
+"""
+
+import os
+import sys
+import json
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'config'))
+
+from config import METRICS
+from post_columns import COUNTER_COLUMNS
+from metrics import metric_order, metric_totals
+
+# Итоговые строки таблицы постов (только в Excel)
+SUMMARY_ROWS = ('Итого', 'В среднем на пост')
+
+# Числовые колонки счетчиков в порядке таблицы ('Всего' - общее число реакций)
+COUNTER_TABLE_COLUMNS = list(COUNTER_COLUMNS.values())[:4] + ['Всего'] + list(COUNTER_COLUMNS.values())[4:]
+
+# Строка заголовка в Excel после трех строк с каналом и периодом (см. save_to_excel)
+EXCEL_HEADER_ROW = 3
+
+# Формат даты поста в Excel и в консоли (время UTC)
+DATE_FORMAT = '%d.%m.%Y %H:%M'
+# Позиции символов ISO-даты 'гггг-мм-ддTчч:мм' в строке DATE_FORMAT (разделители заменяются)
+ISO_TO_DATE_FORMAT = [8, 9, 4, 5, 6, 4, 0, 1, 2, 3, 10, 11, 12, 13, 14, 15]
+
+# Файлы таблицы постов в папке канала
+PARQUET_FILENAME = 'posts.parquet'
+EXCEL_FILENAME = 'posts.xlsx'
+
+# Ключ метаданных схемы Parquet: посчитанные метрики, итоги и средние
+PARQUET_METADATA_KEY = b'post_frame'
+
+
+def format_date(value):
+    """Дата поста (Timestamp в UTC) в формате DATE_FORMAT"""
+    return value.strftime(DATE_FORMAT)
+
+
+def format_dates(dates):
+    """
+    Колонка 'Дата' (datetime64 в UTC) в строки DATE_FORMAT - векторно, без strftime на пост
+
+    Returns:
+        np.ndarray: object-массив строк 'дд.мм.гггг чч:мм'
+    """
+    naive = dates.dt.tz_convert('UTC').dt.tz_localize(None).to_numpy()
+    # 'гггг-мм-ддTчч:мм' - матрица символов, из которой столбцы выбираются в порядке 'дд.мм.гггг чч:мм'
+    iso_dates = np.datetime_as_string(naive, unit='m').astype('<U16')
+    chars = iso_dates.view('<U1').reshape(len(iso_dates), 16)[:, ISO_TO_DATE_FORMAT]
+    chars[:, [2, 5]] = '.'
+    chars[:, 10] = ' '
+    return np.ascontiguousarray(chars).view('<U16').ravel().astype(object)
+
+
+class PostFrame:
+    """Посты канала (DataFrame без итоговых строк) и агрегаты по ним"""
+
+    def __init__(self, df, metric_keys, totals=None, averages=None):
+        """
+        Args:
+            df (DataFrame): таблица постов без итоговых строк
+            metric_keys (list): посчитанные метрики METRICS (в порядке расчета)
+            totals, averages (dict): готовые итоги и средние (например, из Excel);
+                по умолчанию считаются по таблице
+        """
+        self.metric_keys = list(metric_keys)
+        dtypes = {column: np.int64 for column in COUNTER_TABLE_COLUMNS}
+        dtypes.update({column: np.float64 for column in self.metric_columns})
+        self.df = df.astype({column: dtype for column, dtype in dtypes.items() if column in df.columns})
+
+        if totals is None or averages is None:
+            sums = {column: self.df[column].sum() for column in self.value_columns}
+            totals = {column: sums[column] for column in COUNTER_TABLE_COLUMNS}
+            totals.update(metric_totals(sums, self.metric_keys))
+            averages = {column: self.df[column].mean() for column in self.value_columns}
+        self.totals = totals
+        self.averages = averages
+        self._filled = None
+
+    def __len__(self):
+        return len(self.df)
+
+    @property
+    def metric_columns(self):
+        """Колонки посчитанных метрик"""
+        return [METRICS[key]['column'] for key in self.metric_keys]
+
+    @property
+    def value_columns(self):
+        """Все числовые колонки: счетчики и метрики"""
+        return COUNTER_TABLE_COLUMNS + self.metric_columns
+
+    def take(self, order):
+        """PostFrame со строками в порядке перестановки order (агрегаты не пересчитываются)"""
+        return PostFrame(self.df.take(order).reset_index(drop=True), self.metric_keys, self.totals, self.averages)
+
+    def between(self, start, end):
+        """PostFrame постов периода [start, end] в том же порядке строк, агрегаты - по периоду"""
+        dates = self.df['Дата']
+        mask = ((dates >= start) & (dates <= end)).to_numpy()
+        return PostFrame(self.df[mask].reset_index(drop=True), self.metric_keys)
+
+    def filled(self):
+        """
+        Таблица для статистики и сводного отчета: метрики постов без просмотров
+        (nan) считаются нулевыми. Строится один раз.
+        """
+        if self._filled is None:
+            self._filled = self.df.fillna({column: 0 for column in self.metric_columns})
+        return self._filled
+
+    def with_summary_rows(self):
+        """Таблица для записи в Excel: посты с датами-строками и строки "Итого" и "В среднем на пост" """
+        posts = self.df.assign(Дата=format_dates(self.df['Дата']))
+        total_row = {'Дата': SUMMARY_ROWS[0], 'Полный_текст': '', 'Тип': ''}
+        total_row.update(self.totals)
+        avg_row = {'Дата': SUMMARY_ROWS[1], 'Полный_текст': '', 'Тип': ''}
+        avg_row.update(self.averages)
+        return pd.concat([posts, pd.DataFrame([total_row, avg_row])], ignore_index=True)
+
+    def top_text(self, count=5):
+        """Текст топ-постов по виральности для AI: 'текст i:\\n...' (посты с nan пропускаются)"""
+        top_posts_text = ""
+        for i, post_text in enumerate(self.df.nlargest(count, 'Виральность')['Полный_текст'], 1):
+            if post_text and post_text.strip():
+                top_posts_text += f"текст {i}:\n{post_text.strip()}\n\n"
+        return top_posts_text
+
+    @classmethod
+    def from_excel(cls, path):
+        """
+        PostFrame из posts.xlsx (save_to_excel): итоговые строки отделяются один раз
+        и становятся агрегатами
+        """
+        df = pd.read_excel(path, header=EXCEL_HEADER_ROW)
+        summary = df['Дата'].isin(SUMMARY_ROWS)
+        rows = {row['Дата']: row for _, row in df[summary].iterrows()}
+        df = df[~summary].reset_index(drop=True)
+        df['Дата'] = pd.to_datetime(df['Дата'], format=DATE_FORMAT, utc=True)
+        df['Полный_текст'] = df['Полный_текст'].fillna('')
+
+        present = [key for key, metric in METRICS.items() if metric['column'] in df.columns]
+        metric_keys = [key for key in metric_order(present) if key in present]
+        value_columns = COUNTER_TABLE_COLUMNS + [METRICS[key]['column'] for key in metric_keys]
+        df = df.fillna({column: 0 for column in COUNTER_TABLE_COLUMNS})
+
+        totals = averages = None
+        if set(SUMMARY_ROWS) <= set(rows):
+            totals = {column: rows[SUMMARY_ROWS[0]][column] for column in value_columns}
+            averages = {column: rows[SUMMARY_ROWS[1]][column] for column in value_columns}
+        return cls(df, metric_keys, totals, averages)
+
+    def to_parquet(self, path):
+        """Сохраняет посты в Parquet: типы колонок как в таблице, агрегаты - в метаданных схемы"""
+        table = pa.Table.from_pandas(self.df, preserve_index=False)
+        aggregates = {
+            'metric_keys': self.metric_keys,
+            'totals': {column: np.asarray(value).item() for column, value in self.totals.items()},
+            'averages': {column: np.asarray(value).item() for column, value in self.averages.items()},
+        }
+        metadata = dict(table.schema.metadata or {})
+        metadata[PARQUET_METADATA_KEY] = json.dumps(aggregates, ensure_ascii=False).encode('utf-8')
+        pq.write_table(table.replace_schema_metadata(metadata), path)
+
+    @classmethod
+    def from_parquet(cls, path, columns=None):
+        """
+        PostFrame из posts.parquet (to_parquet)
+
+        Args:
+            columns (list): читаемые колонки (остальные не загружаются с диска);
+                итоги и средние берутся из метаданных и доступны всегда
+        """
+        table = pq.read_table(path, columns=columns)
+        aggregates = json.loads(table.schema.metadata[PARQUET_METADATA_KEY])
+        return cls(table.to_pandas(), aggregates['metric_keys'], aggregates['totals'], aggregates['averages'])
+
+
+def load_post_frame(folder, columns=None):
+    """
+    Таблица постов из папки канала: posts.parquet, если он есть, иначе posts.xlsx
+
+    Args:
+        columns (list): нужные колонки - читаются только из Parquet, Excel разбирается целиком
+
+    Returns:
+        PostFrame или None, если в папке нет таблицы постов
+    """
+    folder = Path(folder)
+    if (folder / PARQUET_FILENAME).exists():
+        return PostFrame.from_parquet(folder / PARQUET_FILENAME, columns)
+    if (folder / EXCEL_FILENAME).exists():
+        return PostFrame.from_excel(folder / EXCEL_FILENAME)
+    return None
+
+
+def post_count(folder):
+    """Количество постов канала по метаданным posts.parquet (без чтения колонок) или None"""
+    path = Path(folder) / PARQUET_FILENAME
+    if not path.exists():
+        return None
+    return pq.ParquetFile(path).metadata.num_rows
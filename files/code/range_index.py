@@ -0,0 +1,153 @@
+"""
+Индекс постов канала для запросов по произвольному периоду
+
+Посты из кэша сообщений сортируются по времени, по каждому счетчику
+строится массив префиксных сумм. Итоги, средние и ER% любого окна
+считаются двумя бинарными поисками (O(log n)) без повторной загрузки
+постов из Telegram и без пересчета таблиц за основной период config.py.
+
+Индекс канала хранится в кэше сообщений (таблица range_index) и строится
+заново только после изменения постов канала (save_posts, update_counters):
+повторные запросы по периодам не читают посты.
+"""
+
+import os
+import sys
+from datetime import datetime, timezone, timedelta
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'config'))
+
+from config import only_text, MERGE_ALBUMS
+from post_columns import PostColumns, COUNTER_FIELDS, COUNTER_COLUMNS, CONTENT_TYPE_CODES
+from metrics import metric_totals
+
+
+def parse_window(text):
+    """
+    Период из строки 'ГГГГ-ММ-ДД:ГГГГ-ММ-ДД' (конечный день включается целиком, UTC)
+
+    Returns:
+        tuple: (start, end) - datetime с часовым поясом UTC
+    """
+    try:
+        start, end = (datetime.strptime(part.strip(), '%Y-%m-%d').replace(tzinfo=timezone.utc)
+                      for part in text.split(':'))
+    except ValueError:
+        raise ValueError(f"Некорректный период '{text}', ожидается ГГГГ-ММ-ДД:ГГГГ-ММ-ДД")
+    if end < start:
+        raise ValueError(f"Конец периода раньше начала: '{text}'")
+    return start, end + timedelta(days=1) - timedelta(seconds=1)
+
+
+class PostRangeIndex:
+    """Отсортированные метки времени постов и префиксные суммы счетчиков"""
+
+    def __init__(self, timestamps, counters):
+        """
+        Args:
+            timestamps: время постов (unix-время, UTC) в любом порядке
+            counters (dict): счетчик из COUNTER_FIELDS -> массив значений тех же постов
+        """
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        order = np.argsort(timestamps, kind='stable')
+        self.timestamps = timestamps[order]
+        # prefix[field][i] - сумма счетчика по первым i постам
+        self.prefix = {}
+        for field in COUNTER_FIELDS:
+            prefix = np.zeros(len(order) + 1, dtype=np.int64)
+            np.cumsum(np.asarray(counters[field], dtype=np.int64)[order], out=prefix[1:])
+            self.prefix[field] = prefix
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @classmethod
+    def from_columns(cls, posts):
+        """Индекс по колонкам постов (с учетом only_text, как таблица постов)"""
+        timestamps = np.frombuffer(posts.date, dtype=np.int64)
+        counters = {field: np.frombuffer(posts.counters[field], dtype=np.int64) for field in COUNTER_FIELDS}
+        if only_text:
+            mask = np.frombuffer(posts.content_type, dtype=np.int8) == CONTENT_TYPE_CODES['Текст']
+            timestamps = timestamps[mask]
+            counters = {field: values[mask] for field, values in counters.items()}
+        return cls(timestamps, counters)
+
+    @classmethod
+    def from_blobs(cls, timestamps, prefix):
+        """Индекс из байтов to_blobs (массивы не копируются)"""
+        index = cls.__new__(cls)
+        index.timestamps = np.frombuffer(timestamps, dtype=np.int64)
+        rows = np.frombuffer(prefix, dtype=np.int64).reshape(len(COUNTER_FIELDS), len(index.timestamps) + 1)
+        index.prefix = dict(zip(COUNTER_FIELDS, rows))
+        return index
+
+    def to_blobs(self):
+        """Байты меток времени и префиксных сумм (в порядке COUNTER_FIELDS) для хранения"""
+        return self.timestamps.tobytes(), np.stack([self.prefix[field] for field in COUNTER_FIELDS]).tobytes()
+
+    @classmethod
+    def from_store(cls, store, channel_id, merge_albums=MERGE_ALBUMS):
+        """
+        Индекс по всем закэшированным постам канала: сохраненный в кэше или, если посты
+        изменились, построенный заново (тексты не загружаются) и сохраненный
+        """
+        # Индекс зависит от сведения альбомов, only_text и набора счетчиков
+        variant = f"merge_albums={int(merge_albums)};only_text={int(only_text)};{','.join(COUNTER_FIELDS)}"
+        stored = store.load_range_index(channel_id, variant)
+        if stored is not None:
+            return cls.from_blobs(*stored)
+
+        posts = PostColumns.from_rows(store.iter_posts(channel_id, with_text=False))
+        if merge_albums:
+            posts = posts.merge_albums()
+        index = cls.from_columns(posts)
+        store.save_range_index(channel_id, variant, *index.to_blobs())
+        return index
+
+    def bounds(self, start, end):
+        """Позиции постов периода [start, end] в отсортированном индексе"""
+        lo = int(np.searchsorted(self.timestamps, int(start.timestamp()), side='left'))
+        hi = int(np.searchsorted(self.timestamps, int(end.timestamp()), side='right'))
+        return lo, hi
+
+    def window(self, start, end):
+        """
+        Итоги, средние и ER% постов периода [start, end]
+
+        Returns:
+            dict: posts - количество постов; totals и averages - колонка таблицы
+                постов -> значение (как PostFrame.totals/averages); er - ER% периода
+                (по суммам, как в строке "Итого")
+        """
+        lo, hi = self.bounds(start, end)
+        posts = hi - lo
+        totals = {COUNTER_COLUMNS[field]: int(self.prefix[field][hi] - self.prefix[field][lo])
+                  for field in COUNTER_FIELDS}
+        averages = {column: (total / posts if posts else 0.0) for column, total in totals.items()}
+        er = metric_totals(totals, ['er'])['ER%'] if posts else 0.0
+        return {'posts': posts, 'totals': totals, 'averages': averages, 'er': er}
+
+
+def window_summary(store, usernames, start, end, merge_albums=MERGE_ALBUMS):
+    """
+    Итоги периода по каналам из кэша сообщений
+
+    Returns:
+        DataFrame: строка на канал; каналы, которых нет в кэше, пропускаются
+    """
+    rows = []
+    for username in usernames:
+        channel_id = store.find_channel(username)
+        if channel_id is None:
+            print(f"⚠️ Канала {username} нет в кэше сообщений - сначала выполните анализ")
+            continue
+
+        stats = PostRangeIndex.from_store(store, channel_id, merge_albums).window(start, end)
+        row = {'Канал': username, 'Постов': stats['posts']}
+        row.update(stats['totals'])
+        row.update({f"В среднем: {column}": value for column, value in stats['averages'].items()})
+        row['ER%'] = stats['er']
+        rows.append(row)
+    return pd.DataFrame(rows)
@@ -0,0 +1,182 @@
+"""
+Адаптивное ограничение частоты запросов к Telegram
+
+Для каждого метода (get_entity, iter_messages, get_messages) ведется свой
+token bucket. При FloodWaitError скорость метода уменьшается вдвое и все
+его запросы ждут указанное Telegram время, после успешных запросов скорость
+постепенно растет обратно. Время ожидания суммируется для отчета.
+"""
+
+import os
+import sys
+import time
+import asyncio
+import threading
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'config'))
+
+from config import (
+    TELEGRAM_REQUESTS_PER_SECOND, TELEGRAM_MIN_REQUESTS_PER_SECOND,
+    TELEGRAM_MAX_REQUESTS_PER_SECOND, TELEGRAM_BURST, TELEGRAM_METHOD_RATES
+)
+from telethon.errors import FloodWaitError
+
+# Telethon запрашивает историю страницами по 100 сообщений
+MESSAGES_PAGE_SIZE = 100
+
+
+class TokenBucket:
+    """Token bucket одного метода; токены могут уходить в минус - это очередь ожидающих"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def reserve(self, now):
+        """Забирает токен и возвращает, сколько секунд нужно подождать перед запросом"""
+        self.tokens = min(self.capacity, self.tokens + max(0.0, now - self.updated) * self.rate)
+        self.updated = max(now, self.updated)
+        self.tokens -= 1
+        wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        return max(wait, self.blocked_until - now)
+
+
+class AdaptiveRateLimiter:
+    """Общий ограничитель запросов одного аккаунта Telegram"""
+
+    def __init__(self, rate=TELEGRAM_REQUESTS_PER_SECOND, burst=TELEGRAM_BURST,
+                 min_rate=TELEGRAM_MIN_REQUESTS_PER_SECOND, max_rate=TELEGRAM_MAX_REQUESTS_PER_SECOND,
+                 method_rates=None):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.method_rates = TELEGRAM_METHOD_RATES if method_rates is None else method_rates
+        self.buckets = {}
+        self.total_wait = 0.0
+        self.flood_waits = 0
+        self.flood_wait_seconds = 0
+        self._lock = threading.Lock()
+
+    def _bucket(self, method):
+        bucket = self.buckets.get(method)
+        if bucket is None:
+            bucket = TokenBucket(self.method_rates.get(method, self.rate), self.burst)
+            self.buckets[method] = bucket
+        return bucket
+
+    def _reserve(self, method):
+        with self._lock:
+            delay = self._bucket(method).reserve(time.monotonic())
+            if delay > 0:
+                self.total_wait += delay
+        return delay
+
+    def wait(self, method):
+        """Ждет, пока метод можно вызвать"""
+        delay = self._reserve(method)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def wait_async(self, method):
+        """Асинхронный вариант wait"""
+        delay = self._reserve(method)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def on_success(self, method):
+        """Успешный запрос - аддитивно увеличиваем скорость метода"""
+        with self._lock:
+            bucket = self._bucket(method)
+            bucket.rate = min(self.max_rate, bucket.rate + self.min_rate)
+
+    def on_flood_wait(self, method, seconds):
+        """FloodWait - вдвое снижаем скорость и блокируем метод на указанное время"""
+        with self._lock:
+            bucket = self._bucket(method)
+            bucket.rate = max(self.min_rate, bucket.rate / 2)
+            bucket.tokens = min(bucket.tokens, 0)
+            bucket.blocked_until = max(bucket.blocked_until, time.monotonic() + seconds)
+            self.flood_waits += 1
+            self.flood_wait_seconds += seconds
+        print(f"⏳ FloodWait для {method}: {seconds} с, новая скорость {bucket.rate:.2f} запр/с")
+
+    def blocked_for(self):
+        """Сколько секунд аккаунт еще заблокирован FloodWait (0 - не заблокирован)"""
+        now = time.monotonic()
+        with self._lock:
+            return max([0.0] + [bucket.blocked_until - now for bucket in self.buckets.values()])
+
+    def call(self, method, function, *args, **kwargs):
+        """Вызывает метод клиента с ожиданием и учетом FloodWait"""
+        self.wait(method)
+        try:
+            result = function(*args, **kwargs)
+        except FloodWaitError as e:
+            self.on_flood_wait(method, e.seconds)
+            raise
+        self.on_success(method)
+        return result
+
+    async def call_async(self, method, function, *args, **kwargs):
+        """Асинхронный вариант call"""
+        await self.wait_async(method)
+        try:
+            result = await function(*args, **kwargs)
+        except FloodWaitError as e:
+            self.on_flood_wait(method, e.seconds)
+            raise
+        self.on_success(method)
+        return result
+
+    def iterate(self, method, iterable, page_size=MESSAGES_PAGE_SIZE):
+        """Итерирует iter_messages, ожидая токен перед запросом каждой страницы"""
+        iterator = iter(iterable)
+        count = 0
+        while True:
+            if count % page_size == 0:
+                self.wait(method)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            except FloodWaitError as e:
+                self.on_flood_wait(method, e.seconds)
+                raise
+            if count % page_size == 0:
+                self.on_success(method)
+            count += 1
+            yield item
+
+    async def iterate_async(self, method, iterable, page_size=MESSAGES_PAGE_SIZE):
+        """Асинхронный вариант iterate"""
+        iterator = iterable.__aiter__()
+        count = 0
+        while True:
+            if count % page_size == 0:
+                await self.wait_async(method)
+            try:
+                item = await iterator.__anext__()
+            except StopAsyncIteration:
+                return
+            except FloodWaitError as e:
+                self.on_flood_wait(method, e.seconds)
+                raise
+            if count % page_size == 0:
+                self.on_success(method)
+            count += 1
+            yield item
+
+    def report(self):
+        """Строка со статистикой ожидания"""
+        rates = ', '.join(f"{method}: {bucket.rate:.2f}" for method, bucket in sorted(self.buckets.items()))
+        return (f"Ожидание лимитов Telegram: {self.total_wait:.1f} с, "
+                f"FloodWait: {self.flood_waits} раз ({self.flood_wait_seconds} с)"
+                + (f", скорость (запр/с) - {rates}" if rates else ""))
+
+
+# Ограничитель по умолчанию для вызовов без собственной TelegramSession
+default_limiter = AdaptiveRateLimiter()
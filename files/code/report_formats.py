@@ -0,0 +1,243 @@
+"""
+Форматы отчетов канала
+
+Отчет - набор листов {название: таблица и параметры write_sheet}, формат
+решает, как его записать:
+
+- excel: книга .xlsx с оформлением, над таблицей - канал и период (write_sheet);
+- csv: каждый лист - файл .csv (разделитель ';', UTF-8), первая строка - заголовок;
+- jsonl: каждый лист - файл .jsonl, строка таблицы - JSON-объект {колонка: значение}.
+
+CSV и JSONL пишутся построчно прямо из таблицы постов (dataframe_rows в порядке
+сортировки, кусками по ROW_CHUNK_SIZE строк), без книги и без отсортированной копии. В них только строки таблицы:
+без строк с каналом и периодом и без итоговых строк "Итого" и "В среднем на пост".
+Первый лист пишется в файл отчета (posts.csv), остальные - рядом (posts_<лист>.csv).
+
+Формат выбирается в config.py (REPORT_FORMAT) или параметром --report-format.
+"""
+
+import os
+import re
+import sys
+import csv
+import json
+from abc import ABC, abstractmethod
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.styles import Font, PatternFill, Alignment
+from openpyxl.utils import get_column_letter
+from openpyxl.cell import WriteOnlyCell
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'config'))
+
+from config import REPORT_FORMAT
+from post_frame import PostFrame, format_dates, EXCEL_HEADER_ROW
+
+# Оформление заголовка таблицы - одни объекты стилей на все листы и файлы
+HEADER_FONT = Font(bold=True, color="FFFFFF")
+HEADER_FILL = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+HEADER_ALIGNMENT = Alignment(horizontal="center", vertical="center")
+
+# Строки отчета собираются в объекты Python кусками по столько строк
+ROW_CHUNK_SIZE = 10_000
+
+
+def sheet_columns(df):
+    """
+    Значения колонок для записи отчета: datetime64 (дата поста) - строками DATE_FORMAT
+    
+    Returns:
+        dict: название колонки -> Series значений в порядке строк df
+    """
+    return {column: (pd.Series(format_dates(df[column]), dtype=object)
+                     if pd.api.types.is_datetime64_any_dtype(df[column]) else df[column])
+            for column in df.columns}
+
+
+def dataframe_rows(df, order=None, columns=None, chunk_size=ROW_CHUNK_SIZE):
+    """
+    Заголовок и строки таблицы в порядке order - без промежуточной отсортированной копии
+    
+    Колонки datetime64 (дата поста) пишутся строками DATE_FORMAT. Значения переводятся
+    в объекты Python кусками по chunk_size строк, поэтому в памяти одновременно только
+    текущий кусок, а не вся таблица.
+    
+    Args:
+        columns (dict): готовый результат sheet_columns(df) (без него даты форматируются по кускам)
+    """
+    yield list(df.columns if columns is None else columns)
+    positions = np.arange(len(df)) if order is None else np.asarray(order)
+    for start in range(0, len(positions), chunk_size):
+        chunk = positions[start:start + chunk_size]
+        part = (sheet_columns(df.iloc[chunk]) if columns is None
+                else {name: values.iloc[chunk] for name, values in columns.items()})
+        yield from map(list, zip(*(values.tolist() for values in part.values())))
+
+
+def column_widths(columns, max_width=50):
+    """
+    Ширина колонок Excel по длине самого длинного значения или заголовка (+2, не больше max_width)
+    
+    Длины считаются векторно по колонкам (str.len), а не через str(cell.value) по каждой ячейке.
+    """
+    widths = []
+    for name, values in columns.items():
+        lengths = values.astype(str).str.len()
+        longest = max(len(str(name)), int(lengths.max()) if len(lengths) else 0)
+        widths.append(min(longest + 2, max_width))
+    return widths
+
+
+def write_sheet(ws, df, channel_username, start_date, end_date, order=None, count_label="Всего постов"):
+    """
+    Записывает таблицу на лист Excel с форматированием
+    
+    Лист пишется потоково (Workbook(write_only=True)): ширина колонок и
+    закрепление задаются заранее, строки с каналом и периодом - первыми,
+    поэтому таблицу не нужно сдвигать вставкой строк.
+    
+    Args:
+        ws: лист write-only книги (wb.create_sheet)
+        order: перестановка строк (sort_permutation) - строки пишутся сразу в этом порядке
+        count_label: подпись количества строк над таблицей
+    """
+    columns = sheet_columns(df)
+    
+    # Автоматическая ширина столбцов
+    for index, width in enumerate(column_widths(columns), 1):
+        ws.column_dimensions[get_column_letter(index)].width = width
+    
+    # Закрепляем заголовки таблицы (под строками с каналом и периодом)
+    ws.freeze_panes = f"A{EXCEL_HEADER_ROW + 2}"
+    
+    # Информация о канале и периоде
+    ws.append([f"Канал: {channel_username}"])
+    ws.append([f"Период: {start_date.strftime('%d.%m.%Y')} - {end_date.strftime('%d.%m.%Y')}"])
+    ws.append([f"{count_label}: {len(df)}"])
+    
+    # Форматирование заголовков
+    rows = dataframe_rows(df, order, columns)
+    header = []
+    for name in next(rows):
+        cell = WriteOnlyCell(ws, value=name)
+        cell.font = HEADER_FONT
+        cell.fill = HEADER_FILL
+        cell.alignment = HEADER_ALIGNMENT
+        header.append(cell)
+    ws.append(header)
+    
+    # Добавляем данные
+    for row in rows:
+        ws.append(row)
+
+
+def sheet_table(table, summary_rows):
+    """
+    DataFrame листа: PostFrame - с итоговыми строками (summary_rows) или только посты,
+    остальные таблицы - как есть
+    """
+    if isinstance(table, PostFrame):
+        return table.with_summary_rows() if summary_rows else table.df
+    return table
+
+
+class ExcelReport:
+    """Книга Excel: лист на каждую таблицу, оформленный заголовок, канал и период над таблицей"""
+
+    extension = '.xlsx'
+
+    def save(self, path, channel_username, sheets):
+        """
+        Args:
+            path (Path): файл книги
+            sheets (dict): название листа -> аргументы write_sheet (df - DataFrame или PostFrame)
+
+        Returns:
+            list: записанные файлы
+        """
+        wb = Workbook(write_only=True)
+        for title, sheet in sheets.items():
+            sheet = dict(sheet, df=sheet_table(sheet['df'], summary_rows=True))
+            write_sheet(wb.create_sheet(title), channel_username=channel_username, **sheet)
+        wb.save(path)
+        return [path]
+
+
+class TableReport(ABC):
+    """Построчный формат: каждый лист - отдельный файл, строки пишутся по одной"""
+
+    extension = None
+
+    def sheet_path(self, path, title, index):
+        """Файл листа: первый лист - path, остальные - path_<лист> рядом с ним"""
+        if index == 0:
+            return path
+        name = re.sub(r'[^\w.-]+', '_', title)
+        return path.with_name(f"{path.stem}_{name}{self.extension}")
+
+    def save(self, path, channel_username, sheets):
+        """
+        Args:
+            path (Path): файл первого листа
+            sheets (dict): название листа -> аргументы write_sheet (используются df и order)
+
+        Returns:
+            list: записанные файлы (по одному на лист)
+        """
+        paths = []
+        for index, (title, sheet) in enumerate(sheets.items()):
+            sheet_path = self.sheet_path(path, title, index)
+            rows = dataframe_rows(sheet_table(sheet['df'], summary_rows=False), sheet.get('order'))
+            with open(sheet_path, 'w', newline='', encoding='utf-8') as file:
+                self.write_rows(file, rows)
+            paths.append(sheet_path)
+        return paths
+
+    @abstractmethod
+    def write_rows(self, file, rows):
+        """Записывает заголовок и строки (итератор dataframe_rows) в открытый файл"""
+
+
+class CsvReport(TableReport):
+    """CSV: разделитель ';', как у остальных CSV проекта"""
+
+    extension = '.csv'
+
+    def write_rows(self, file, rows):
+        csv.writer(file, delimiter=';').writerows(rows)
+
+
+class JsonlReport(TableReport):
+    """JSON Lines: объект {колонка: значение} на строку, nan - null"""
+
+    extension = '.jsonl'
+
+    def write_rows(self, file, rows):
+        header = next(rows)
+        for row in rows:
+            record = {name: None if isinstance(value, float) and value != value else value
+                      for name, value in zip(header, row)}
+            file.write(json.dumps(record, ensure_ascii=False, default=str))
+            file.write('\n')
+
+
+# Форматы отчетов: название (REPORT_FORMAT, --report-format) -> формат
+REPORT_FORMATS = {
+    'excel': ExcelReport(),
+    'csv': CsvReport(),
+    'jsonl': JsonlReport(),
+}
+
+
+def get_report_format(name=REPORT_FORMAT):
+    """Формат отчетов по названию"""
+    if name not in REPORT_FORMATS:
+        raise ValueError(f"Неизвестный формат отчетов: {name} (доступны: {', '.join(REPORT_FORMATS)})")
+    return REPORT_FORMATS[name]
+
+
+def report_filename(filename, report_format=REPORT_FORMAT):
+    """Имя файла отчета с расширением формата: posts.xlsx -> posts.csv"""
+    return Path(filename).stem + get_report_format(report_format).extension
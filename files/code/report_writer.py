@@ -0,0 +1,111 @@
+"""
+Фоновая запись отчетов канала
+
+Запись posts.xlsx, файлов с сортировками и сводного отчета (openpyxl и
+zip-сжатие) передается ограниченному пулу исполнителей: пакетный анализ не ждет
+ее и сразу загружает следующий канал. Задачи получают готовые таблицы постов
+(PostFrame) и не меняют их, канал их тоже больше не меняет.
+
+Задачи с одним ключом (одни и те же файлы) выполняет один исполнитель в порядке
+отправки: файл не пишется двумя задачами одновременно, и в нем остается отчет
+последнего отправленного канала, как при синхронной записи. Очередь ограничена
+(REPORT_WRITER_MAX_PENDING): если запись отстает, анализ ждет свободного места,
+а не копит таблицы в памяти. AnalysisManager дожидается записи (wait) перед
+сохранением checkpoint'а, поэтому отчеты завершенных каналов не теряются, а канал
+с ошибкой записи отчета не считается завершенным и анализируется заново.
+"""
+
+import os
+import sys
+import threading
+from functools import partial
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor, wait as wait_futures
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'config'))
+
+from config import REPORT_WRITER_WORKERS, REPORT_WRITER_PROCESSES, REPORT_WRITER_MAX_PENDING
+
+
+class ReportWriter:
+    """Ограниченный пул фоновой записи отчетов; при workers=0 отчеты пишутся сразу"""
+
+    def __init__(self, workers=REPORT_WRITER_WORKERS, processes=REPORT_WRITER_PROCESSES,
+                 max_pending=REPORT_WRITER_MAX_PENDING):
+        """
+        Args:
+            workers (int): количество исполнителей (0 - запись в вызывающем потоке)
+            processes (bool): исполнители - процессы (функции и аргументы передаются через pickle)
+            max_pending (int): сколько задач может выполняться и ждать одновременно
+        """
+        executor = ProcessPoolExecutor if processes else ThreadPoolExecutor
+        # У каждого исполнителя одна очередь: задачи одного ключа идут строго по порядку
+        self.lanes = [executor(max_workers=1) for _ in range(workers)]
+        self.slots = threading.BoundedSemaphore(max(max_pending, workers, 1))
+        # RLock: wait вызывается и из обработчика сигнала в основном потоке
+        self.lock = threading.RLock()
+        # Отправленные задачи до ближайшего wait (и уже выполненные - чтобы учесть их ошибки): future -> ключ
+        self.pending = {}
+
+    @property
+    def background(self):
+        """Пишутся ли отчеты в фоне"""
+        return bool(self.lanes)
+
+    def submit(self, key, function, *args, **kwargs):
+        """
+        Записывает отчет в фоне (при заполненной очереди ждет свободного места)
+
+        Args:
+            key (str): записываемые файлы - задачи с одним ключом выполняются по порядку
+            function: функция записи уровня модуля (в режиме процессов передается через pickle)
+
+        Returns:
+            Future с результатом function (при workers=0 - уже выполненный)
+        """
+        if not self.background:
+            # Синхронная запись: ошибки, как и раньше, получает вызывающий код
+            future = Future()
+            future.set_result(function(*args, **kwargs))
+            return future
+
+        self.slots.acquire()
+        try:
+            future = self.lanes[hash(key) % len(self.lanes)].submit(function, *args, **kwargs)
+        except BaseException:
+            self.slots.release()
+            raise
+        with self.lock:
+            self.pending[future] = key
+        future.add_done_callback(partial(self._done, key))
+        return future
+
+    def _done(self, key, future):
+        """Освобождает место в очереди и сообщает об ошибке записи"""
+        self.slots.release()
+        if future.exception() is not None:
+            print(f"❌ Ошибка записи отчета {key}: {future.exception()}")
+
+    def wait(self):
+        """
+        Дожидается записи всех отправленных к этому моменту отчетов
+
+        Returns:
+            list: ключи отчетов, записанных с ошибкой после прошлого wait
+        """
+        with self.lock:
+            submitted = dict(self.pending)
+        running = sum(1 for future in submitted if not future.done())
+        if running:
+            print(f"⏳ Дожидаемся записи отчетов: {running}")
+        wait_futures(submitted)
+        with self.lock:
+            for future in submitted:
+                del self.pending[future]
+        return [key for future, key in submitted.items() if future.exception() is not None]
+
+    def close(self):
+        """Дожидается записи и останавливает исполнителей"""
+        self.wait()
+        for lane in self.lanes:
+            lane.shutdown()
+        self.lanes = []
@@ -0,0 +1,164 @@
+"""
+Пул аккаунтов Telegram для параллельной загрузки каналов
+
+Каждый аккаунт - отдельная TelegramSession со своим session-файлом (или
+StringSession), ограничителем запросов и разделом кэша каналов. Каналы
+заранее распределяются между аккаунтами по кругу; освободившийся аккаунт
+забирает каналы у остальных, а каналы аккаунта, получившего FloodWait,
+достаются тем, кто не заблокирован.
+"""
+
+import os
+import sys
+import asyncio
+from collections import deque
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'config'))
+
+from config import api_id, api_hash, TELEGRAM_SESSIONS, FLOOD_WAIT_MAX_RETRIES
+from telethon.errors import FloodWaitError
+from telegram_session import TelegramSession
+from entity_cache import EntityCache
+
+# Как часто простаивающий воркер проверяет, не появилась ли работа (секунды)
+IDLE_POLL_INTERVAL = 0.5
+
+
+class SessionPool:
+    """Несколько TelegramSession с шардированием каналов и перехватом работы"""
+
+    def __init__(self, sessions):
+        if not sessions:
+            raise ValueError("Пул должен содержать хотя бы один аккаунт")
+        self.sessions = sessions
+        self._shards = {session.session_name: deque() for session in sessions}
+        self._attempts = {}
+        self._in_flight = 0
+        self.stolen = 0
+        self.requeued = 0
+
+    @classmethod
+    def from_config(cls, accounts=None):
+        """Пул из настройки TELEGRAM_SESSIONS"""
+        accounts = accounts or TELEGRAM_SESSIONS
+        # Один файл кэша каналов на все аккаунты, у каждого свой раздел
+        entity_cache = EntityCache(session_name=accounts[0]['name'])
+        sessions = [
+            TelegramSession(
+                session_name=account['name'],
+                api_id=account.get('api_id', api_id),
+                api_hash=account.get('api_hash', api_hash),
+                string_session=account.get('string_session'),
+                entity_cache=entity_cache.for_session(account['name'])
+            )
+            for account in accounts
+        ]
+        return cls(sessions)
+
+    @property
+    def primary(self):
+        """Первый аккаунт - используется в синхронном режиме"""
+        return self.sessions[0]
+
+    def distribute(self, items):
+        """Распределяет задания между аккаунтами по кругу"""
+        for shard in self._shards.values():
+            shard.clear()
+        for position, item in enumerate(items):
+            session = self.sessions[position % len(self.sessions)]
+            self._shards[session.session_name].append(item)
+
+    def pending(self):
+        """Сколько заданий еще не взято в работу"""
+        return sum(len(shard) for shard in self._shards.values())
+
+    def _take(self, session):
+        """Следующее задание аккаунта: свое или перехваченное у другого аккаунта"""
+        own = self._shards[session.session_name]
+        if own:
+            return own.popleft()
+
+        # Сначала забираем работу у заблокированных аккаунтов, затем у самых загруженных
+        victims = [other for other in self.sessions if other is not session and self._shards[other.session_name]]
+        if not victims:
+            return None
+        victim = max(victims, key=lambda other: (other.limiter.blocked_for() > 0,
+                                                 len(self._shards[other.session_name])))
+        self.stolen += 1
+        return self._shards[victim.session_name].popleft()
+
+    def _is_final_attempt(self, item):
+        # После стольких FloodWait канал больше не передается, а ждет на текущем аккаунте
+        return self._attempts.get(item, 0) >= FLOOD_WAIT_MAX_RETRIES * len(self.sessions)
+
+    async def run(self, items, handler, workers_per_session=1):
+        """
+        Обрабатывает задания всеми аккаунтами пула
+
+        Args:
+            items (list): задания (хешируемые, например (index, channel_url))
+            handler: корутина handler(session, item, final); должна пробросить
+                FloodWaitError, если final=False, чтобы задание перешло другому аккаунту
+            workers_per_session (int): одновременных заданий на один аккаунт
+        """
+        self.distribute(items)
+        self._attempts = {}
+        self._in_flight = 0
+
+        async def worker(session):
+            while True:
+                blocked = session.limiter.blocked_for()
+                item = self._take(session) if blocked <= 0 else None
+
+                if item is None:
+                    if self.pending() == 0 and self._in_flight == 0:
+                        return
+                    # Аккаунт заблокирован или работы пока нет - ждем
+                    await asyncio.sleep(min(blocked, IDLE_POLL_INTERVAL) if blocked > 0 else IDLE_POLL_INTERVAL)
+                    continue
+
+                self._in_flight += 1
+                try:
+                    await handler(session, item, self._is_final_attempt(item))
+                except FloodWaitError as e:
+                    # Возвращаем задание в очередь аккаунта - его заберет незаблокированный аккаунт
+                    self._attempts[item] = self._attempts.get(item, 0) + 1
+                    self._shards[session.session_name].appendleft(item)
+                    self.requeued += 1
+                    print(f"🔀 Аккаунт {session.session_name} получил FloodWait {e.seconds} с, "
+                          f"задание передается другим аккаунтам")
+                finally:
+                    self._in_flight -= 1
+
+        await asyncio.gather(*(worker(session)
+                               for session in self.sessions
+                               for _ in range(workers_per_session)))
+
+    async def start_async(self):
+        """Подключает все аккаунты"""
+        await asyncio.gather(*(session.start_async() for session in self.sessions))
+
+    async def close_async(self):
+        """Отключает все аккаунты"""
+        await asyncio.gather(*(session.close_async() for session in self.sessions),
+                             return_exceptions=True)
+
+    def close(self):
+        """Отключает аккаунты вне event loop"""
+        for session in self.sessions:
+            session.close()
+
+    async def __aenter__(self):
+        await self.start_async()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close_async()
+
+    def report(self):
+        """Статистика по аккаунтам"""
+        lines = [f"{session.session_name}: {session.limiter.report()}. {session.entity_cache.report()}"
+                 for session in self.sessions]
+        if len(self.sessions) > 1:
+            lines.append(f"Перехвачено заданий: {self.stolen}, передано после FloodWait: {self.requeued}")
+        return '\n'.join(lines)
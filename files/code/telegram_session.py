@@ -0,0 +1,102 @@
+"""
+Жизненный цикл подключения к Telegram
+
+Одно подключение TelegramClient открывается на весь пакетный анализ
+и передается в analyse_with_client / analyse_async, вместо того чтобы
+каждый канал заново загружал session-файл, подключался и отключался.
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'config'))
+
+from config import api_id, api_hash
+from telethon.sync import TelegramClient
+from telethon.sessions import StringSession
+from rate_limiter import AdaptiveRateLimiter
+from entity_cache import EntityCache
+
+
+class TelegramSession:
+    """Владеет одним подключенным TelegramClient на время пакетного анализа"""
+    
+    def __init__(self, session_name='session_name', api_id=api_id, api_hash=api_hash, limiter=None,
+                 string_session=None, entity_cache=None):
+        self.session_name = session_name
+        self.api_id = api_id
+        self.api_hash = api_hash
+        # Строка StringSession: сессия хранится в памяти, без SQLite-файла
+        self.string_session = string_session
+        # Ограничитель запросов этого аккаунта
+        self.limiter = limiter or AdaptiveRateLimiter()
+        # Кэш username этого аккаунта (access_hash привязан к аккаунту)
+        self.entity_cache = entity_cache or EntityCache(session_name=session_name)
+        self._client = None
+    
+    def _create_client(self):
+        session = StringSession(self.string_session) if self.string_session else self.session_name
+        # flood_sleep_threshold=0: Telethon не ждет FloodWait молча, а передает его
+        # ограничителю, который подстраивает скорость запросов
+        return TelegramClient(session, self.api_id, self.api_hash, flood_sleep_threshold=0)
+    
+    @property
+    def client(self):
+        """Подключенный клиент (переподключается, если соединение было потеряно)"""
+        if self._client is None:
+            return self.start()
+        if not self._client.is_connected():
+            print("🔌 Соединение с Telegram потеряно, переподключаемся...")
+            self._client.connect()
+        return self._client
+    
+    def start(self):
+        """Подключается и авторизуется (один раз на весь запуск)"""
+        if self._client is None:
+            self._client = self._create_client()
+            self._client.start()
+        return self._client
+    
+    def close(self):
+        """Отключается от Telegram"""
+        if self._client is not None:
+            try:
+                self._client.disconnect()
+            finally:
+                self._client = None
+    
+    async def start_async(self):
+        """Подключается внутри event loop (асинхронный режим)"""
+        if self._client is None:
+            self._client = self._create_client()
+            await self._client.start()
+        return self._client
+    
+    async def client_async(self):
+        """Подключенный клиент внутри event loop (переподключается при потере соединения)"""
+        if self._client is None:
+            return await self.start_async()
+        if not self._client.is_connected():
+            print(f"🔌 Соединение аккаунта {self.session_name} потеряно, переподключаемся...")
+            await self._client.connect()
+        return self._client
+    
+    async def close_async(self):
+        """Отключается внутри event loop"""
+        if self._client is not None:
+            try:
+                await self._client.disconnect()
+            finally:
+                self._client = None
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    async def __aenter__(self):
+        return await self.start_async()
+    
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close_async()
@@ -178,6 +178,176 @@ def test_atomic_operations():
         shutil.rmtree(test_dir)
         print("🧹 Временные файлы удалены")
 
+def make_manager(test_dir):
+    """AnalysisManager с файлами во временной папке, без обработчиков сигналов и atexit"""
+    from main import AnalysisManager
+    
+    return AnalysisManager(
+        checkpoint_file=os.path.join(test_dir, "checkpoint.json"),
+        results_file=os.path.join(test_dir, "results.csv"),
+        temp_results_file=os.path.join(test_dir, "results_temp.csv"),
+        install_handlers=False
+    )
+
+def test_out_of_order_checkpoint():
+    """Тестирует checkpoint при завершении каналов не по порядку (асинхронный режим)"""
+    print("\n🧪 ТЕСТ CHECKPOINT'А ПРИ ЗАВЕРШЕНИИ НЕ ПО ПОРЯДКУ")
+    print("=" * 50)
+    
+    test_dir = tempfile.mkdtemp(prefix="test_async_")
+    
+    try:
+        manager = make_manager(test_dir)
+        
+        # Канал 1 - пустая ссылка, каналы 2 и 3 завершаются раньше канала 0
+        skipped = {1}
+        manager._record_result(3, {'channelname': 'c3'}, skipped)
+        manager._record_result(2, {'channelname': 'c2'}, skipped)
+        assert manager.current_index == 0, "current_index не должен перескакивать незавершенный канал"
+        
+        manager._record_result(0, {'channelname': 'c0'}, skipped)
+        assert manager.current_index == 4
+        assert [r['channelname'] for r in manager.results] == ['c0', 'c2', 'c3']
+        
+        # Проверяем, что индексы переживают перезапуск
+        manager._save_checkpoint()
+        restored = make_manager(test_dir)
+        assert restored.completed_indices == [0, 2, 3]
+        assert restored.current_index == 4
+        
+        print("✅ Тест checkpoint'а при завершении не по порядку пройден!")
+        
+    finally:
+        shutil.rmtree(test_dir)
+        print("🧹 Временные файлы удалены")
+
+def test_failed_reports_not_checkpointed():
+    """Канал, отчет которого записан с ошибкой, не попадает в checkpoint как завершенный"""
+    print("\n🧪 ТЕСТ ОШИБКИ ЗАПИСИ ОТЧЕТОВ")
+    print("=" * 50)
+    
+    test_dir = tempfile.mkdtemp(prefix="test_reports_")
+    manager = make_manager(test_dir)
+    
+    def fail():
+        raise OSError("диск заполнен")
+    
+    try:
+        for index in range(3):
+            manager._record_result(index, {'channelname': f'c{index}', 'linktochannel': f'https://t.me/c{index}'})
+        # Ошибка канала с некорректной ссылкой не мешает сопоставлению отчетов с каналами
+        manager._record_result(3, manager._error_result('не ссылка', 'некорректная ссылка'))
+        manager.report_writer.submit(os.path.join(test_dir, 'all_folders', 'c1', 'posts.xlsx'), fail)
+        manager._save_checkpoint()
+        
+        with open(os.path.join(test_dir, "checkpoint.json"), 'r', encoding='utf-8') as f:
+            checkpoint = json.load(f)
+        assert checkpoint['completed_indices'] == [0, 2, 3]
+        assert [r['linktochannel'] for r in checkpoint['results']] == ['https://t.me/c0', 'https://t.me/c2', 'не ссылка']
+        assert checkpoint['failed_indices'] == [1], "канал с ошибкой отчета анализируется заново"
+        
+        restored = make_manager(test_dir)
+        assert restored.failed_indices == {1}
+        print("✅ Тест ошибки записи отчетов пройден!")
+        
+    finally:
+        manager.report_writer.close()
+        shutil.rmtree(test_dir)
+        print("🧹 Временные файлы удалены")
+
+class ClosedSession:
+    """Сессия Telegram пакетного анализа без подключения"""
+    
+    def close(self):
+        pass
+
+def run_with_failing_report(test_dir, failures):
+    """
+    Синхронный анализ 4 каналов, где запись отчета канала c1 падает failures раз
+    
+    Returns:
+        tuple: (менеджер, каналы итогового CSV)
+    """
+    import pandas as pd
+    
+    manager = make_manager(test_dir)
+    manager.telegram_session = ClosedSession()
+    attempts = []
+    
+    def analyze_channel(channel_url, channel_index, session=None):
+        channel = channel_url.rsplit('/', 1)[-1]
+        
+        def write():
+            if channel == 'c1' and attempts.count(channel) <= failures:
+                raise OSError("диск заполнен")
+        
+        attempts.append(channel)
+        manager.report_writer.submit(os.path.join(test_dir, 'all_folders', channel, 'posts.xlsx'), write)
+        return {'channelname': channel, 'linktochannel': channel_url, 'эксперт': 'да', 'компетенции': ''}
+    
+    manager.analyze_channel = analyze_channel
+    channels_df = pd.DataFrame({'link': [f'https://t.me/c{index}' for index in range(4)]})
+    try:
+        manager.run_analysis(channels_df, 'link')
+    finally:
+        manager.report_writer.close()
+    
+    results = pd.read_csv(os.path.join(test_dir, "results.csv"), sep=';')
+    return manager, list(results['channelname'])
+
+def test_failed_report_retried():
+    """Канал с ошибкой записи отчета анализируется повторно, а не пропадает из результатов"""
+    print("\n🧪 ТЕСТ ПОВТОРА КАНАЛА С ОШИБКОЙ ОТЧЕТА")
+    print("=" * 50)
+    
+    test_dir = tempfile.mkdtemp(prefix="test_reports_")
+    try:
+        # Повторная запись удалась - все каналы в результатах, checkpoint удален
+        manager, channels = run_with_failing_report(test_dir, failures=1)
+        assert channels == ['c0', 'c1', 'c2', 'c3']
+        assert not manager.failed_indices
+        assert not os.path.exists(os.path.join(test_dir, "checkpoint.json"))
+        
+        # Повтор тоже с ошибкой - канала нет в результатах, checkpoint остается для следующего запуска
+        os.remove(os.path.join(test_dir, "results.csv"))
+        manager, channels = run_with_failing_report(test_dir, failures=2)
+        assert channels == ['c0', 'c2', 'c3']
+        with open(os.path.join(test_dir, "checkpoint.json"), 'r', encoding='utf-8') as f:
+            checkpoint = json.load(f)
+        assert checkpoint['failed_indices'] == [1]
+        assert checkpoint['current_index'] == 4
+        print("✅ Тест повтора канала пройден!")
+        
+    finally:
+        shutil.rmtree(test_dir)
+        print("🧹 Временные файлы удалены")
+
+class DisconnectedSession:
+    """Сессия Telegram, к которой не удается подключиться"""
+    limiter = None
+    entity_cache = None
+    
+    @property
+    def client(self):
+        raise ConnectionError("нет соединения с Telegram")
+
+def test_connection_error_is_channel_error():
+    """Сбой подключения записывается как ошибка канала, а не останавливает анализ"""
+    print("\n🧪 ТЕСТ ОШИБКИ ПОДКЛЮЧЕНИЯ")
+    print("=" * 50)
+    
+    test_dir = tempfile.mkdtemp(prefix="test_connection_")
+    try:
+        manager = make_manager(test_dir)
+        result = manager.analyze_channel('https://t.me/channel', 0, DisconnectedSession())
+        assert result['linktochannel'] == 'https://t.me/channel'
+        assert result['компетенции'] == 'Ошибка: нет соединения с Telegram'
+        print("✅ Тест ошибки подключения пройден!")
+        
+    finally:
+        shutil.rmtree(test_dir)
+        print("🧹 Временные файлы удалены")
+
 def test_graceful_shutdown():
     """Тестирует graceful shutdown (симуляция)"""
     print("\n🧪 ТЕСТ GRACEFUL SHUTDOWN")
@@ -200,6 +370,10 @@ def main():
         test_checkpoint_system()
         test_backup_system()
         test_atomic_operations()
+        test_out_of_order_checkpoint()
+        test_failed_reports_not_checkpointed()
+        test_failed_report_retried()
+        test_connection_error_is_channel_error()
         test_graceful_shutdown()
         
         print("\n" + "=" * 60)
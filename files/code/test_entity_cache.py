@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Тесты кэша username -> канал (entity_cache.py)
+"""
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+
+# Добавляем пути для импорта модулей
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'config'))
+sys.path.append(os.path.dirname(__file__))
+
+from entity_cache import EntityCache, ResolvedChannel
+from telethon.tl.types import Channel, ChatPhotoEmpty, InputPeerChannel
+
+
+def make_channel(channel_id=10, access_hash=55, title='Канал'):
+    """Тестовая сущность канала Telethon"""
+    entity = Channel(id=channel_id, title=title, photo=ChatPhotoEmpty(), date=None, access_hash=access_hash)
+    return ResolvedChannel.from_entity(entity)
+
+
+def test_cache_roundtrip():
+    """Закэшированный канал восстанавливается как InputPeerChannel без ResolveUsername"""
+    print("🧪 ТЕСТ КЭША КАНАЛОВ")
+    print("=" * 50)
+    
+    test_dir = tempfile.mkdtemp(prefix="test_entities_")
+    path = os.path.join(test_dir, "entities.json")
+    try:
+        cache = EntityCache(path, ttl_hours=24)
+        assert cache.get('SellerX') is None
+        cache.put('SellerX', make_channel())
+        
+        # Новый экземпляр читает файл; username без учета регистра
+        restored = EntityCache(path, ttl_hours=24).get('sellerx')
+        assert restored.id == 10 and restored.title == 'Канал'
+        assert restored.input_peer == InputPeerChannel(10, 55)
+        
+        # Другой аккаунт не видит чужой access_hash
+        assert EntityCache(path, ttl_hours=24, session_name='second').get('sellerx') is None
+        
+        cache.invalidate('sellerx')
+        assert EntityCache(path, ttl_hours=24).get('sellerx') is None
+        print("✅ Тест кэша каналов пройден!")
+    finally:
+        shutil.rmtree(test_dir)
+
+
+def test_cache_ttl():
+    """Устаревшие записи считаются промахом"""
+    print("\n🧪 ТЕСТ TTL КЭША КАНАЛОВ")
+    print("=" * 50)
+    
+    test_dir = tempfile.mkdtemp(prefix="test_entities_")
+    path = os.path.join(test_dir, "entities.json")
+    try:
+        EntityCache(path, ttl_hours=1).put('old', make_channel())
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        data['session_name']['old']['cached_at'] = (datetime.now() - timedelta(hours=2)).isoformat()
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        
+        assert EntityCache(path, ttl_hours=1).get('old') is None
+        assert EntityCache(path, ttl_hours=None).get('old') is not None
+        print("✅ Тест TTL пройден!")
+    finally:
+        shutil.rmtree(test_dir)
+
+
+def main():
+    """Основная функция тестирования"""
+    test_cache_roundtrip()
+    test_cache_ttl()
+    print("\n🎉 ВСЕ ТЕСТЫ КЭША КАНАЛОВ ПРОЙДЕНЫ!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Тесты локального кэша сообщений (message_store.py)
+Проверяют дозагрузку через min_id и обновление счетчиков свежих постов
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+from datetime import datetime, timezone, timedelta
+from types import SimpleNamespace
+
+# Добавляем пути для импорта модулей
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'config'))
+sys.path.append(os.path.dirname(__file__))
+
+import message_store
+from message_store import MessageStore
+from analyse import extract_post_row
+
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+END = datetime(2025, 12, 31, 23, 59, 59, tzinfo=timezone.utc)
+
+
+def make_message(message_id, date, views=100, text='пост'):
+    """Тестовое текстовое сообщение Telethon"""
+    reactions = SimpleNamespace(results=[
+        SimpleNamespace(reaction=SimpleNamespace(emoji='👍'), count=2),
+        SimpleNamespace(reaction=SimpleNamespace(emoji='👎'), count=1),
+    ])
+    return SimpleNamespace(
+        id=message_id, date=date, grouped_id=None, text=text, views=views, forwards=4,
+        replies=SimpleNamespace(replies=1), reactions=reactions, action=None,
+        photo=None, video=None, document=None, voice=None, video_note=None, sticker=None, poll=None
+    )
+
+
+def make_row(message_id, date, views=100, text='пост'):
+    """Строка хранилища для тестового текстового сообщения Telethon"""
+    return extract_post_row(make_message(message_id, date, views, text))
+
+
+def test_incremental_fetch_plans():
+    """Первый запуск - полный период, повторный - только дельта через min_id"""
+    print("🧪 ТЕСТ ДОЗАГРУЗКИ ЧЕРЕЗ MIN_ID И ОКНА ОБНОВЛЕНИЯ")
+    print("=" * 50)
+    
+    test_dir = tempfile.mkdtemp(prefix="test_store_")
+    old_days = message_store.MESSAGE_CACHE_REFRESH_DAYS
+    try:
+        store = MessageStore(os.path.join(test_dir, "cache.sqlite"))
+        
+        assert store.fetch_plans(1, START, END) == [{'offset_date': START, 'reverse': True}]
+        
+        now = datetime(2025, 6, 30, tzinfo=timezone.utc)
+        rows = [
+            make_row(10, datetime(2025, 3, 1, tzinfo=timezone.utc)),
+            make_row(11, datetime(2025, 6, 25, tzinfo=timezone.utc)),
+            make_row(12, datetime(2025, 6, 29, tzinfo=timezone.utc)),
+        ]
+        store.save_posts(1, 'channel', 'Канал', rows, START)
+        
+        # Повторный запуск загружает только сообщения новее 12
+        assert store.fetch_plans(1, START, END) == [{'min_id': 12, 'reverse': True}]
+        
+        # По умолчанию счетчики обновляются у всех постов периода
+        message_store.MESSAGE_CACHE_REFRESH_DAYS = None
+        assert store.refresh_message_ids(1, START, END, now=now) == [10, 11, 12]
+        
+        # Пост 10 старше окна обновления счетчиков, посты 11-12 обновляются по id
+        message_store.MESSAGE_CACHE_REFRESH_DAYS = 14
+        assert store.refresh_message_ids(1, START, END, now=now) == [11, 12]
+        assert store.refresh_message_ids(1, START, END, now=now, full=True) == [10, 11, 12]
+        
+        # Через два месяца обновлять уже нечего
+        assert store.refresh_message_ids(1, START, END, now=now + timedelta(days=60)) == []
+        
+        # Период закончился раньше текущей даты - обновляются последние дни периода
+        june = datetime(2025, 6, 30, tzinfo=timezone.utc)
+        assert store.refresh_message_ids(1, START, june, now=now + timedelta(days=365)) == [11, 12]
+        
+        # Начало периода сдвинуто раньше - догружаем недостающую часть до первого поста в кэше
+        earlier = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        assert store.fetch_plans(1, earlier, END)[0] == {'offset_date': earlier, 'max_id': 10, 'reverse': True}
+        
+        print("✅ Тест дозагрузки пройден!")
+    finally:
+        message_store.MESSAGE_CACHE_REFRESH_DAYS = old_days
+        shutil.rmtree(test_dir)
+
+
+def test_counters_update_and_load():
+    """Повторная загрузка поста обновляет счетчики, а не дублирует его; текст при обновлении счетчиков не меняется"""
+    print("\n🧪 ТЕСТ ОБНОВЛЕНИЯ СЧЕТЧИКОВ")
+    print("=" * 50)
+    
+    test_dir = tempfile.mkdtemp(prefix="test_store_")
+    try:
+        store = MessageStore(os.path.join(test_dir, "cache.sqlite"))
+        date = datetime(2025, 6, 25, 14, 30, tzinfo=timezone.utc)
+        
+        store.save_posts(1, 'channel', 'Канал', [make_row(11, date, views=100)], START)
+        store.save_posts(1, 'channel', 'Канал', [make_row(11, date, views=250)], START)
+        
+        posts = store.load_posts(1, START, END).to_dataframe()
+        assert len(posts) == 1
+        assert posts['Просмотры'][0] == 250
+        assert posts['Дата'][0] == date
+        assert posts['Всего'][0] == posts['Реакции'][0]
+        
+        # update_counters меняет только счетчики
+        store.update_counters(1, [make_row(11, date, views=900, text='другой текст')])
+        posts = store.load_posts(1, START, END).to_dataframe()
+        assert posts['Просмотры'][0] == 900
+        assert posts['Полный_текст'][0] == 'пост'
+        
+        # Посты вне периода анализа не возвращаются
+        assert len(store.load_posts(1, END, END + timedelta(days=1))) == 0
+        
+        print("✅ Тест обновления счетчиков пройден!")
+    finally:
+        shutil.rmtree(test_dir)
+
+
+def main():
+    """Основная функция тестирования"""
+    test_incremental_fetch_plans()
+    test_counters_update_and_load()
+    print("\n🎉 ВСЕ ТЕСТЫ КЭША СООБЩЕНИЙ ПРОЙДЕНЫ!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Тесты векторного расчета метрик (metrics.py)
+"""
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+# Добавляем пути для импорта модулей
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'config'))
+sys.path.append(os.path.dirname(__file__))
+
+from metrics import add_metrics, required_metrics, compute_metrics
+from analyse import (
+    calculate_er_percentage, calculate_virality, calculate_viral_coefficient, calculate_engagement_virality
+)
+
+
+def make_counters(count, seed=1):
+    """Случайные счетчики постов, часть постов без просмотров и без реакций"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        column: rng.integers(0, 60, count)
+        for column in ('Реакции', 'Всего (+)', 'Всего (-)', 'Комменты', 'Пересылки')
+    })
+    df['Просмотры'] = rng.integers(0, 100000, count)
+    df.loc[::25, 'Просмотры'] = 0
+    df.loc[::50, ['Реакции', 'Всего (+)', 'Всего (-)', 'Комменты', 'Пересылки']] = 0
+    return df
+
+
+def test_metrics_identical_to_row_functions():
+    """Векторные метрики побитово совпадают с построчными calculate_*"""
+    print("🧪 ТЕСТ ЭКВИВАЛЕНТНОСТИ МЕТРИК")
+    print("=" * 50)
+
+    df = make_counters(5000)
+    expected = df.copy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        expected['ER%'] = expected.apply(calculate_er_percentage, axis=1)
+        expected['Виральность'] = expected.apply(calculate_virality, axis=1)
+        expected['Коэффициент виральности'] = expected.apply(calculate_viral_coefficient, axis=1)
+        expected['Виральность вовлеченности'] = expected.apply(calculate_engagement_virality, axis=1)
+
+    actual = add_metrics(df.copy(), ['er', 'default', 'coefficient', 'engagement'])
+    for column in ('ER%', 'Виральность', 'Коэффициент виральности', 'Виральность вовлеченности'):
+        assert np.array_equal(expected[column].to_numpy(dtype=float), actual[column].to_numpy(), equal_nan=True), column
+
+    # Посты без просмотров: 0 для отношений, inf/nan виральности - как раньше
+    assert (actual.loc[df['Просмотры'] == 0, 'ER%'] == 0).all()
+    assert np.isinf(actual['Виральность']).any() and np.isnan(actual['Виральность']).any()
+    print("✅ Тест эквивалентности метрик пройден!")
+
+
+def test_only_required_metrics():
+    """Считаются только метрики из stat_tables/SORT_BY_VIRALITY и их входы; новые метрики задаются реестром"""
+    print("\n🧪 ТЕСТ РЕЕСТРА МЕТРИК")
+    print("=" * 50)
+
+    registry = {
+        'er': {'column': 'ER%', 'inputs': ('reactions', 'comments', 'forwards', 'views'),
+               'formula': "per_view(reactions + comments + forwards, views, 100)"},
+        'default': {'column': 'Виральность', 'inputs': ('er', 'views'), 'weights': {'er': 2},
+                    'formula': "w['er'] * er / log(views + 1)"},
+        'coefficient': {'column': 'Коэффициент виральности', 'inputs': ('forwards', 'views'),
+                        'formula': "per_view(forwards, views, 1000)"},
+        'reactions_per_1k': {'column': 'Реакции на 1000 просмотров', 'inputs': ('reactions', 'views'),
+                             'formula': "per_view(reactions, views, 1000)"},
+    }
+
+    keys = required_metrics({'default': True, 'coefficient': False, 'reactions_per_1k': True}, 'default', registry)
+    assert keys == ['er', 'default', 'reactions_per_1k']
+
+    df = make_counters(100)
+    counters = {'views': df['Просмотры'], 'reactions': df['Реакции'], 'positive': df['Всего (+)'],
+                'negative': df['Всего (-)'], 'comments': df['Комменты'], 'forwards': df['Пересылки']}
+    result = compute_metrics(counters, keys, registry)
+    assert set(result) == {'ER%', 'Виральность', 'Реакции на 1000 просмотров'}
+    assert result['Реакции на 1000 просмотров'][1] == df['Реакции'][1] / df['Просмотры'][1] * 1000
+    print("✅ Тест реестра метрик пройден!")
+
+
+def main():
+    """Основная функция тестирования"""
+    test_metrics_identical_to_row_functions()
+    test_only_required_metrics()
+    print("\n🎉 ВСЕ ТЕСТЫ МЕТРИК ПРОЙДЕНЫ!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Тесты файлов папки канала (output_layout.py)
+"""
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+# Добавляем пути для импорта модулей
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'config'))
+sys.path.append(os.path.dirname(__file__))
+
+import analyse
+from output_layout import ChannelOutput, input_hash, MANIFEST_FILENAME
+from post_columns import PostColumns
+from report_writer import ReportWriter
+from test_post_columns import make_album_rows
+from test_post_frame import make_frame
+
+
+def test_input_hash():
+    """Хэш зависит от значений таблицы и параметров, но не от копии таблицы"""
+    print("🧪 ТЕСТ ХЭША ВХОДОВ")
+    print("=" * 50)
+
+    frame = make_frame()
+    assert input_hash(frame, 'excel') == input_hash(make_frame(), 'excel')
+    assert input_hash(frame) == input_hash(frame.df.copy())
+    assert input_hash(frame, 'excel') != input_hash(frame, 'csv')
+
+    changed = frame.df.copy()
+    changed.loc[0, 'Просмотры'] += 1
+    assert input_hash(changed) != input_hash(frame)
+    assert input_hash(frame.df.iloc[::-1]) != input_hash(frame), "порядок строк входит в хэш"
+    print("✅ Тест хэша входов пройден!")
+
+
+def test_unchanged_files_are_skipped():
+    """Файл с прежними входами не перезаписывается, пока он на месте"""
+    print("\n🧪 ТЕСТ ПРОПУСКА НЕИЗМЕНЕННЫХ ФАЙЛОВ")
+    print("=" * 50)
+
+    test_dir = Path(tempfile.mkdtemp(prefix="test_output_layout_"))
+    writer = ReportWriter(workers=0)
+    calls = []
+
+    def write(text):
+        calls.append(text)
+        path = test_dir / 'report.txt'
+        path.write_text(text, encoding='utf-8')
+        return [path]
+
+    try:
+        layout = ChannelOutput(test_dir)
+        assert layout.write(writer, 'report.txt', ('a',), write, 'a') is not None
+        assert layout.write(writer, 'report.txt', ('a',), write, 'a') is None
+        assert calls == ['a']
+
+        # Хэши переживают перезапуск: новый ChannelOutput читает report_hashes.json
+        manifest = json.loads((test_dir / MANIFEST_FILENAME).read_text(encoding='utf-8'))
+        assert manifest['report.txt']['files'] == ['report.txt']
+        assert ChannelOutput(test_dir).write(writer, 'report.txt', ('a',), write, 'a') is None
+
+        # Новые входы или удаленный файл - запись заново
+        ChannelOutput(test_dir).write(writer, 'report.txt', ('b',), write, 'b')
+        (test_dir / 'report.txt').unlink()
+        ChannelOutput(test_dir).write(writer, 'report.txt', ('b',), write, 'b')
+        assert calls == ['a', 'b', 'b']
+        print("✅ Тест пропуска файлов пройден!")
+    finally:
+        shutil.rmtree(test_dir)
+
+
+def test_failed_write_is_not_recorded():
+    """Хэш файла, записанного с ошибкой, не сохраняется - следующий анализ пишет его снова"""
+    print("\n🧪 ТЕСТ ОШИБКИ ЗАПИСИ")
+    print("=" * 50)
+
+    test_dir = Path(tempfile.mkdtemp(prefix="test_output_layout_"))
+    writer = ReportWriter(workers=1)
+
+    def fail():
+        raise OSError("диск заполнен")
+
+    try:
+        layout = ChannelOutput(test_dir)
+        layout.write(writer, 'report.txt', ('a',), fail)
+        assert writer.wait() == [str(test_dir / 'report.txt')]
+        assert 'report.txt' not in layout.hashes
+        assert not (test_dir / MANIFEST_FILENAME).exists()
+        print("✅ Тест ошибки записи пройден!")
+    finally:
+        writer.close()
+        shutil.rmtree(test_dir)
+
+
+def test_channel_files_written_once():
+    """Все файлы канала - в его папке; повторный анализ тех же постов их не перезаписывает"""
+    print("\n🧪 ТЕСТ ФАЙЛОВ КАНАЛА")
+    print("=" * 50)
+
+    test_dir = Path(tempfile.mkdtemp(prefix="test_output_layout_"))
+    old_cwd = os.getcwd()
+    old_flags = (analyse.UPDATE_POST_DATASET, analyse.CREATE_TREND_REPORT)
+    try:
+        # Общий набор постов и хранилище трендов лежат в results проекта - в тесте не пишем
+        analyse.UPDATE_POST_DATASET = analyse.CREATE_TREND_REPORT = False
+        os.chdir(test_dir)
+        out_dir = test_dir / 'channel'
+        out_dir.mkdir()
+        messages = PostColumns.from_rows(make_album_rows(50))
+
+        analyse.process_messages(messages, 'channel', out_dir)
+        assert not (test_dir / 'results').exists(), "в results текущей директории файлов нет"
+        files = {path.name: path.stat().st_mtime_ns for path in out_dir.iterdir()}
+        assert {'posts.xlsx', 'posts.parquet', 'virality_summary_report.xlsx', MANIFEST_FILENAME} <= set(files)
+
+        analyse.process_messages(messages, 'channel', out_dir)
+        assert {path.name: path.stat().st_mtime_ns for path in out_dir.iterdir()} == files
+        print("✅ Тест файлов канала пройден!")
+    finally:
+        os.chdir(old_cwd)
+        analyse.UPDATE_POST_DATASET, analyse.CREATE_TREND_REPORT = old_flags
+        shutil.rmtree(test_dir)
+
+
+def main():
+    """Основная функция тестирования"""
+    test_input_hash()
+    test_unchanged_files_are_skipped()
+    test_failed_write_is_not_recorded()
+    test_channel_files_written_once()
+    print("\n🎉 ВСЕ ТЕСТЫ ПАПКИ КАНАЛА ПРОЙДЕНЫ!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
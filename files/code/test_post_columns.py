@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Тесты колоночного накопления постов (post_columns.py)
+"""
+
+import os
+import sys
+import random
+import numpy as np
+from datetime import datetime, timezone
+
+# Добавляем пути для импорта модулей
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'config'))
+sys.path.append(os.path.dirname(__file__))
+
+from post_columns import PostColumns, merge_album_rows
+
+
+def make_row(message_id, date, content_type='Текст', views=100, grouped_id=None):
+    """Строка поста в формате extract_post_row"""
+    return (message_id, int(date.timestamp()), grouped_id, f'пост {message_id}', content_type,
+            views, 5, 4, 1, 2, 3)
+
+
+def test_dataframe_matches_message_data():
+    """Таблица из колонок: колонки и типы таблицы постов, строки восстанавливаются без потерь"""
+    print("🧪 ТЕСТ КОЛОНОЧНОЙ ТАБЛИЦЫ ПОСТОВ")
+    print("=" * 50)
+
+    date = datetime(2025, 3, 7, 9, 5, 41, tzinfo=timezone.utc)
+    posts = PostColumns.from_rows([make_row(1, date, views=None), make_row(2, date, 'Фото', grouped_id=77)])
+    df = posts.to_dataframe()
+
+    assert list(df.columns) == ['Дата', 'Полный_текст', 'Тип', 'Просмотры', 'Реакции', 'Всего (+)',
+                                'Всего (-)', 'Всего', 'Комменты', 'Пересылки']
+    assert df['Дата'][0] == date
+    assert str(df['Дата'].dt.tz) == 'UTC'
+    assert list(df['Тип']) == ['Текст', 'Фото']
+    assert df['Просмотры'].tolist() == [0, 100]
+    assert (df['Всего'] == df['Реакции']).all()
+
+    # Счетчики не копируются при построении таблицы
+    assert np.shares_memory(df['Просмотры'].to_numpy(), np.frombuffer(posts.counters['views'], dtype=np.int64))
+
+    # Строки для кэша сообщений восстанавливаются без потерь
+    assert list(posts.rows())[1] == make_row(2, date, 'Фото', grouped_id=77)
+    print("✅ Тест колоночной таблицы пройден!")
+
+
+def make_album_rows(count, seed=1):
+    """Посты вперемешку с альбомами из 2-10 сообщений; подпись - только у одного сообщения альбома"""
+    rnd = random.Random(seed)
+    rows = []
+    message_id = 0
+    while len(rows) < count:
+        size = rnd.choice([1, 1, 1, rnd.randint(2, 10)])
+        grouped_id = 1000 + message_id if size > 1 else None
+        caption = rnd.randrange(size)
+        for i in range(size):
+            message_id += 1
+            reactions = rnd.randint(0, 20)
+            rows.append((message_id, 1735700000 + message_id * 600 - i * 600 * (size > 1), grouped_id,
+                         f'пост {message_id}' if i == caption else '', rnd.choice(['Фото', 'Видео', 'Текст']),
+                         rnd.randint(0, 3000), reactions, reactions, 0, rnd.randint(0, 3), rnd.randint(0, 9)))
+    return rows
+
+
+def test_merge_albums():
+    """Альбом - один пост: подпись, максимум просмотров, сумма реакций и пересылок"""
+    print("\n🧪 ТЕСТ ОБЪЕДИНЕНИЯ АЛЬБОМОВ")
+    print("=" * 50)
+
+    date = datetime(2025, 3, 7, 9, 5, tzinfo=timezone.utc)
+    album = [
+        (10, int(date.timestamp()), 55, '', 'Фото', 300, 4, 3, 1, 0, 2),
+        (11, int(date.timestamp()), 55, 'подпись', 'Фото', 500, 1, 1, 0, 5, 1),
+        (12, int(date.timestamp()), 55, '', 'Видео', 200, 0, 0, 0, 0, 7),
+    ]
+    posts = PostColumns.from_rows([make_row(9, date)] + album + [make_row(13, date)])
+    merged = posts.merge_albums()
+    assert len(merged) == 3
+    assert list(merged.rows())[1] == (10, int(date.timestamp()), 55, 'подпись', 'Фото', 500, 5, 4, 1, 5, 10)
+    assert [row[0] for row in merged.rows()] == [9, 10, 13]
+
+    # Без альбомов колонки не копируются
+    plain = PostColumns.from_rows([make_row(1, date), make_row(2, date)])
+    assert plain.merge_albums() is plain
+
+    # Векторное объединение совпадает с построчным merge_album_rows
+    rows = make_album_rows(2000)
+    expected = []
+    for row in rows:
+        if row[2] and expected and isinstance(expected[-1], list) and expected[-1][0][2] == row[2]:
+            expected[-1].append(row)
+        else:
+            expected.append([row] if row[2] else row)
+    expected = [merge_album_rows(item) if isinstance(item, list) else item for item in expected]
+    assert list(PostColumns.from_rows(rows).merge_albums().rows()) == expected
+    print("✅ Тест объединения альбомов пройден!")
+
+
+def main():
+    """Основная функция тестирования"""
+    test_dataframe_matches_message_data()
+    test_merge_albums()
+    print("\n🎉 ВСЕ ТЕСТЫ КОЛОНОК ПОСТОВ ПРОЙДЕНЫ!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Тесты общего набора постов всех каналов (post_dataset.py)
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+
+# Добавляем пути для импорта модулей
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'config'))
+sys.path.append(os.path.dirname(__file__))
+
+import post_dataset
+from post_dataset import PostDataset
+from test_post_frame import make_frame
+
+FEBRUARY = (datetime(2025, 2, 1, tzinfo=timezone.utc), datetime(2025, 2, 28, 23, 59, 59, tzinfo=timezone.utc))
+
+
+def make_channels():
+    """Три канала с постами за январь-февраль 2025 (час между постами)"""
+    return {channel: make_frame(count=1000, seed=seed) for seed, channel in enumerate(('alpha', 'beta', 'gamma'), 1)}
+
+
+def test_append_replaces_channel():
+    """Повторный анализ канала заменяет его посты, разбиение - по месяцам и каналам"""
+    print("🧪 ТЕСТ ЗАПИСИ В ОБЩИЙ НАБОР ПОСТОВ")
+    print("=" * 50)
+
+    test_dir = tempfile.mkdtemp(prefix="test_post_dataset_")
+    try:
+        dataset = PostDataset(test_dir)
+        assert dataset.scan().num_rows == 0
+        frames = make_channels()
+        for channel, frame in frames.items():
+            assert dataset.append(channel, frame) == len(frame)
+        dataset.append('alpha', frames['alpha'])
+        assert dataset.channels() == ['alpha', 'beta', 'gamma']
+        assert sorted(os.listdir(test_dir)) == ['month=2025-01', 'month=2025-02']
+
+        table = dataset.scan(['channel', 'Просмотры']).to_pandas()
+        assert len(table) == 3000
+        assert table.groupby('channel')['Просмотры'].sum()['beta'] == frames['beta'].totals['Просмотры']
+
+        # Канал с меньшим периодом: посты прежнего месяца удаляются
+        dataset.append('gamma', frames['gamma'].between(*FEBRUARY))
+        assert not os.path.exists(os.path.join(test_dir, 'month=2025-01', 'channel=gamma'))
+        print("✅ Тест записи пройден!")
+    finally:
+        shutil.rmtree(test_dir)
+
+
+def test_cross_channel_queries():
+    """Топ постов и итоги по каналам за период совпадают с расчетом по таблицам каналов"""
+    print("\n🧪 ТЕСТ ЗАПРОСОВ ПО ВСЕМ КАНАЛАМ")
+    print("=" * 50)
+
+    test_dir = tempfile.mkdtemp(prefix="test_post_dataset_")
+    try:
+        dataset = PostDataset(test_dir)
+        frames = make_channels()
+        for channel, frame in frames.items():
+            dataset.append(channel, frame)
+
+        february = pd.concat([frame.between(*FEBRUARY).df.assign(channel=channel)
+                              for channel, frame in frames.items()], ignore_index=True)
+        top = dataset.top_posts(100, start=FEBRUARY[0], end=FEBRUARY[1])
+        assert len(top) == 100
+        assert list(top.columns) == ['channel', 'Дата', 'Полный_текст', 'Просмотры', 'Виральность']
+        expected = february['Виральность'].nlargest(100).to_numpy()
+        assert np.array_equal(top['Виральность'].to_numpy(), expected)
+        assert top['Дата'].min() >= FEBRUARY[0]
+
+        by_views = dataset.top_posts(5, by='Просмотры', channels=['beta'])
+        assert set(by_views['channel']) == {'beta'}
+        assert by_views['Просмотры'].tolist() == frames['beta'].df['Просмотры'].nlargest(5).tolist()
+
+        summary = dataset.channel_summary(*FEBRUARY).set_index('Канал')
+        for channel, frame in frames.items():
+            window = frame.between(*FEBRUARY)
+            assert summary.loc[channel, 'Постов'] == len(window)
+            assert summary.loc[channel, 'Пересылки'] == window.totals['Пересылки']
+            assert np.isclose(summary.loc[channel, 'ER%'], window.totals['ER%'])
+            assert np.isclose(summary.loc[channel, 'Средняя виральность'], window.df['Виральность'].mean())
+        assert summary['ER%'].is_monotonic_decreasing
+        print("✅ Тест запросов пройден!")
+    finally:
+        shutil.rmtree(test_dir)
+
+
+def test_channels_with_different_metrics():
+    """Колонка метрики, включенной только у части каналов, видна в запросах по всем каналам"""
+    print("\n🧪 ТЕСТ КАНАЛОВ С РАЗНЫМИ МЕТРИКАМИ")
+    print("=" * 50)
+
+    test_dir = tempfile.mkdtemp(prefix="test_post_dataset_")
+    try:
+        dataset = PostDataset(test_dir)
+        frames = make_channels()
+        # alpha - первый канал набора, в его файлах колонки нет
+        dataset.append('alpha', frames['alpha'])
+        beta = frames['beta']
+        beta.df['Коэффициент виральности'] = np.arange(len(beta), dtype=float)
+        dataset.append('beta', beta)
+
+        top = dataset.top_posts(3, by='Коэффициент виральности')
+        assert set(top['channel']) == {'beta'}
+        assert top['Коэффициент виральности'].tolist() == [len(beta) - 1.0, len(beta) - 2.0, len(beta) - 3.0]
+        table = dataset.scan(['channel', 'Коэффициент виральности'], channels=['alpha']).to_pandas()
+        assert len(table) == len(frames['alpha']) and table['Коэффициент виральности'].isna().all()
+        print("✅ Тест разных метрик пройден!")
+    finally:
+        shutil.rmtree(test_dir)
+
+
+def test_failed_append_keeps_channel():
+    """Ошибка записи новых постов не удаляет посты прошлого анализа канала"""
+    print("\n🧪 ТЕСТ ОШИБКИ ЗАПИСИ В НАБОР")
+    print("=" * 50)
+
+    test_dir = tempfile.mkdtemp(prefix="test_post_dataset_")
+    write_dataset = post_dataset.ds.write_dataset
+
+    def fail(*args, **kwargs):
+        raise OSError("диск заполнен")
+
+    try:
+        dataset = PostDataset(test_dir)
+        frame = make_frame(count=1000, seed=1)
+        dataset.append('alpha', frame)
+        post_dataset.ds.write_dataset = fail
+        try:
+            dataset.append('alpha', frame.between(*FEBRUARY))
+        except OSError:
+            pass
+        else:
+            raise AssertionError("ошибка записи потеряна")
+        finally:
+            post_dataset.ds.write_dataset = write_dataset
+        assert dataset.scan().num_rows == len(frame)
+        assert sorted(os.listdir(test_dir)) == ['month=2025-01', 'month=2025-02'], "временных папок нет"
+        print("✅ Тест ошибки записи пройден!")
+    finally:
+        shutil.rmtree(test_dir)
+
+
+def main():
+    """Основная функция тестирования"""
+    test_append_replaces_channel()
+    test_cross_channel_queries()
+    test_channels_with_different_metrics()
+    test_failed_append_keeps_channel()
+    print("\n🎉 ВСЕ ТЕСТЫ ОБЩЕГО НАБОРА ПОСТОВ ПРОЙДЕНЫ!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
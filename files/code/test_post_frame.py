@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Тесты таблицы постов PostFrame (post_frame.py)
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import random
+import asyncio
+from datetime import datetime, timezone, timedelta
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+
+# Добавляем пути для импорта модулей
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'config'))
+sys.path.append(os.path.dirname(__file__))
+
+from post_columns import PostColumns
+from post_frame import (PostFrame, SUMMARY_ROWS, COUNTER_TABLE_COLUMNS, DATE_FORMAT, load_post_frame, post_count,
+                        format_dates, PARQUET_FILENAME)
+from metrics import add_metrics
+from entity_cache import EntityCache, ResolvedChannel
+from message_store import MessageStore
+from rate_limiter import AdaptiveRateLimiter
+from telethon.errors import FloodWaitError, ChannelInvalidError
+from test_message_store import make_message
+import analyse
+from analyse import (save_to_excel, start_date, end_date, normalize_windows, analysis_period,
+                     window_frames, windows_sheet)
+
+
+def make_frame(count=200, seed=1):
+    """PostFrame из случайных постов, часть постов без просмотров и реакций"""
+    rnd = random.Random(seed)
+    rows = []
+    for message_id in range(1, count + 1):
+        reactions = rnd.randint(0, 40)
+        positive = rnd.randint(0, reactions)
+        counters = (rnd.randint(1, 5000), reactions, positive, reactions - positive, rnd.randint(0, 10), rnd.randint(0, 20))
+        if message_id % 20 == 0:
+            counters = (0,) * 6
+        rows.append((message_id, 1735700000 + message_id * 3600, None, f'пост {message_id}', 'Текст', *counters))
+    keys = ['er', 'default']
+    return PostFrame(add_metrics(PostColumns.from_rows(rows).to_dataframe(), keys), keys)
+
+
+def test_post_frame_aggregates():
+    """Типы колонок фиксированы, итоги считаются отдельно и попадают в Excel только при записи"""
+    print("🧪 ТЕСТ АГРЕГАТОВ POSTFRAME")
+    print("=" * 50)
+
+    frame = make_frame()
+    assert len(frame) == 200
+    assert all(frame.df[column].dtype == np.int64 for column in COUNTER_TABLE_COLUMNS)
+    assert frame.df['Виральность'].dtype == np.float64
+    assert not frame.df['Дата'].isin(SUMMARY_ROWS).any()
+
+    assert frame.totals['Просмотры'] == frame.df['Просмотры'].sum()
+    assert frame.totals['ER%'] == (frame.totals['Реакции'] + frame.totals['Комменты'] + frame.totals['Пересылки']) \
+        / frame.totals['Просмотры'] * 100
+    assert frame.averages['Комменты'] == frame.df['Комменты'].mean()
+
+    # Даты в Excel - как strftime(DATE_FORMAT), но без форматирования каждого поста
+    assert format_dates(frame.df['Дата']).tolist() == frame.df['Дата'].dt.strftime(DATE_FORMAT).tolist()
+    assert format_dates(frame.df['Дата'][:0]).tolist() == []
+
+    # Посты без просмотров: nan в таблице, 0 в статистике
+    assert frame.df['Виральность'].isna().any()
+    assert not frame.filled()['Виральность'].isna().any()
+
+    table = frame.with_summary_rows()
+    assert list(table['Дата'][-2:]) == list(SUMMARY_ROWS)
+    assert len(frame) == 200
+
+    # Перестановка не пересчитывает агрегаты
+    order = np.argsort(-frame.df['Просмотры'].to_numpy(), kind='stable')
+    assert frame.take(order).totals is frame.totals
+    print("✅ Тест агрегатов пройден!")
+
+
+def test_post_frame_from_excel():
+    """posts.xlsx читается обратно: итоговые строки становятся агрегатами, топ-посты совпадают"""
+    print("\n🧪 ТЕСТ ЧТЕНИЯ POSTFRAME ИЗ EXCEL")
+    print("=" * 50)
+
+    test_dir = tempfile.mkdtemp(prefix="test_post_frame_")
+    old_cwd = os.getcwd()
+    try:
+        os.chdir(test_dir)
+        frame = make_frame()
+        save_to_excel(frame.with_summary_rows(), 'posts.xlsx', 'channel', start_date, end_date, folder='results')
+
+        loaded = PostFrame.from_excel(os.path.join('results', 'posts.xlsx'))
+        assert len(loaded) == len(frame)
+        assert loaded.metric_keys == frame.metric_keys
+        assert loaded.df['Пересылки'].dtype == np.int64
+        assert loaded.totals['Просмотры'] == frame.totals['Просмотры']
+        # Даты в Excel - строки до минут, при чтении снова datetime64 в UTC
+        assert (loaded.df['Дата'] == frame.df['Дата'].dt.floor('min')).all()
+        assert loaded.top_text(5) == frame.top_text(5)
+        assert frame.top_text(5).startswith("текст 1:\n")
+        print("✅ Тест чтения из Excel пройден!")
+    finally:
+        os.chdir(old_cwd)
+        shutil.rmtree(test_dir)
+
+
+def test_post_frame_parquet():
+    """posts.parquet: типы и агрегаты сохраняются, читаются только нужные колонки, Parquet важнее Excel"""
+    print("\n🧪 ТЕСТ PARQUET ТАБЛИЦЫ ПОСТОВ")
+    print("=" * 50)
+
+    test_dir = tempfile.mkdtemp(prefix="test_post_frame_")
+    old_cwd = os.getcwd()
+    try:
+        os.chdir(test_dir)
+        frame = make_frame()
+        assert load_post_frame(test_dir) is None and post_count(test_dir) is None
+        save_to_excel(frame.with_summary_rows(), 'posts.xlsx', 'channel', start_date, end_date, folder='results')
+        assert len(load_post_frame('results')) == len(frame)
+
+        frame.to_parquet(os.path.join('results', PARQUET_FILENAME))
+        assert post_count('results') == len(frame)
+        loaded = load_post_frame('results')
+        assert loaded.metric_keys == frame.metric_keys
+        assert list(loaded.df.columns) == list(frame.df.columns)
+        assert (loaded.df['Дата'] == frame.df['Дата']).all()
+        assert loaded.df['Просмотры'].dtype == np.int64
+        assert loaded.df['Виральность'].equals(frame.df['Виральность'])
+        assert loaded.totals == {column: np.asarray(value).item() for column, value in frame.totals.items()}
+
+        top = load_post_frame('results', ['Полный_текст', 'Виральность'])
+        assert list(top.df.columns) == ['Полный_текст', 'Виральность']
+        assert top.totals['ER%'] == frame.totals['ER%']
+        assert top.top_text(5) == frame.top_text(5)
+        print("✅ Тест Parquet пройден!")
+    finally:
+        os.chdir(old_cwd)
+        shutil.rmtree(test_dir)
+
+
+def test_window_frames():
+    """Окна анализа - срезы одной таблицы: свои итоги и топ-посты, листы в posts.xlsx"""
+    print("\n🧪 ТЕСТ ОКОН АНАЛИЗА")
+    print("=" * 50)
+
+    windows = normalize_windows(['2025-01-02:2025-01-04', (datetime(2025, 1, 1, tzinfo=timezone.utc),
+                                                          datetime(2025, 1, 9, 23, 59, 59, tzinfo=timezone.utc))])
+    assert analysis_period(windows) == (windows[1][0], windows[1][1])
+    assert analysis_period(None) == (start_date, end_date)
+
+    frame = make_frame()
+    order = np.argsort(-frame.df['Просмотры'].to_numpy(), kind='stable')
+    frame = frame.take(order)
+    frames = window_frames(frame, windows)
+    assert list(frames) == ['02.01.2025-04.01.2025', '01.01.2025-09.01.2025']
+
+    start, end, window = frames['02.01.2025-04.01.2025']
+    selected = frame.df[(frame.df['Дата'] >= start) & (frame.df['Дата'] <= end)]
+    assert len(window) == len(selected) == 72
+    # Порядок строк общей таблицы сохраняется, итоги - только по окну
+    assert window.df['Просмотры'].tolist() == selected['Просмотры'].tolist()
+    assert window.totals['Просмотры'] == selected['Просмотры'].sum() != frame.totals['Просмотры']
+    assert window.top_text(5) == PostFrame(selected.reset_index(drop=True), frame.metric_keys).top_text(5)
+
+    sheet = windows_sheet(frames)
+    assert sheet['Постов'].tolist() == [72, len(frames['01.01.2025-09.01.2025'][2])]
+
+    test_dir = tempfile.mkdtemp(prefix="test_post_frame_")
+    old_cwd = os.getcwd()
+    try:
+        os.chdir(test_dir)
+        window_sheets = {label: (item.with_summary_rows(), start, end) for label, (start, end, item) in frames.items()}
+        save_to_excel(frame.with_summary_rows(), 'posts.xlsx', 'channel', *analysis_period(windows),
+                      window_sheets=window_sheets, folder='results')
+        path = os.path.join('results', 'posts.xlsx')
+        assert pd.ExcelFile(path).sheet_names == ['Posts'] + list(frames)
+        assert len(PostFrame.from_excel(path)) == len(frame)
+        header = pd.read_excel(path, sheet_name='02.01.2025-04.01.2025', header=None, nrows=3)[0].tolist()
+        assert header[1] == 'Период: 02.01.2025 - 04.01.2025'
+        assert header[2] == 'Всего постов: 74'
+        print("✅ Тест окон анализа пройден!")
+    finally:
+        os.chdir(old_cwd)
+        shutil.rmtree(test_dir)
+
+
+class FailingClient:
+    """Клиент, у которого не разрешается ни один канал"""
+
+    def get_entity(self, username):
+        raise ConnectionError("нет соединения")
+
+
+class FailingAsyncClient:
+    """Асинхронный клиент, у которого не разрешается ни один канал"""
+
+    async def get_entity(self, username):
+        raise ConnectionError("нет соединения")
+
+
+def test_window_results_on_fetch_error():
+    """При ошибке загрузки канала с windows результат - словарь по окнам, как при успехе"""
+    print("\n🧪 ТЕСТ ОКОН ПРИ ОШИБКЕ ЗАГРУЗКИ")
+    print("=" * 50)
+
+    test_dir = tempfile.mkdtemp(prefix="test_post_frame_")
+    old_settings = (analyse.CHANNELS_DIR, analyse.USE_MESSAGE_CACHE)
+    try:
+        analyse.CHANNELS_DIR = test_dir
+        analyse.USE_MESSAGE_CACHE = False
+        windows = ['2025-01-01:2025-01-31', '2025-02-01:2025-02-28']
+        expected = {'01.01.2025-31.01.2025': "", '01.02.2025-28.02.2025': ""}
+        cache = EntityCache(os.path.join(test_dir, 'entity_cache.json'))
+        assert analyse.analyse_with_client(FailingClient(), 'https://t.me/channel', entity_cache=cache,
+                                           windows=windows) == expected
+        assert asyncio.run(analyse.analyse_async('https://t.me/channel', FailingAsyncClient(),
+                                                 entity_cache=cache, windows=windows)) == expected
+        assert analyse.analyse_with_client(FailingClient(), 'https://t.me/channel', entity_cache=cache) == ""
+        print("✅ Тест окон при ошибке пройден!")
+    finally:
+        analyse.CHANNELS_DIR, analyse.USE_MESSAGE_CACHE = old_settings
+        shutil.rmtree(test_dir)
+
+
+class ChannelClient:
+    """
+    Клиент Telegram с постами одного канала
+    
+    Закэшированный peer канала недействителен, а первый get_entity отвечает FloodWait.
+    """
+
+    def __init__(self, messages):
+        self.messages = messages
+        self.calls = []
+
+    def entity(self, username):
+        self.calls.append('get_entity')
+        if self.calls.count('get_entity') == 1:
+            raise FloodWaitError(request=None, capture=0)
+        return SimpleNamespace(id=1, title='Канал', username=username)
+
+    def messages_after(self, min_id=0):
+        self.calls.append('iter_messages')
+        if self.calls.count('iter_messages') == 1:
+            raise ChannelInvalidError(request=None)
+        return [message for message in self.messages if message.id > min_id]
+
+    def messages_by_ids(self, ids):
+        self.calls.append('get_messages')
+        return [message for message in self.messages if message.id in ids]
+
+
+class SyncChannelClient(ChannelClient):
+    def get_entity(self, username):
+        return self.entity(username)
+
+    def iter_messages(self, peer, min_id=0, **plan):
+        return iter(self.messages_after(min_id))
+
+    def get_messages(self, peer, ids):
+        return self.messages_by_ids(ids)
+
+
+class AsyncChannelClient(ChannelClient):
+    async def get_entity(self, username):
+        return self.entity(username)
+
+    def iter_messages(self, peer, min_id=0, **plan):
+        messages = self.messages_after(min_id)
+
+        async def generate():
+            for message in messages:
+                yield message
+        return generate()
+
+    async def get_messages(self, peer, ids):
+        return self.messages_by_ids(ids)
+
+
+def test_sync_and_async_analysis_match():
+    """Синхронный и асинхронный анализ делают те же запросы и возвращают тот же результат"""
+    print("\n🧪 ТЕСТ СИНХРОННОГО И АСИНХРОННОГО АНАЛИЗА")
+    print("=" * 50)
+
+    test_dir = tempfile.mkdtemp(prefix="test_post_frame_")
+    old_settings = (analyse.CHANNELS_DIR, analyse.USE_MESSAGE_CACHE, analyse.MessageStore)
+    messages = [make_message(message_id, start_date + timedelta(days=message_id), views=100 * message_id,
+                             text=f'пост {message_id}')
+                for message_id in range(1, 11)]
+    try:
+        analyse.CHANNELS_DIR = test_dir
+        analyse.USE_MESSAGE_CACHE = True
+        runs = {}
+        for name, client in (('sync', SyncChannelClient(messages)), ('async', AsyncChannelClient(messages))):
+            folder = os.path.join(test_dir, name)
+            analyse.MessageStore = lambda: MessageStore(os.path.join(folder, 'cache.sqlite'))
+            cache = EntityCache(os.path.join(folder, 'entity_cache.json'))
+            cache.put('channel', ResolvedChannel(1, 2, 'Канал'))
+            limiter = AdaptiveRateLimiter(rate=1000, burst=100, method_rates={})
+            results = []
+            # Второй запуск загружает только новые сообщения и обновляет счетчики из кэша
+            for _ in range(2):
+                if name == 'sync':
+                    results.append(analyse.analyse_with_client(client, 'https://t.me/channel', limiter=limiter,
+                                                               entity_cache=cache, top_only=True))
+                else:
+                    results.append(asyncio.run(analyse.analyse_async('https://t.me/channel', client,
+                                                                     limiter=limiter, entity_cache=cache,
+                                                                     top_only=True)))
+            runs[name] = (results, client.calls)
+
+        assert runs['sync'] == runs['async']
+        results, calls = runs['sync']
+        assert all(result.startswith('текст 1:') for result in results)
+        assert calls == ['iter_messages', 'get_entity', 'get_entity', 'iter_messages', 'get_entity',
+                         'iter_messages', 'get_messages']
+        print("✅ Тест синхронного и асинхронного анализа пройден!")
+    finally:
+        analyse.CHANNELS_DIR, analyse.USE_MESSAGE_CACHE, analyse.MessageStore = old_settings
+        shutil.rmtree(test_dir)
+
+
+def main():
+    """Основная функция тестирования"""
+    test_post_frame_aggregates()
+    test_post_frame_from_excel()
+    test_post_frame_parquet()
+    test_window_frames()
+    test_window_results_on_fetch_error()
+    test_sync_and_async_analysis_match()
+    print("\n🎉 ВСЕ ТЕСТЫ POSTFRAME ПРОЙДЕНЫ!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Тесты индекса постов для запросов по периоду (range_index.py)
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import random
+from datetime import datetime, timezone
+
+# Добавляем пути для импорта модулей
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'config'))
+sys.path.append(os.path.dirname(__file__))
+
+from post_columns import PostColumns, COUNTER_COLUMNS
+from message_store import MessageStore
+from metrics import metric_totals
+from range_index import PostRangeIndex, parse_window, window_summary
+from test_post_columns import make_album_rows
+
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def test_window_matches_direct_sums():
+    """Итоги окна по префиксным суммам совпадают с прямым суммированием постов"""
+    print("🧪 ТЕСТ ЗАПРОСОВ ПО ПЕРИОДУ")
+    print("=" * 50)
+
+    rows = make_album_rows(3000)
+    random.Random(2).shuffle(rows)
+    index = PostRangeIndex.from_columns(PostColumns.from_rows(rows))
+    assert len(index) == len(rows)
+
+    rnd = random.Random(3)
+    first, last = min(row[1] for row in rows), max(row[1] for row in rows)
+    for _ in range(200):
+        low, high = sorted(rnd.randint(first - 1000, last + 1000) for _ in range(2))
+        start = datetime.fromtimestamp(low, tz=timezone.utc)
+        end = datetime.fromtimestamp(high, tz=timezone.utc)
+        selected = [row for row in rows if low <= row[1] <= high]
+
+        stats = index.window(start, end)
+        assert stats['posts'] == len(selected)
+        for offset, column in enumerate(COUNTER_COLUMNS.values(), 5):
+            assert stats['totals'][column] == sum(row[offset] for row in selected)
+        if selected:
+            assert stats['averages']['Просмотры'] == stats['totals']['Просмотры'] / len(selected)
+            assert stats['er'] == metric_totals(stats['totals'], ['er'])['ER%']
+        else:
+            assert stats['er'] == 0.0
+
+    print("✅ Тест запросов по периоду пройден!")
+
+
+def test_parse_window():
+    """Период --window: конечный день включается целиком"""
+    print("\n🧪 ТЕСТ РАЗБОРА ПЕРИОДА")
+    print("=" * 50)
+
+    start, end = parse_window('2025-03-01:2025-03-31')
+    assert start == datetime(2025, 3, 1, tzinfo=timezone.utc)
+    assert end == datetime(2025, 3, 31, 23, 59, 59, tzinfo=timezone.utc)
+    for text in ('2025-03-01', '2025-04-01:2025-03-01', '01.03.2025:31.03.2025'):
+        try:
+            parse_window(text)
+        except ValueError:
+            continue
+        raise AssertionError(text)
+    print("✅ Тест разбора периода пройден!")
+
+
+def test_window_summary_from_store():
+    """Итоги по каналам из кэша сообщений: альбомы сводятся, тексты не загружаются"""
+    print("\n🧪 ТЕСТ ИТОГОВ ПО КАНАЛАМ ИЗ КЭША")
+    print("=" * 50)
+
+    test_dir = tempfile.mkdtemp(prefix="test_range_index_")
+    try:
+        store = MessageStore(os.path.join(test_dir, "cache.sqlite"))
+        rows = make_album_rows(500)
+        store.save_posts(7, 'channel', 'Канал', rows, START)
+        assert store.find_channel('Channel') == 7
+        assert next(store.iter_posts(7, with_text=False))[3] == ''
+
+        start = datetime.fromtimestamp(rows[100][1], tz=timezone.utc)
+        end = datetime.fromtimestamp(rows[300][1], tz=timezone.utc)
+        summary = window_summary(store, ['channel', 'missing'], start, end)
+        assert summary['Канал'].tolist() == ['channel']
+
+        merged = PostColumns.from_rows(rows).merge_albums()
+        expected = PostRangeIndex.from_columns(merged).window(start, end)
+        in_window = sum(1 for row in rows if rows[100][1] <= row[1] <= rows[300][1])
+        assert summary['Постов'][0] == expected['posts'] < in_window
+        assert summary['Просмотры'][0] == expected['totals']['Просмотры']
+        assert summary['ER%'][0] == expected['er']
+
+        unmerged = window_summary(store, ['channel'], start, end, merge_albums=False)
+        assert unmerged['Постов'][0] == in_window
+        print("✅ Тест итогов из кэша пройден!")
+    finally:
+        shutil.rmtree(test_dir)
+
+
+def test_index_reused_until_posts_change():
+    """Индекс канала хранится в кэше: запросы не читают посты, пока они не изменятся"""
+    print("\n🧪 ТЕСТ ПОВТОРНОГО ИСПОЛЬЗОВАНИЯ ИНДЕКСА")
+    print("=" * 50)
+
+    test_dir = tempfile.mkdtemp(prefix="test_range_index_")
+    try:
+        store = MessageStore(os.path.join(test_dir, "cache.sqlite"))
+        rows = make_album_rows(500)
+        store.save_posts(7, 'channel', 'Канал', rows, START)
+        start = datetime.fromtimestamp(rows[100][1], tz=timezone.utc)
+        end = datetime.fromtimestamp(rows[300][1], tz=timezone.utc)
+        expected = PostRangeIndex.from_store(store, 7).window(start, end)
+
+        reads = []
+        iter_posts = store.iter_posts
+        store.iter_posts = lambda *args, **kwargs: reads.append(args) or iter_posts(*args, **kwargs)
+        assert PostRangeIndex.from_store(store, 7).window(start, end) == expected
+        assert window_summary(store, ['channel'], start, end)['Просмотры'][0] == expected['totals']['Просмотры']
+        assert not reads, "сохраненный индекс не должен читать посты"
+
+        # Обновленные счетчики - индекс строится заново
+        updated = [row[:5] + (row[5] + 1000,) + row[6:] for row in rows[100:301]]
+        store.update_counters(7, updated)
+        rebuilt = PostRangeIndex.from_store(store, 7).window(start, end)
+        assert len(reads) == 1
+        assert rebuilt == PostRangeIndex.from_columns(PostColumns.from_rows(iter_posts(7)).merge_albums()).window(start, end)
+        assert rebuilt['totals']['Просмотры'] > expected['totals']['Просмотры']
+        print("✅ Тест повторного использования индекса пройден!")
+    finally:
+        shutil.rmtree(test_dir)
+
+
+def main():
+    """Основная функция тестирования"""
+    test_window_matches_direct_sums()
+    test_parse_window()
+    test_window_summary_from_store()
+    test_index_reused_until_posts_change()
+    print("\n🎉 ВСЕ ТЕСТЫ ИНДЕКСА ПЕРИОДОВ ПРОЙДЕНЫ!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
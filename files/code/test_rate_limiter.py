@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Тесты адаптивного ограничителя запросов к Telegram (rate_limiter.py)
+"""
+
+import os
+import sys
+import time
+import asyncio
+
+# Добавляем пути для импорта модулей
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'config'))
+sys.path.append(os.path.dirname(__file__))
+
+from rate_limiter import AdaptiveRateLimiter
+from telethon.errors import FloodWaitError
+
+
+def test_token_bucket_spacing():
+    """После исчерпания burst запросы идут не чаще rate в секунду"""
+    print("🧪 ТЕСТ TOKEN BUCKET")
+    print("=" * 50)
+    
+    limiter = AdaptiveRateLimiter(rate=20, burst=2, method_rates={})
+    started = time.monotonic()
+    for _ in range(4):
+        limiter.wait('get_entity')
+    elapsed = time.monotonic() - started
+    
+    # 2 запроса из burst сразу, еще 2 - с интервалом 1/20 с
+    assert elapsed >= 0.09, elapsed
+    assert limiter.total_wait >= 0.09
+    print(f"✅ 4 запроса за {elapsed:.2f} с")
+
+
+def test_flood_wait_backoff():
+    """FloodWait снижает скорость метода и блокирует только этот метод"""
+    print("\n🧪 ТЕСТ FLOODWAIT")
+    print("=" * 50)
+    
+    limiter = AdaptiveRateLimiter(rate=10, burst=1, min_rate=0.5, max_rate=10, method_rates={})
+    
+    def flood():
+        raise FloodWaitError(request=None, capture=1)
+    
+    try:
+        limiter.call('iter_messages', flood)
+        assert False, "FloodWaitError должен пробрасываться для повтора канала"
+    except FloodWaitError:
+        pass
+    
+    assert limiter.buckets['iter_messages'].rate == 5
+    assert limiter.flood_waits == 1
+    
+    # Другой метод не заблокирован
+    started = time.monotonic()
+    limiter.wait('get_entity')
+    assert time.monotonic() - started < 0.5
+    
+    # Заблокированный метод ждет время FloodWait
+    started = time.monotonic()
+    limiter.wait('iter_messages')
+    assert time.monotonic() - started >= 0.9
+    
+    # Успешные запросы возвращают скорость
+    limiter.on_success('iter_messages')
+    assert limiter.buckets['iter_messages'].rate == 5.5
+    print("✅ " + limiter.report())
+
+
+def test_iterate_pages():
+    """Токен берется перед каждой страницей из 100 сообщений"""
+    print("\n🧪 ТЕСТ ИТЕРАЦИИ ПО СТРАНИЦАМ")
+    print("=" * 50)
+    
+    limiter = AdaptiveRateLimiter(rate=1000, burst=1000, method_rates={})
+    assert list(limiter.iterate('iter_messages', range(250))) == list(range(250))
+    # 3 страницы -> 3 токена
+    bucket = limiter.buckets['iter_messages']
+    assert 996 <= bucket.tokens <= 998, bucket.tokens
+    
+    async def collect():
+        async def messages():
+            for i in range(150):
+                yield i
+        return [m async for m in limiter.iterate_async('iter_messages', messages())]
+    
+    assert asyncio.run(collect()) == list(range(150))
+    print("✅ Тест итерации пройден!")
+
+
+def main():
+    """Основная функция тестирования"""
+    test_token_bucket_spacing()
+    test_flood_wait_backoff()
+    test_iterate_pages()
+    print("\n🎉 ВСЕ ТЕСТЫ ОГРАНИЧИТЕЛЯ ПРОЙДЕНЫ!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Тесты форматов отчетов (report_formats.py)
+"""
+
+import os
+import sys
+import csv
+import json
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+# Добавляем пути для импорта модулей
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'config'))
+sys.path.append(os.path.dirname(__file__))
+
+import analyse
+from analyse import sort_permutation, start_date, end_date
+from post_frame import format_dates
+from report_formats import get_report_format, report_filename, dataframe_rows, sheet_columns
+from test_post_frame import make_frame
+
+
+def reject_constant(name):
+    """JSONL должен быть строгим JSON: NaN и Infinity не допускаются"""
+    raise ValueError(name)
+
+
+def test_table_formats_stream_posts():
+    """CSV и JSONL: только посты в порядке сортировки, лист - отдельный файл"""
+    print("🧪 ТЕСТ CSV И JSONL")
+    print("=" * 50)
+
+    test_dir = Path(tempfile.mkdtemp(prefix="test_report_formats_"))
+    try:
+        frame = make_frame()
+        order = sort_permutation(frame.df, 'views')
+        sheets = {
+            'Posts': {'df': frame, 'start_date': start_date, 'end_date': end_date},
+            'sorted_by_views': {'df': frame.df, 'order': order, 'start_date': start_date, 'end_date': end_date},
+        }
+        dates = format_dates(frame.df['Дата'])
+
+        paths = get_report_format('csv').save(test_dir / 'posts.csv', 'channel', sheets)
+        assert [path.name for path in paths] == ['posts.csv', 'posts_sorted_by_views.csv']
+        with open(paths[0], encoding='utf-8', newline='') as file:
+            rows = list(csv.reader(file, delimiter=';'))
+        assert rows[0] == list(frame.df.columns)
+        assert len(rows) == len(frame) + 1, "итоговых строк в CSV нет"
+        assert [row[0] for row in rows[1:]] == list(dates)
+        with open(paths[1], encoding='utf-8', newline='') as file:
+            views = [int(row['Просмотры']) for row in csv.DictReader(file, delimiter=';')]
+        assert views == frame.df['Просмотры'].to_numpy()[order].tolist()
+
+        paths = get_report_format('jsonl').save(test_dir / 'posts.jsonl', 'channel', sheets)
+        with open(paths[0], encoding='utf-8') as file:
+            records = [json.loads(line, parse_constant=reject_constant) for line in file]
+        assert len(records) == len(frame)
+        assert list(records[0]) == list(frame.df.columns)
+        assert [record['Дата'] for record in records] == list(dates)
+        assert [record['Просмотры'] for record in records] == frame.df['Просмотры'].tolist()
+        virality = frame.df['Виральность'].to_numpy()
+        assert [record['Виральность'] is None for record in records] == np.isnan(virality).tolist()
+        print("✅ Тест CSV и JSONL пройден!")
+    finally:
+        shutil.rmtree(test_dir)
+
+
+def test_rows_in_chunks():
+    """Строки, собранные по кускам, совпадают со строками всей таблицы"""
+    print("\n🧪 ТЕСТ СТРОК ПО КУСКАМ")
+    print("=" * 50)
+
+    df = make_frame().df
+    order = sort_permutation(df, 'views')
+    columns = sheet_columns(df)
+    expected = pd.DataFrame({name: values.to_numpy()[order] for name, values in columns.items()})
+
+    for chunk_size in (1, 7, len(df) + 1):
+        for prepared in (None, columns):
+            rows = list(dataframe_rows(df, order, prepared, chunk_size=chunk_size))
+            assert rows[0] == list(df.columns)
+            pd.testing.assert_frame_equal(pd.DataFrame(rows[1:], columns=rows[0]), expected, check_dtype=False)
+    print("✅ Тест строк по кускам пройден!")
+
+
+def test_format_selection():
+    """Имя файла по формату, неизвестный формат - ошибка"""
+    print("\n🧪 ТЕСТ ВЫБОРА ФОРМАТА")
+    print("=" * 50)
+
+    assert report_filename('posts.xlsx', 'csv') == 'posts.csv'
+    assert report_filename('virality_summary_report.xlsx', 'jsonl') == 'virality_summary_report.jsonl'
+    assert report_filename('posts.xlsx', 'excel') == 'posts.xlsx'
+    try:
+        get_report_format('parquet')
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("неизвестный формат должен вызывать ValueError")
+    print("✅ Тест выбора формата пройден!")
+
+
+def test_channel_reports_in_csv():
+    """Отчеты канала в CSV: те же файлы, что и в Excel, с расширением .csv"""
+    print("\n🧪 ТЕСТ ОТЧЕТОВ КАНАЛА В CSV")
+    print("=" * 50)
+
+    test_dir = tempfile.mkdtemp(prefix="test_report_formats_")
+    old_cwd = os.getcwd()
+    old_tables = dict(analyse.stat_tables)
+    try:
+        os.chdir(test_dir)
+        analyse.stat_tables.clear()
+        analyse.stat_tables.update({'default': True, 'date': True})
+        frame = make_frame()
+        analyse.create_posts_file(frame, 'channel', start_date, end_date, report_format='csv', folder='results')
+        analyse.create_multiple_sorted_files(frame, 'channel', start_date, end_date, report_format='csv', folder='results')
+        analyse.create_virality_summary_report(frame, 'channel', start_date, end_date, report_format='csv', folder='results')
+
+        assert sorted(os.listdir('results')) == ['posts.csv', 'posts_sorted_by_date.csv',
+                                                 'posts_sorted_by_default.csv', 'virality_summary_report.csv']
+        with open(os.path.join('results', 'posts_sorted_by_date.csv'), encoding='utf-8', newline='') as file:
+            rows = list(csv.reader(file, delimiter=';'))
+        assert len(rows) == len(frame) + 1
+        assert rows[1][0] == format_dates(frame.df['Дата'])[frame.df['Дата'].argmax()]
+        print("✅ Тест отчетов канала в CSV пройден!")
+    finally:
+        os.chdir(old_cwd)
+        analyse.stat_tables.clear()
+        analyse.stat_tables.update(old_tables)
+        shutil.rmtree(test_dir)
+
+
+def main():
+    """Основная функция тестирования"""
+    test_table_formats_stream_posts()
+    test_rows_in_chunks()
+    test_format_selection()
+    test_channel_reports_in_csv()
+    print("\n🎉 ВСЕ ТЕСТЫ ФОРМАТОВ ОТЧЕТОВ ПРОЙДЕНЫ!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
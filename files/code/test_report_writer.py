@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Тесты фоновой записи отчетов (report_writer.py)
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+
+# Добавляем пути для импорта модулей
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'config'))
+sys.path.append(os.path.dirname(__file__))
+
+import analyse
+from openpyxl import load_workbook
+from post_columns import PostColumns
+from post_frame import PostFrame
+from report_writer import ReportWriter
+from test_post_columns import make_album_rows
+from test_post_frame import make_frame
+
+
+def test_same_key_in_order():
+    """Задачи одного ключа выполняются по порядку, ошибка одной задачи не мешает остальным"""
+    print("🧪 ТЕСТ ПОРЯДКА ФОНОВОЙ ЗАПИСИ")
+    print("=" * 50)
+
+    writer = ReportWriter(workers=3, max_pending=4)
+    written = {'a.xlsx': [], 'b.xlsx': []}
+
+    def write(key, number):
+        time.sleep(0.002 * (number % 3))
+        written[key].append(number)
+
+    def fail():
+        raise OSError("диск заполнен")
+
+    try:
+        for number in range(30):
+            writer.submit('a.xlsx' if number % 2 else 'b.xlsx', write, 'a.xlsx' if number % 2 else 'b.xlsx', number)
+        writer.submit('c.xlsx', fail)
+        assert writer.wait() == ['c.xlsx']
+        assert written['a.xlsx'] == list(range(1, 30, 2))
+        assert written['b.xlsx'] == list(range(0, 30, 2))
+        assert not writer.pending
+    finally:
+        writer.close()
+
+    # Без исполнителей отчет пишется сразу, ошибка достается вызывающему коду
+    writer = ReportWriter(workers=0)
+    assert writer.submit('a.xlsx', write, 'a.xlsx', 99).done() and written['a.xlsx'][-1] == 99
+    try:
+        writer.submit('c.xlsx', fail)
+    except OSError:
+        pass
+    else:
+        raise AssertionError("ошибка синхронной записи потеряна")
+    print("✅ Тест порядка записи пройден!")
+
+
+def test_bounded_queue():
+    """Заполненная очередь останавливает отправку новых отчетов до освобождения места"""
+    print("\n🧪 ТЕСТ ОГРАНИЧЕННОЙ ОЧЕРЕДИ")
+    print("=" * 50)
+
+    writer = ReportWriter(workers=2, max_pending=2)
+    release = threading.Event()
+    try:
+        writer.submit('a.xlsx', release.wait)
+        writer.submit('b.xlsx', release.wait)
+        third = threading.Thread(target=writer.submit, args=('c.xlsx', time.sleep, 0))
+        third.start()
+        third.join(0.2)
+        assert third.is_alive(), "третий отчет должен ждать свободного места"
+        release.set()
+        third.join(5)
+        assert not third.is_alive()
+        assert writer.wait() == []
+    finally:
+        release.set()
+        writer.close()
+    print("✅ Тест ограниченной очереди пройден!")
+
+
+def test_process_pool_writes_frame():
+    """В режиме процессов таблица постов передается исполнителю целиком"""
+    print("\n🧪 ТЕСТ ЗАПИСИ В ОТДЕЛЬНОМ ПРОЦЕССЕ")
+    print("=" * 50)
+
+    test_dir = tempfile.mkdtemp(prefix="test_report_writer_")
+    writer = ReportWriter(workers=1, processes=True)
+    try:
+        frame = make_frame()
+        path = os.path.join(test_dir, 'posts.parquet')
+        writer.submit('posts.parquet', frame.to_parquet, path)
+        assert writer.wait() == []
+        restored = PostFrame.from_parquet(path)
+        assert list(restored.df.columns) == list(frame.df.columns)
+        assert restored.df['Виральность'].equals(frame.df['Виральность'])
+        assert restored.totals['Просмотры'] == frame.totals['Просмотры']
+        print("✅ Тест записи в процессе пройден!")
+    finally:
+        writer.close()
+        shutil.rmtree(test_dir)
+
+
+def channel_reports(report_writer):
+    """Отчеты канала из process_messages в папке канала"""
+    messages = PostColumns.from_rows(make_album_rows(400))
+    out_dir = Path('results', 'all_folders', 'channel')
+    out_dir.mkdir(parents=True)
+    top_text = analyse.process_messages(messages, 'channel', out_dir, report_writer=report_writer)
+    if report_writer is not None:
+        assert report_writer.wait() == []
+    sheets = {}
+    for path in sorted(out_dir.glob('*.xlsx')):
+        workbook = load_workbook(path, read_only=True)
+        sheets[path.name] = {ws.title: [row for row in ws.iter_rows(values_only=True)] for ws in workbook}
+        workbook.close()
+    return top_text, sheets
+
+
+def test_background_reports_match_sync():
+    """Фоновая запись создает те же файлы, что и синхронная, топ-посты возвращаются сразу"""
+    print("\n🧪 ТЕСТ ФОНОВЫХ ОТЧЕТОВ КАНАЛА")
+    print("=" * 50)
+
+    old_cwd = os.getcwd()
+    old_flags = (analyse.UPDATE_POST_DATASET, analyse.CREATE_TREND_REPORT)
+    test_dirs = [tempfile.mkdtemp(prefix="test_report_writer_") for _ in range(2)]
+    writer = ReportWriter(workers=2)
+    try:
+        # Общий набор постов и хранилище трендов лежат в results проекта - в тесте не пишем
+        analyse.UPDATE_POST_DATASET = analyse.CREATE_TREND_REPORT = False
+        os.chdir(test_dirs[0])
+        sync_text, sync_sheets = channel_reports(None)
+        os.chdir(test_dirs[1])
+        background_text, background_sheets = channel_reports(writer)
+
+        assert background_text == sync_text and sync_text
+        assert 'posts.xlsx' in sync_sheets
+        assert background_sheets == sync_sheets
+        print("✅ Тест фоновых отчетов пройден!")
+    finally:
+        os.chdir(old_cwd)
+        analyse.UPDATE_POST_DATASET, analyse.CREATE_TREND_REPORT = old_flags
+        writer.close()
+        for test_dir in test_dirs:
+            shutil.rmtree(test_dir)
+
+
+def main():
+    """Основная функция тестирования"""
+    test_same_key_in_order()
+    test_bounded_queue()
+    test_process_pool_writes_frame()
+    test_background_reports_match_sync()
+    print("\n🎉 ВСЕ ТЕСТЫ ФОНОВОЙ ЗАПИСИ ОТЧЕТОВ ПРОЙДЕНЫ!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Тесты пула аккаунтов (session_pool.py)
+"""
+
+import os
+import sys
+import json
+import asyncio
+import shutil
+import tempfile
+
+# Добавляем пути для импорта модулей
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'config'))
+sys.path.append(os.path.dirname(__file__))
+
+from session_pool import SessionPool
+from rate_limiter import AdaptiveRateLimiter
+from entity_cache import EntityCache, ResolvedChannel
+from telethon.errors import FloodWaitError
+
+
+class FakeSession:
+    """Аккаунт без подключения к Telegram: только имя и ограничитель"""
+
+    def __init__(self, session_name):
+        self.session_name = session_name
+        self.limiter = AdaptiveRateLimiter(rate=100, burst=10)
+
+
+def test_work_stealing_after_flood_wait():
+    """Каналы аккаунта с FloodWait обрабатывает другой аккаунт"""
+    print("🧪 ТЕСТ ПЕРЕХВАТА РАБОТЫ ПРИ FLOODWAIT")
+    print("=" * 50)
+
+    first, second = FakeSession('first'), FakeSession('second')
+    pool = SessionPool([first, second])
+    processed = {}
+
+    async def handler(session, item, final):
+        await asyncio.sleep(0.01)
+        if session is first and not final:
+            # Первый аккаунт заблокирован надолго - работу должен забрать второй
+            session.limiter.on_flood_wait('iter_messages', 60)
+            raise FloodWaitError(request=None, capture=60)
+        processed[item] = session.session_name
+
+    items = list(range(6))
+    asyncio.run(asyncio.wait_for(pool.run(items, handler, workers_per_session=2), timeout=10))
+
+    assert sorted(processed) == items
+    assert set(processed.values()) == {'second'}
+    assert pool.requeued >= 1 and pool.stolen >= 1
+    print(f"✅ Все {len(items)} заданий обработаны, перехвачено: {pool.stolen}")
+
+
+def test_shared_entity_cache_file():
+    """Аккаунты пула пишут в один файл кэша, не затирая разделы друг друга"""
+    print("\n🧪 ТЕСТ ОБЩЕГО КЭША КАНАЛОВ ПУЛА")
+    print("=" * 50)
+
+    test_dir = tempfile.mkdtemp(prefix="test_pool_")
+    path = os.path.join(test_dir, "entities.json")
+    try:
+        base = EntityCache(path, ttl_hours=24)
+        first, second = base.for_session('first'), base.for_session('second')
+        first.put('alpha', ResolvedChannel(1, 11, 'Альфа'))
+        second.put('alpha', ResolvedChannel(1, 22, 'Альфа'))
+
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        assert data['first']['alpha']['access_hash'] == 11
+        assert data['second']['alpha']['access_hash'] == 22
+        print("✅ Разделы аккаунтов сохранены независимо")
+    finally:
+        shutil.rmtree(test_dir)
+
+
+def main():
+    """Основная функция тестирования"""
+    test_work_stealing_after_flood_wait()
+    test_shared_entity_cache_file()
+    print("\n🎉 ВСЕ ТЕСТЫ ПУЛА АККАУНТОВ ПРОЙДЕНЫ!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Тесты сортировок таблицы постов (sort_permutation, create_multiple_sorted_files)
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+
+# Добавляем пути для импорта модулей
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'config'))
+sys.path.append(os.path.dirname(__file__))
+
+import analyse
+from analyse import sort_permutation, sort_by_virality, SORT_COUNTER_COLUMNS
+from report_formats import dataframe_rows, sheet_columns, column_widths
+from openpyxl import load_workbook
+from post_frame import PostFrame
+from test_post_frame import make_frame
+
+
+def make_posts(count=60, seed=1):
+    """Таблица постов с повторяющимися значениями (для проверки устойчивости)"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Дата': pd.to_datetime('2025-01-01', utc=True) + pd.to_timedelta(rng.integers(0, 240, count), unit='D'),
+        'Полный_текст': [f'пост {i}' for i in range(count)],
+        'Просмотры': rng.integers(0, 50, count),
+        'Реакции': rng.integers(0, 5, count),
+        'Пересылки': rng.integers(0, 5, count),
+        'Виральность': np.round(rng.random(count), 1),
+    })
+
+
+def test_sort_permutation_matches_stable_sort():
+    """Перестановка совпадает с устойчивой сортировкой по убыванию"""
+    print("🧪 ТЕСТ ПЕРЕСТАНОВОК СОРТИРОВКИ")
+    print("=" * 50)
+
+    df = make_posts()
+    for sort_type in ('default', 'forwards', 'reactions', 'views', 'date'):
+        column = SORT_COUNTER_COLUMNS.get(sort_type, 'Виральность')
+        expected = df.sort_values(by=column, ascending=False, kind='stable')
+        assert list(df.index[sort_permutation(df, sort_type)]) == list(expected.index), sort_type
+
+    sorted_df = sort_by_virality(df, 'default')
+    assert list(sorted_df.index) == list(range(len(df)))
+    assert sorted_df['Виральность'].is_monotonic_decreasing
+
+    # Дата сортируется хронологически, а не по строке 'дд.мм.гггг'
+    by_date = df['Дата'].to_numpy()[sort_permutation(df, 'date')]
+    assert (by_date[:-1] >= by_date[1:]).all()
+
+    # Строки для Excel идут в порядке перестановки, дата - строкой
+    rows = list(dataframe_rows(df, sort_permutation(df, 'views')))
+    assert rows[0] == list(df.columns)
+    assert [row[2] for row in rows[1:]] == sorted(df['Просмотры'].tolist(), reverse=True)
+    assert rows[1][0] == df['Дата'][sort_permutation(df, 'views')[0]].strftime('%d.%m.%Y %H:%M')
+    print("✅ Тест перестановок пройден!")
+
+
+def test_sorted_files_written():
+    """Файлы с сортировками создаются только для включенных stat_tables"""
+    print("\n🧪 ТЕСТ ФАЙЛОВ С СОРТИРОВКАМИ")
+    print("=" * 50)
+
+    test_dir = tempfile.mkdtemp(prefix="test_sorted_")
+    old_cwd = os.getcwd()
+    old_tables = dict(analyse.stat_tables)
+    try:
+        os.chdir(test_dir)
+        analyse.stat_tables.clear()
+        analyse.stat_tables.update({'default': True, 'views': True})
+        df = make_posts()
+        # Агрегаты для файлов с сортировками не нужны
+        frame = PostFrame(df, ['default'], totals={}, averages={})
+        analyse.create_multiple_sorted_files(frame, 'channel', analyse.start_date, analyse.end_date, folder='results')
+
+        assert sorted(os.listdir('results')) == ['posts_sorted_by_default.xlsx', 'posts_sorted_by_views.xlsx']
+        written = pd.read_excel(os.path.join('results', 'posts_sorted_by_views.xlsx'), header=3)
+        assert written['Просмотры'].tolist() == sorted(df['Просмотры'].tolist(), reverse=True)
+
+        # Ширина колонок - как по str() каждой ячейки, заголовок таблицы закреплен
+        ws = load_workbook(os.path.join('results', 'posts_sorted_by_views.xlsx')).active
+        rows = list(dataframe_rows(df))
+        expected = [min(max(len(str(row[i])) for row in rows) + 2, 50) for i in range(len(df.columns))]
+        assert column_widths(sheet_columns(df)) == expected
+        assert [ws.column_dimensions[letter].width for letter in 'ABCDEF'] == expected
+        assert ws.freeze_panes == 'A5' and ws['A4'].value == 'Дата' and ws['A4'].font.b
+        print("✅ Тест файлов с сортировками пройден!")
+    finally:
+        analyse.stat_tables.clear()
+        analyse.stat_tables.update(old_tables)
+        os.chdir(old_cwd)
+        shutil.rmtree(test_dir)
+
+
+def test_channel_workbook():
+    """SINGLE_WORKBOOK: одна книга с таблицей постов, листами сортировок и сводкой вместо отдельных файлов"""
+    print("\n🧪 ТЕСТ ОДНОЙ КНИГИ НА КАНАЛ")
+    print("=" * 50)
+
+    test_dir = tempfile.mkdtemp(prefix="test_workbook_")
+    old_cwd = os.getcwd()
+    old_tables = dict(analyse.stat_tables)
+    try:
+        os.chdir(test_dir)
+        analyse.stat_tables.clear()
+        analyse.stat_tables.update({'default': True, 'views': True})
+        frame = make_frame()
+        df = frame.df
+        analyse.create_channel_workbook(frame, 'channel', analyse.start_date, analyse.end_date, folder='results')
+
+        path = os.path.join('results', 'posts.xlsx')
+        assert os.listdir('results') == ['posts.xlsx']
+        assert pd.ExcelFile(path).sheet_names == ['Posts', 'sorted_by_default', 'sorted_by_views', 'Сводка']
+        assert len(PostFrame.from_excel(path)) == len(df)
+        by_views = pd.read_excel(path, sheet_name='sorted_by_views', header=3)
+        assert by_views['Просмотры'].tolist() == sorted(df['Просмотры'].tolist(), reverse=True)
+        assert load_workbook(path)['Сводка']['A4'].value == 'Метрика'
+        print("✅ Тест одной книги пройден!")
+    finally:
+        analyse.stat_tables.clear()
+        analyse.stat_tables.update(old_tables)
+        os.chdir(old_cwd)
+        shutil.rmtree(test_dir)
+
+
+def main():
+    """Основная функция тестирования"""
+    test_sort_permutation_matches_stable_sort()
+    test_sorted_files_written()
+    test_channel_workbook()
+    print("\n🎉 ВСЕ ТЕСТЫ СОРТИРОВОК ПРОЙДЕНЫ!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
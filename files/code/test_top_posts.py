@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Тесты потокового отбора топ-постов (top_posts.py)
+"""
+
+import os
+import sys
+import random
+
+# Добавляем пути для импорта модулей
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'config'))
+sys.path.append(os.path.dirname(__file__))
+
+from top_posts import TopPosts, post_virality
+from post_columns import PostColumns
+from test_post_columns import make_album_rows
+from analyse import calculate_er_percentage, calculate_virality
+
+
+def make_rows(count, seed=1):
+    """Строки extract_post_row со случайными счетчиками"""
+    rnd = random.Random(seed)
+    rows = []
+    for message_id in range(1, count + 1):
+        reactions = rnd.randint(0, 40)
+        positive = rnd.randint(0, reactions)
+        rows.append((message_id, 1735700000 + message_id * 3600, None, f'пост {message_id}', 'Текст',
+                     rnd.randint(1, 5000), reactions, positive, reactions - positive,
+                     rnd.randint(0, 10), rnd.randint(0, 20)))
+    return rows
+
+
+def test_top_posts_match_table():
+    """Потоковый топ совпадает с топом по колонке 'Виральность' таблицы постов"""
+    print("🧪 ТЕСТ ПОТОКОВОГО ТОПА ПОСТОВ")
+    print("=" * 50)
+
+    for seed in range(1, 6):
+        rows = make_rows(500, seed)
+        df = PostColumns.from_rows(rows).to_dataframe()
+        df['ER%'] = df.apply(calculate_er_percentage, axis=1)
+        df['Виральность'] = df.apply(calculate_virality, axis=1)
+
+        # Оценка отдельного поста совпадает с формулой таблицы
+        assert post_virality(rows[0]) == df['Виральность'][0]
+
+        expected = ""
+        for i, text in enumerate(df.nlargest(5, 'Виральность')['Полный_текст'], 1):
+            expected += f"текст {i}:\n{text.strip()}\n\n"
+
+        top = TopPosts.from_rows(rows, k=5)
+        assert len(top) == 500
+        assert top.text() == expected
+
+    print("✅ Тест потокового топа пройден!")
+
+
+def test_top_posts_merge_albums():
+    """Альбомы оцениваются одним постом, как в таблице после PostColumns.merge_albums"""
+    print("\n🧪 ТЕСТ ТОПА С АЛЬБОМАМИ")
+    print("=" * 50)
+
+    for seed in range(1, 4):
+        rows = make_album_rows(600, seed)
+        merged = PostColumns.from_rows(rows).merge_albums()
+        df = merged.to_dataframe()
+        df['ER%'] = df.apply(calculate_er_percentage, axis=1)
+        df['Виральность'] = df.apply(calculate_virality, axis=1)
+
+        expected = ""
+        for i, text in enumerate(df.nlargest(5, 'Виральность')['Полный_текст'], 1):
+            if text.strip():
+                expected += f"текст {i}:\n{text.strip()}\n\n"
+
+        top = TopPosts.from_rows(rows, k=5, merge_albums=True)
+        assert len(top) == len(merged) < len(rows)
+        assert top.text() == expected
+        assert len(TopPosts.from_rows(rows, k=5, merge_albums=False)) == len(rows)
+
+    print("✅ Тест топа с альбомами пройден!")
+
+
+def main():
+    """Основная функция тестирования"""
+    test_top_posts_match_table()
+    test_top_posts_merge_albums()
+    print("\n🎉 ВСЕ ТЕСТЫ ТОПА ПОСТОВ ПРОЙДЕНЫ!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Тесты трендов по периодам (trends.py)
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import random
+import numpy as np
+
+# Добавляем пути для импорта модулей
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'config'))
+sys.path.append(os.path.dirname(__file__))
+
+from post_columns import PostColumns
+from post_frame import PostFrame
+from metrics import add_metrics
+from trends import TrendStore, channel_trends, trends_sheet, TREND_FIELDS
+
+# 01.01.2025 00:00 UTC
+START = 1735689600
+
+
+def make_frame(seed=1):
+    """Посты за январь-апрель 2025 с пропущенным мартом"""
+    rnd = random.Random(seed)
+    rows = []
+    for message_id in range(1, 301):
+        date = START + message_id * 9 * 3600
+        if 1740787200 <= date < 1743465600:  # март без постов
+            continue
+        rows.append((message_id, date, None, f'пост {message_id}', 'Текст', rnd.randint(0, 3000),
+                     rnd.randint(0, 30), 0, 0, rnd.randint(0, 5), rnd.randint(0, 10)))
+    keys = ['er', 'default']
+    return PostFrame(add_metrics(PostColumns.from_rows(rows).to_dataframe(), keys), keys)
+
+
+def test_monthly_trends_match_groupby():
+    """Месячные агрегаты совпадают с группировкой по месяцу, пустые месяцы сохраняются"""
+    print("🧪 ТЕСТ МЕСЯЧНЫХ ТРЕНДОВ")
+    print("=" * 50)
+
+    frame = make_frame()
+    trends = channel_trends(frame, {'week': 'W-MON', 'month': 'MS'}, window=2)
+    months = trends['month']
+    assert [start.month for start in months.index] == [1, 2, 3, 4]
+
+    df = frame.df
+    month = df['Дата'].dt.month
+    assert months['posts'].tolist() == [(month == m).sum() for m in (1, 2, 3, 4)]
+    assert months['views_median'].iloc[0] == df.loc[month == 1, 'Просмотры'].median()
+    assert months['forwards'].iloc[1] == df.loc[month == 2, 'Пересылки'].sum()
+
+    # ER% периода - по суммам, как строка "Итого"
+    january = df[month == 1]
+    assert np.isclose(months['er'].iloc[0], (january['Реакции'].sum() + january['Комменты'].sum()
+                                             + january['Пересылки'].sum()) / january['Просмотры'].sum() * 100)
+
+    # Пустой месяц: 0 постов, метрики не определены, скользящее среднее - по предыдущему
+    assert months['posts'].iloc[2] == 0 and np.isnan(months['virality'].iloc[2])
+    assert months['virality_rolling'].iloc[2] == months['virality'].iloc[1]
+
+    # Недели начинаются с понедельника
+    assert all(start.weekday() == 0 for start in trends['week'].index)
+
+    sheet = trends_sheet(trends)
+    assert list(sheet.columns[:2]) == ['Период', 'Начало']
+    assert len(sheet) == len(trends['week']) + len(trends['month'])
+    print("✅ Тест месячных трендов пройден!")
+
+
+def test_trend_store_round_trip():
+    """Хранилище трендов: повторное сохранение перезаписывает периоды, каналы загружаются вместе"""
+    print("\n🧪 ТЕСТ ХРАНИЛИЩА ТРЕНДОВ")
+    print("=" * 50)
+
+    test_dir = tempfile.mkdtemp(prefix="test_trends_")
+    try:
+        store = TrendStore(os.path.join(test_dir, 'trends.sqlite'))
+        trends = channel_trends(make_frame(1), {'month': 'MS'})
+        store.save('first', trends)
+        store.save('first', trends)
+        store.save('second', channel_trends(make_frame(2), {'month': 'MS'}))
+
+        loaded = store.load('month')
+        assert sorted(loaded['channel'].unique()) == ['first', 'second']
+        first = loaded[loaded['channel'] == 'first']
+        assert len(first) == 4
+        assert first['bucket_start'].tolist() == trends['month'].index.tolist()
+        assert first['posts'].tolist() == trends['month']['posts'].tolist()
+        assert list(loaded.columns) == ['channel', 'bucket_start'] + list(TREND_FIELDS)
+
+        assert len(store.load('month', ['second'])) == 4
+        assert store.load('week').empty
+        print("✅ Тест хранилища трендов пройден!")
+    finally:
+        shutil.rmtree(test_dir)
+
+
+def main():
+    """Основная функция тестирования"""
+    test_monthly_trends_match_groupby()
+    test_trend_store_round_trip()
+    print("\n🎉 ВСЕ ТЕСТЫ ТРЕНДОВ ПРОЙДЕНЫ!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
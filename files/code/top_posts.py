@@ -0,0 +1,99 @@
+"""
+Потоковый отбор топ-K постов по виральности
+
+Для пакетного анализа, которому нужен только текст для AI: каждый пост
+оценивается по мере поступления из iter_messages (или из кэша сообщений),
+в памяти держится куча из K лучших постов - без таблицы, итоговых строк
+и отчетов Excel. Сообщения альбома (идут подряд по message_id)
+накапливаются и оцениваются одним постом, как в PostColumns.merge_albums.
+"""
+
+import os
+import sys
+import heapq
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'config'))
+
+from config import only_text, MERGE_ALBUMS
+from post_columns import COUNTER_FIELDS, merge_album_rows
+from metrics import compute_metrics
+
+
+def post_virality(row):
+    """
+    Виральность строки extract_post_row по формуле 'default' из METRICS
+
+    Returns:
+        float: та же оценка, что и в колонке 'Виральность' (inf/nan при нуле просмотров)
+    """
+    counters = {field: np.array(value) for field, value in zip(COUNTER_FIELDS, row[5:11])}
+    return compute_metrics(counters, ['default'])['Виральность'].item()
+
+
+class TopPosts:
+    """Куча K самых виральных постов; принимает строки extract_post_row, как PostColumns"""
+
+    def __init__(self, k=5, merge_albums=MERGE_ALBUMS):
+        self.k = k
+        self.merge_albums = merge_albums
+        self.count = 0
+        self._heap = []
+        self._album = []  # строки текущего, еще не оцененного альбома
+
+    def __len__(self):
+        self._flush_album()
+        return self.count
+
+    def append(self, row):
+        """Оценивает пост (альбом - после его последнего сообщения) и оставляет его, если он входит в топ-K"""
+        if self.merge_albums and row[2]:
+            if self._album and self._album[0][2] != row[2]:
+                self._flush_album()
+            self._album.append(row)
+            return
+        self._flush_album()
+        self._add(row)
+
+    def _flush_album(self):
+        """Оценивает накопленный альбом одним постом"""
+        if self._album:
+            row = merge_album_rows(self._album)
+            self._album = []
+            self._add(row)
+
+    def _add(self, row):
+        """Учитывает пост в куче топ-K"""
+        if only_text and row[4] != 'Текст':
+            return
+        self.count += 1
+
+        score = post_virality(row)
+        if np.isnan(score):
+            # nlargest в process_messages тоже пропускает NaN
+            return
+
+        # При равной виральности выше более новый пост
+        entry = (score, row[1], row[0], row[3])
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry[:3] > self._heap[0][:3]:
+            heapq.heapreplace(self._heap, entry)
+
+    @classmethod
+    def from_rows(cls, rows, k=5, merge_albums=MERGE_ALBUMS):
+        """Топ-K из строк extract_post_row (например, из кэша сообщений)"""
+        top = cls(k, merge_albums)
+        for row in rows:
+            top.append(row)
+        return top
+
+    def text(self):
+        """Текст для AI в формате process_messages: 'текст i:\\n...'"""
+        self._flush_album()
+        top_posts_text = ""
+        ranked = sorted(self._heap, key=lambda entry: entry[:3], reverse=True)
+        for i, (_, _, _, post_text) in enumerate(ranked, 1):
+            if post_text and post_text.strip():
+                top_posts_text += f"текст {i}:\n{post_text.strip()}\n\n"
+        return top_posts_text
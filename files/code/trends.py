@@ -0,0 +1,177 @@
+"""
+Тренды канала по неделям и месяцам
+
+Агрегаты считаются векторно через resample по колонке 'Дата' таблицы
+постов (PostFrame): частота публикаций, медиана просмотров, суммы
+счетчиков, ER% периода и средняя виральность со скользящими средними.
+Результат пишется листом "Тренды" в сводный отчет и сохраняется
+в компактное хранилище TrendStore (SQLite), где тренды тысяч каналов
+сравниваются без повторной загрузки постов.
+"""
+
+import os
+import sys
+import sqlite3
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'config'))
+
+from config import TREND_PERIODS, TREND_ROLLING_WINDOW, TREND_STORE_PATH
+from metrics import COUNTER_INPUTS, compute_metrics
+
+# Названия периодов в отчете
+PERIOD_TITLES = {'week': 'Неделя', 'month': 'Месяц'}
+
+# Поля тренда в хранилище и их колонки на листе "Тренды"
+TREND_FIELDS = {
+    'posts': 'Постов',
+    'views_median': 'Медиана просмотров',
+    'views': 'Просмотры',
+    'reactions': 'Реакции',
+    'comments': 'Комменты',
+    'forwards': 'Пересылки',
+    'er': 'ER%',
+    'virality': 'Средняя виральность',
+    'er_rolling': 'ER% (скользящий)',
+    'virality_rolling': 'Виральность (скользящая)',
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trends (
+    channel TEXT NOT NULL,
+    period TEXT NOT NULL,
+    bucket_start INTEGER NOT NULL,
+    posts INTEGER NOT NULL,
+    views_median REAL,
+    views INTEGER NOT NULL,
+    reactions INTEGER NOT NULL,
+    comments INTEGER NOT NULL,
+    forwards INTEGER NOT NULL,
+    er REAL,
+    virality REAL,
+    er_rolling REAL,
+    virality_rolling REAL,
+    PRIMARY KEY (channel, period, bucket_start)
+);
+"""
+
+
+def period_trends(frame, rule, window=TREND_ROLLING_WINDOW):
+    """
+    Агрегаты постов по периодам одного правила resample
+
+    Периоды без постов остаются в таблице (posts = 0), чтобы была видна
+    частота публикаций. ER% периода считается по формуле 'er' от сумм
+    счетчиков, как в строке "Итого". Посты без просмотров (inf/nan
+    виральности) в средней виральности не учитываются.
+
+    Returns:
+        DataFrame: индекс - начало периода (UTC), колонки - ключи TREND_FIELDS
+    """
+    df = frame.df
+    virality = df['Виральность'].to_numpy()
+    posts = pd.DataFrame({name: df[column].to_numpy() for name, column in COUNTER_INPUTS.items()},
+                         index=pd.DatetimeIndex(df['Дата']))
+    posts['virality'] = np.where(np.isfinite(virality), virality, np.nan)
+
+    buckets = posts.resample(rule, label='left', closed='left')
+    sums = buckets[list(COUNTER_INPUTS)].sum()
+
+    trends = pd.DataFrame({
+        'posts': buckets.size(),
+        'views_median': buckets['views'].median(),
+    })
+    for name in ('views', 'reactions', 'comments', 'forwards'):
+        trends[name] = sums[name]
+    trends['er'] = compute_metrics({name: sums[name].to_numpy() for name in COUNTER_INPUTS}, ['er'])['ER%']
+    trends.loc[trends['posts'] == 0, 'er'] = np.nan
+    trends['virality'] = buckets['virality'].mean()
+    trends['er_rolling'] = trends['er'].rolling(window, min_periods=1).mean()
+    trends['virality_rolling'] = trends['virality'].rolling(window, min_periods=1).mean()
+    return trends
+
+
+def channel_trends(frame, periods=None, window=TREND_ROLLING_WINDOW):
+    """
+    Тренды канала по всем периодам TREND_PERIODS
+
+    Returns:
+        dict: период ('week', 'month') -> DataFrame из period_trends
+    """
+    periods = TREND_PERIODS if periods is None else periods
+    if not len(frame):
+        return {}
+    return {period: period_trends(frame, rule, window) for period, rule in periods.items()}
+
+
+def trends_sheet(trends):
+    """Лист "Тренды" сводного отчета: все периоды подряд, колонки на русском"""
+    sheets = []
+    for period, table in trends.items():
+        sheet = table.rename(columns=TREND_FIELDS).round(2)
+        sheet.insert(0, 'Начало', sheet.index.strftime('%d.%m.%Y'))
+        sheet.insert(0, 'Период', PERIOD_TITLES.get(period, period))
+        sheets.append(sheet.reset_index(drop=True))
+    return pd.concat(sheets, ignore_index=True) if sheets else pd.DataFrame()
+
+
+class TrendStore:
+    """SQLite-хранилище трендов, ключ - (channel, period, bucket_start)"""
+
+    def __init__(self, path=TREND_STORE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        # Отдельное соединение на операцию: хранилище используется и из потоков асинхронного режима
+        return sqlite3.connect(self.path)
+
+    def save(self, channel, trends):
+        """
+        Сохраняет тренды канала; периоды последнего анализа перезаписывают прежние значения
+
+        Args:
+            channel (str): username канала
+            trends (dict): результат channel_trends
+        """
+        fields = list(TREND_FIELDS)
+        rows = []
+        for period, table in trends.items():
+            starts = table.index.as_unit('s').asi8
+            values = table[fields].astype(object).where(table[fields].notna(), None).to_numpy().tolist()
+            rows.extend((channel, period, int(start), *row) for start, row in zip(starts, values))
+
+        with self._connect() as conn:
+            conn.executemany(
+                f"""INSERT OR REPLACE INTO trends (channel, period, bucket_start, {', '.join(fields)})
+                    VALUES ({', '.join('?' * (len(fields) + 3))})""",
+                rows
+            )
+        return len(rows)
+
+    def load(self, period='month', channels=None):
+        """
+        Тренды нескольких каналов для сравнения
+
+        Args:
+            period (str): ключ TREND_PERIODS
+            channels (list): username каналов (по умолчанию - все)
+
+        Returns:
+            DataFrame: channel, bucket_start (datetime64 UTC) и поля TREND_FIELDS
+        """
+        query = "SELECT * FROM trends WHERE period = ?"
+        params = [period]
+        if channels is not None:
+            channels = list(channels)
+            query += f" AND channel IN ({', '.join('?' * len(channels))})"
+            params.extend(channels)
+        query += " ORDER BY channel, bucket_start"
+
+        with self._connect() as conn:
+            df = pd.read_sql_query(query, conn, params=params)
+        df['bucket_start'] = pd.to_datetime(df['bucket_start'], unit='s', utc=True)
+        return df.drop(columns='period')
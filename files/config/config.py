@@ -31,7 +31,54 @@ stat_tables = {
     'forwards': False,      # По пересылкам
     'reactions': False,     # По реакциям
     'views': False,         # По просмотрам
-    'date': False           # По дате
+    'date': False,          # По дате
+    'reactions_per_1k': False  # По реакциям на 1000 просмотров
+}
+
+# Реестр метрик. Ключ метрики используется в stat_tables и SORT_BY_VIRALITY;
+# считаются только метрики, включенные там (ER% и основная виральность нужны всегда -
+# для итогов, статистики и топ-постов для AI).
+#   column  - колонка в таблице постов
+#   title   - описание файла с сортировкой по метрике
+#   inputs  - счетчики (views, reactions, positive, negative, comments, forwards) или ключи других метрик
+#   formula - выражение над inputs; веса weights доступны как w['имя'], log - натуральный логарифм,
+#             per_view(x, views, scale) - x / views * scale (0 для постов без просмотров)
+#   total   - строка "Итого": 'sum' - сумма по постам, 'formula' - формула от сумм счетчиков
+# Новая метрика добавляется записью в METRICS и ключом в stat_tables.
+METRICS = {
+    'er': {
+        'column': 'ER%',
+        'title': 'По ER%',
+        'inputs': ('reactions', 'comments', 'forwards', 'views'),
+        'formula': "per_view(reactions + comments + forwards, views, 100)",
+        'total': 'formula',
+    },
+    'default': {
+        'column': 'Виральность',
+        'title': 'По виральности (основная формула)',
+        'inputs': ('forwards', 'comments', 'reactions', 'er', 'positive', 'negative', 'views'),
+        'weights': {'forwards': 5, 'comments': 3, 'reactions': 2, 'er': 1.5, 'balance': 0.5},
+        'formula': ("(w['forwards'] * forwards + w['comments'] * comments + w['reactions'] * reactions"
+                    " + w['er'] * er + w['balance'] * (positive - negative)) / log(views + 1)"),
+    },
+    'coefficient': {
+        'column': 'Коэффициент виральности',
+        'title': 'По коэффициенту виральности',
+        'inputs': ('forwards', 'views'),
+        'formula': "per_view(forwards, views, 1000)",
+    },
+    'engagement': {
+        'column': 'Виральность вовлеченности',
+        'title': 'По виральности вовлеченности',
+        'inputs': ('reactions', 'comments', 'forwards', 'views'),
+        'formula': "per_view(reactions + comments + forwards, views, 100)",
+    },
+    'reactions_per_1k': {
+        'column': 'Реакции на 1000 просмотров',
+        'title': 'По реакциям на 1000 просмотров',
+        'inputs': ('reactions', 'views'),
+        'formula': "per_view(reactions, views, 1000)",
+    },
 }
 
 # Создавать ли дополнительные файлы с разными типами сортировки
@@ -41,4 +88,113 @@ CREATE_MULTIPLE_SORTED_FILES = True
 SHOW_VIRALITY_STATISTICS = True
 
 # Создавать ли сводный отчет по виральности
-CREATE_VIRALITY_SUMMARY_REPORT = True 
\ No newline at end of file
+CREATE_VIRALITY_SUMMARY_REPORT = True
+
+# Один файл на канал (posts.xlsx): таблица постов, лист на каждую сортировку
+# (sorted_by_*) и лист "Сводка" вместо отдельных posts_sorted_by_*.xlsx
+# и virality_summary_report.xlsx
+SINGLE_WORKBOOK = False
+
+# Формат отчетов: 'excel' - оформленные книги .xlsx, 'csv' и 'jsonl' - только строки таблиц,
+# пишутся построчно без книги (для загрузки в другие инструменты); см. report_formats.py
+REPORT_FORMAT = 'excel'
+
+# Таблица постов канала в Parquet (results/all_folders/<канал>/posts.parquet):
+# analyze_all_folders и статистика контроллера читают ее вместо posts.xlsx
+SAVE_POSTS_PARQUET = True
+
+# Тренды канала по неделям и месяцам: лист "Тренды" в сводном отчете
+# и компактное хранилище агрегатов по каналам (TREND_STORE_PATH)
+CREATE_TREND_REPORT = True
+
+# Периоды трендов: название -> правило pandas resample (недели с понедельника, месяцы с 1-го числа)
+TREND_PERIODS = {
+    'week': 'W-MON',
+    'month': 'MS',
+}
+
+# Окно скользящего среднего виральности и ER% (в периодах)
+TREND_ROLLING_WINDOW = 4
+
+# Альбомы (несколько фото/видео с общим grouped_id) считаются одним постом:
+# просмотры - максимум по сообщениям, реакции и пересылки - сумма, текст - подпись альбома
+MERGE_ALBUMS = True
+
+# Сколько самых виральных постов отправлять в AI
+TOP_POSTS_COUNT = 5
+
+# Пакетный анализ (main.py) без таблиц и отчетов: посты оцениваются по мере загрузки,
+# в памяти хранится только топ-TOP_POSTS_COUNT для AI, файлы Excel не создаются
+TOP_POSTS_ONLY = False
+
+# Асинхронный режим: несколько каналов загружаются и оцениваются одновременно
+ASYNC_MODE = False
+
+# Максимальное количество одновременно анализируемых каналов в асинхронном режиме
+MAX_CONCURRENT_CHANNELS = 5
+
+# Фоновая запись отчетов Excel в пакетном анализе: пока пишутся файлы канала,
+# загружается следующий канал. 0 - писать синхронно, до перехода к следующему каналу
+REPORT_WRITER_WORKERS = 2
+
+# Процессы вместо потоков для записи отчетов (openpyxl нагружает процессор)
+REPORT_WRITER_PROCESSES = False
+
+# Сколько отчетов может ждать записи; если запись отстает, анализ ждет свободного места
+REPORT_WRITER_MAX_PENDING = 6
+
+# Папка results в корне проекта (не зависит от текущей директории запуска)
+import os
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'results')
+
+# Папки каналов: все файлы анализа канала (таблица постов, отчеты) - в CHANNELS_DIR/<канал>
+CHANNELS_DIR = os.path.join(RESULTS_DIR, 'all_folders')
+
+# Локальный кэш сообщений (SQLite): повторные запуски загружают только новые посты через min_id
+USE_MESSAGE_CACHE = True
+MESSAGE_CACHE_PATH = os.path.join(RESULTS_DIR, 'message_cache.sqlite')
+
+# Просмотры, пересылки и реакции обновляются у всех постов периода анализа (None);
+# число N - только у постов за последние N дней до текущей даты или до end_date,
+# если период уже закончился (быстрее, но счетчики старых постов остаются прежними)
+MESSAGE_CACHE_REFRESH_DAYS = None
+
+# Ограничение частоты запросов к Telegram (token bucket для каждого метода)
+# Скорость снижается вдвое при FloodWait и плавно растет после успешных запросов
+TELEGRAM_REQUESTS_PER_SECOND = 1.0
+TELEGRAM_MIN_REQUESTS_PER_SECOND = 0.05
+TELEGRAM_MAX_REQUESTS_PER_SECOND = 5.0
+TELEGRAM_BURST = 3
+
+# Начальная скорость для отдельных методов (ResolveUsername ограничен сильнее остальных)
+TELEGRAM_METHOD_RATES = {
+    'get_entity': 0.5,
+}
+
+# Аккаунты Telegram для асинхронного режима: каналы распределяются между ними,
+# а каналы аккаунта, получившего FloodWait, забирают остальные аккаунты.
+# name - имя session-файла (и раздела кэша каналов);
+# string_session - строка StringSession (сессия в памяти, без SQLite-файла);
+# api_id / api_hash - если отличаются от основных
+TELEGRAM_SESSIONS = [
+    {'name': 'session_name'},
+    # {'name': 'second_account', 'string_session': '1Aa...', 'api_id': 123, 'api_hash': '...'},
+]
+
+# Сколько раз повторять канал после FloodWait, прежде чем считать его неудачным
+FLOOD_WAIT_MAX_RETRIES = 3
+
+# Пауза между запросами к AI (секунды)
+AI_REQUEST_INTERVAL = 1.5
+
+# Хранилище трендов (SQLite): агрегаты по периодам для сравнения каналов без исходных постов
+TREND_STORE_PATH = os.path.join(RESULTS_DIR, 'trends.sqlite')
+
+# Общий набор постов всех каналов (Parquet, разбит по месяцам и каналам):
+# каждый анализ заменяет посты своего канала, запросы идут одним сканированием
+UPDATE_POST_DATASET = True
+POST_DATASET_PATH = os.path.join(RESULTS_DIR, 'posts_dataset')
+
+# Кэш username -> (id, access_hash, название) вместо ResolveUsername на каждом запуске
+ENTITY_CACHE_PATH = os.path.join(RESULTS_DIR, 'entity_cache.json')
+ENTITY_CACHE_TTL_HOURS = 24 * 7  # None - записи не устаревают